@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Cold-start benchmark for the ``adrflow`` CLI.
+
+Runs ``python -X importtime tools/cli.py <command>`` in the current
+repository ``--repeat`` times (after one run that warms the plugin manifest)
+and prints min / median wall time plus the slowest top-level imports of the
+last run by cumulative time.
+
+    python benchmarks/bench_cli_startup.py --command suggest --repeat 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def run_cli(command: list) -> tuple:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(ROOT / "tools" / "cli.py"), *command],
+        capture_output=True,
+        text=True,
+    )
+    return time.perf_counter() - started, proc.stderr
+
+
+def top_imports(stderr: str, limit: int) -> list:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line.split("|")
+        if cumulative_us.strip().isdigit() and not name.startswith("  "):  # top-level imports only
+            rows.append((int(cumulative_us), name.strip()))
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in sorted(rows, reverse=True)[:limit]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--command", default="suggest", help="CLI command and arguments, space separated")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    command = args.command.split()
+    run_cli(command)  # writes the plugin manifest
+    samples, stderr = [], ""
+    for _ in range(args.repeat):
+        elapsed, stderr = run_cli(command)
+        samples.append(elapsed)
+    print(json.dumps({
+        "command": args.command,
+        "min_s": round(min(samples), 3),
+        "median_s": round(statistics.median(samples), 3),
+        "top_imports": top_imports(stderr, args.top),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
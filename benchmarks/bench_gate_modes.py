@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Startup / latency benchmark for ``adrflow verify`` gate execution modes.
+
+Builds two throwaway repositories under ``--workdir`` (once, reused later):
+
+* ``empty`` — one ADR, one tagged source file and test, a one-line log;
+* ``large`` — the same plus ``--files`` generated source files.
+
+Then runs ``python tools/cli.py verify`` end to end in each repository with
+``--execution inprocess`` and ``--execution subprocess`` ``--repeat`` times
+and prints min / median wall time per combination. The trace index stays
+warm across repeats, as it does on a developer machine.
+
+    python benchmarks/bench_gate_modes.py --files 20000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+ADR = """---
+adr_id: ADR-0001
+title: bench
+observability_signals:
+  logs:
+    - level: INFO
+      event: "bench.done"
+      must_have_fields: [trace_id]
+---
+"""
+
+CONFIG = """paths:
+  adr_dir: docs/adr
+  dod_file: docs/dod/DoD.yaml
+  reports: reports/
+plugins:
+  discovery: []
+trace:
+  exclude: [".git/", "tools/", "reports/", "**/docs/adr/"]
+gates:
+  include: [adr-trace, log-vs-adr, dod-gate]
+"""
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def build_repo(path: Path, files: int) -> None:
+    marker = path / ".bench-files"
+    if marker.exists() and marker.read_text() == str(files):
+        return
+    _write(path / ".adrflow.yaml", CONFIG)
+    _write(path / "docs/adr/ADR-0001-bench.md", ADR)
+    _write(path / "docs/dod/DoD.yaml", "evidence: {}\n")
+    _write(path / "governance/ci_checks.yaml", "mutation:\n  score: 0\n")
+    _write(path / "src/app.py", "# ADR" + ": ADR-0001\n")
+    _write(path / "tests/test_app.py", "# TEST-ADR" + ": ADR-0001\n")
+    _write(path / "reports/debug.log.jsonl", json.dumps({"level": "INFO", "event": "bench.done", "trace_id": "t"}) + "\n")
+    body = "def f():\n    return 1\n" * 20
+    for n in range(files):
+        _write(path / "src" / f"pkg{n // 500}" / f"mod{n}.py", body)
+    tools = path / "tools"
+    if not tools.exists():
+        # Subprocess mode runs ``python tools/<tool>.py`` relative to the repo.
+        tools.symlink_to(ROOT / "tools")
+    marker.write_text(str(files))
+
+
+def run_verify(repo: Path, execution: str) -> float:
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "tools/cli.py", "verify", "--no-json", "--no-exit-code", "--execution", execution],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise SystemExit(f"verify failed in {repo} ({execution}):\n{proc.stderr[-500:]}")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workdir", default="/tmp/adrflow-bench-gates")
+    parser.add_argument("--files", type=int, default=20000, help="Generated source files in the large repo")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modes", default="inprocess,subprocess")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    repos = {"empty": (workdir / "empty", 0), "large": (workdir / "large", args.files)}
+    for path, files in repos.values():
+        build_repo(path, files)
+
+    for name, (path, files) in repos.items():
+        for mode in args.modes.split(","):
+            run_verify(path, mode)  # warm the trace index and the OS page cache
+            samples = [run_verify(path, mode) for _ in range(args.repeat)]
+            print(json.dumps({
+                "repo": name,
+                "files": files,
+                "execution": mode,
+                "min_s": round(min(samples), 3),
+                "median_s": round(statistics.median(samples), 3),
+            }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Throughput / peak-RSS benchmark for the log_analyzer JSONL reader.
+
+Generates a synthetic ``debug.log.jsonl`` of ``--size-mb`` megabytes (once,
+reused on later runs) and checks one ADR requirement against it with:
+
+* ``legacy``    — the old ``read_text().splitlines()`` + ``json.loads`` reader;
+* ``stream``    — the buffered streaming reader, no prefilter;
+* ``prefilter`` — streaming reader with the byte-level event prefilter.
+
+Each mode runs in its own interpreter so ``ru_maxrss`` is per mode.
+
+    python benchmarks/bench_log_reader.py --size-mb 5120 --modes stream,prefilter
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+
+SPEC = {
+    "ADR-9999": {
+        "adr_id": "ADR-9999",
+        "observability_signals": {
+            # Never satisfied, so every mode reads the whole file.
+            "logs": [{"level": "DEBUG", "event": "oauth.refresh", "must_have_fields": ["trace_id", "latency_ms"]}],
+        },
+    },
+}
+
+
+def generate(path: Path, size_mb: int) -> None:
+    if path.exists() and path.stat().st_size >= size_mb << 20:
+        return
+    rng = random.Random(0)
+    events = [f"svc.event.{n}" for n in range(40)]
+    target = size_mb << 20
+    written = 0
+    with open(path, "w", encoding="utf-8") as handle:
+        while written < target:
+            batch = []
+            for _ in range(10_000):
+                batch.append(json.dumps({
+                    "ts": "2026-01-01T00:00:00+0000",
+                    "level": rng.choice(["DEBUG", "INFO", "WARN"]),
+                    "event": rng.choice(events),
+                    "trace_id": f"{rng.getrandbits(64):016x}",
+                    "provider": rng.choice(["google", "github", "okta"]),
+                    "outcome": "success",
+                    "latency_ms": rng.randint(5, 900),
+                }))
+            chunk = "\n".join(batch) + "\n"
+            handle.write(chunk)
+            written += len(chunk)
+
+
+def run_mode(mode: str, path: str) -> dict:
+    import log_analyzer
+
+    started = time.perf_counter()
+    if mode == "legacy":
+        entries = []
+        for line in Path(path).read_text(encoding="utf-8", errors="ignore").splitlines():
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        matcher = log_analyzer.LogMatcher(SPEC)
+        for entry in entries:
+            matcher.feed(entry)
+    elif mode == "stream":
+        matcher = log_analyzer.LogMatcher(SPEC)
+        for entry in log_analyzer.iter_jsonl(path):
+            matcher.feed(entry)
+    else:
+        log_analyzer.check_logs_against_specs(SPEC, path)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(path)
+    return {
+        "mode": mode,
+        "backend": log_analyzer.JSON_BACKEND,
+        "seconds": round(elapsed, 2),
+        "mb_per_s": round(size / (1 << 20) / elapsed, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=5120)
+    parser.add_argument("--path", default="/tmp/adrflow-bench.log.jsonl")
+    parser.add_argument("--modes", default="legacy,stream,prefilter")
+    parser.add_argument("--run-mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.run_mode, args.path)))
+        return
+
+    generate(Path(args.path), args.size_mb)
+    print(f"log: {args.path} ({os.path.getsize(args.path) / (1 << 20):.0f} MB)")
+    for mode in args.modes.split(","):
+        out = subprocess.run(
+            [sys.executable, __file__, "--path", args.path, "--run-mode", mode],
+            capture_output=True, text=True,
+        )
+        print(out.stdout.strip() or f'{{"mode": "{mode}", "error": {json.dumps(out.stderr.strip()[-200:])}}}')
+
+
+if __name__ == "__main__":
+    main()
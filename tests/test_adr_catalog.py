@@ -0,0 +1,58 @@
+"""Tests for the cached ADR front-matter loader."""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools import adr_catalog
+from tools.common import load_yaml_front_matter
+
+
+def test_front_matter_is_parsed_once_per_change(tmp_path, monkeypatch) -> None:
+    adr_dir = tmp_path / "adr"
+    adr_dir.mkdir()
+    (adr_dir / "ADR-0001-a.md").write_text("---\nadr_id: ADR-0001\ndate: 2024-01-02\n---\n# body\n", encoding="utf-8")
+    (adr_dir / "ADR-0002-b.md").write_text("---\r\nadr_id: ADR-0002\r\n---\r\nbody\r\n", encoding="utf-8")
+    (adr_dir / "ADR-0003-c.md").write_text("no front matter\n", encoding="utf-8")
+    cache = str(tmp_path / "specs.json")
+
+    parsed = []
+    real_load = adr_catalog.yaml.load
+    monkeypatch.setattr(adr_catalog.yaml, "load", lambda text, Loader: parsed.append(text) or real_load(text, Loader=Loader))
+
+    specs = adr_catalog.load_adr_specs(str(adr_dir), cache)
+    assert sorted(specs) == ["ADR-0001", "ADR-0002"]
+    assert str(specs["ADR-0001"]["date"]) == "2024-01-02"
+    assert len(parsed) == 2
+
+    # A fresh process only has the JSON cache (dates included), not the in-memory memo.
+    monkeypatch.setattr(adr_catalog, "_memo", {})
+    assert adr_catalog.load_adr_specs(str(adr_dir), cache) == specs
+    assert len(parsed) == 2
+
+    target = adr_dir / "ADR-0001-a.md"
+    st = target.stat()
+    os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    adr_catalog.load_adr_specs(str(adr_dir), cache)
+    assert len(parsed) == 2
+
+    target.write_text("---\nadr_id: ADR-0001\nstatus: superseded\n---\n", encoding="utf-8")
+    assert adr_catalog.load_adr_specs(str(adr_dir), cache)["ADR-0001"]["status"] == "superseded"
+    assert len(parsed) == 3
+
+    # The cache is plain data: a pickle or malformed entries in its place are ignored.
+    Path(cache).write_bytes(b"\x80\x04K\x01.")
+    monkeypatch.setattr(adr_catalog, "_memo", {})
+    assert adr_catalog.load_adr_specs(str(adr_dir), cache)["ADR-0001"]["status"] == "superseded"
+    Path(cache).write_text(json.dumps({"version": adr_catalog.CACHE_VERSION, "entries": {str(target): {"size": 1}}}), encoding="utf-8")
+    monkeypatch.setattr(adr_catalog, "_memo", {})
+    assert adr_catalog.load_adr_specs(str(adr_dir), cache)["ADR-0001"]["status"] == "superseded"
+
+    for path in adr_dir.glob("ADR-*.md"):
+        assert load_yaml_front_matter(str(path)) == adr_catalog.load_front_matters(str(adr_dir))[str(path)]
@@ -0,0 +1,136 @@
+"""Tests for the incremental ADR trace index."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.adr_trace import scan_repo
+
+
+def _code(adr: str) -> str:
+    return "# ADR" + f": {adr}\n"
+
+
+def _test(adr: str) -> str:
+    return "# TEST-ADR" + f": {adr}\n"
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_index_rescans_only_changed_files(tmp_path) -> None:
+    src = tmp_path / "src"
+    _write(src / "a.py", _code("ADR-0001"))
+    _write(src / "b.py", _test("ADR-0002"))
+    _write(src / "c.py", _code("ADR-0003"))
+    index = str(tmp_path / "index.json")
+
+    stats: dict = {}
+    cold = scan_repo(str(src), index_path=index, stats=stats)
+    assert stats["misses"] == 3 and stats["hits"] == 0
+    assert cold == scan_repo(str(src))
+
+    _write(src / "a.py", _code("ADR-0009"))
+    (src / "c.py").unlink()
+    stats = {}
+    warm = scan_repo(str(src), index_path=index, stats=stats)
+    assert stats == {"enabled": True, "hits": 1, "misses": 1, "removed": 1}
+    assert warm == scan_repo(str(src))
+    assert "ADR-0001" not in warm and "ADR-0003" not in warm
+    assert warm["ADR-0002"]["tests"] == [str(src / "b.py")]
+
+
+def test_touched_file_with_same_content_is_a_hit(tmp_path) -> None:
+    src = tmp_path / "src"
+    _write(src / "a.py", _code("ADR-0001"))
+    index = str(tmp_path / "index.json")
+    scan_repo(str(src), index_path=index)
+
+    st = (src / "a.py").stat()
+    os.utime(src / "a.py", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    stats: dict = {}
+    scan_repo(str(src), index_path=index, stats=stats)
+    assert stats["hits"] == 1 and stats["misses"] == 0
+
+    stats = {}
+    scan_repo(str(src), index_path=index, rebuild=True, stats=stats)
+    assert stats["misses"] == 1
+
+
+def test_walk_prunes_excludes_gitignore_and_binaries(tmp_path) -> None:
+    src = tmp_path / "repo"
+    _write(src / "app" / "main.py", _test("ADR-0001"))
+    _write(src / "node_modules" / "dep.js", _code("ADR-0002"))
+    _write(src / "build" / "gen.py", _code("ADR-0003"))
+    _write(src / ".gitignore", "build/\n")
+    (src / "blob.bin").write_bytes(b"\0" + _code("ADR-0004").encode())
+
+    traced = scan_repo(str(src))
+    assert sorted(traced) == ["ADR-0001"]
+    assert traced["ADR-0001"] == {"code": [str(src / "app" / "main.py")], "tests": [str(src / "app" / "main.py")]}
+    assert "ADR-0003" in scan_repo(str(src), gitignore=False)
+
+
+def test_process_pool_matches_serial_scan(tmp_path, monkeypatch) -> None:
+    from tools import adr_trace
+
+    src = tmp_path / "src"
+    for i in range(40):
+        _write(src / f"m{i:02d}.py", _code(f"ADR-{i % 7:04d}") + _test(f"ADR-{i % 5:04d}"))
+    monkeypatch.setattr(adr_trace, "PARALLEL_MIN_FILES", 1)
+    assert adr_trace.scan_repo(str(src), jobs=4) == adr_trace.scan_repo(str(src), jobs=1)
+
+
+def test_diff_mode_matches_full_scan(tmp_path) -> None:
+    import subprocess
+
+    from tools import adr_trace
+    from tools.adr_trace import git_changes, scan_diff
+
+    repo = tmp_path / "repo"
+    _write(repo / "a.py", _code("ADR-0001"))
+    _write(repo / "b.py", _test("ADR-0001"))
+    _write(repo / "c.py", _code("ADR-0002"))
+    _write(repo / "ünï code.py", _code("ADR-0001"))
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    subprocess.run([*git, "add", "."], cwd=repo, check=True)
+    subprocess.run([*git, "commit", "-qm", "base"], cwd=repo, check=True)
+    baseline = str(tmp_path / "baseline.json")
+    scan_repo(str(repo), index_path=baseline)
+
+    _write(repo / "a.py", _code("ADR-0003"))
+    subprocess.run(["git", "mv", "b.py", "moved.py"], cwd=repo, check=True)
+    subprocess.run(["git", "rm", "-q", "c.py"], cwd=repo, check=True)
+    _write(repo / "new.py", _test("ADR-0002"))
+    _write(repo / "ünï code.py", _code("ADR-0004"))
+    _write(repo / "nëw file.py", _test("ADR-0004"))
+
+    stats: dict = {}
+    traced = scan_diff(str(repo), baseline, git_changes(str(repo), "HEAD"), stats=stats)
+    assert traced == scan_repo(str(repo))
+    assert stats["diff"]["deleted"] == 1 and stats["diff"]["renamed"] == 1
+    assert stats["misses"] == 5
+    # Paths as git quotes them without -z (stdin / --changed-files input).
+    assert adr_trace.parse_name_status(['M\t"\\303\\274n\\303\\257 code.py"', 'R100\tb.py\t"a\\tb.py"']) == [
+        ("M", "ünï code.py", None), ("R", "b.py", "a\tb.py"),
+    ]
+
+    # With the default paths the baseline doubles as --index; a diff run must not overwrite it.
+    out = str(tmp_path / "out" / "adr_trace.json")
+    default = adr_trace.default_index_path(out)
+    Path(default).parent.mkdir(parents=True)
+    Path(default).write_bytes(Path(baseline).read_bytes())
+    run = dict(src=str(repo), adr=str(tmp_path / "no-adr"), out=out, since="HEAD")
+    adr_trace.run_trace(**run)
+    assert Path(default).read_bytes() == Path(baseline).read_bytes()
+    Path(default).unlink()
+    adr_trace.run_trace(**run)  # no baseline: full scan, nothing saved as one
+    assert not Path(default).exists()
@@ -0,0 +1,280 @@
+"""Artifact downloads against a local stand-in for the GitHub Actions artifacts API."""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import ci_intake
+import reports_fs
+from artifacts import fetch_run_artifacts
+
+
+def _zip(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as bundle:
+        for name, text in files.items():
+            bundle.writestr(name, text)
+    return buf.getvalue()
+
+
+class FakeGitHub:
+    """Lists each run's artifacts two per page, serves their archives with ETags and maps pulls to runs."""
+
+    def __init__(self) -> None:
+        self.archives = {
+            1: ("reports-a", _zip({"coverage.json": '{"line": 90}'})),
+            2: ("reports-b", _zip({"security.json": '{"critical": 0}', "e2e/mlm.json": '{"ok": true}'})),
+            3: ("old", _zip({"stale.json": "{}"})),
+        }
+        self.digests = {1: True}  # only reports-a carries a digest
+        self.runs = {7: [1, 2, 3]}
+        self.pulls = {}  # number -> run id
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                fake.requests.append((url.path, self.headers.get("Authorization"), self.headers.get("If-None-Match")))
+                query = parse_qs(url.query)
+                parts = url.path.strip("/").split("/")
+                if url.path.startswith("/repos/o/r/actions/runs/") and parts[-1] == "artifacts" and int(parts[-2]) in fake.runs:
+                    self._list(int(parts[-2]), int(query.get("page", ["1"])[0]))
+                elif url.path.startswith("/repos/o/r/pulls/") and int(parts[-1]) in fake.pulls:
+                    self._json({"number": int(parts[-1]), "head": {"sha": f"sha{parts[-1]}", "ref": f"feature-{parts[-1]}"}})
+                elif url.path == "/repos/o/r/actions/runs":
+                    number = int(query["head_sha"][0][3:])
+                    self._json({"workflow_runs": [{"id": fake.pulls[number], "name": "ci", "path": ".github/workflows/ci.yml"}]})
+                elif url.path.startswith("/download/"):
+                    self._download(int(url.path.rsplit("/", 1)[1]))
+                else:
+                    self.send_error(404)
+
+            def _json(self, payload: dict, headers: dict = None) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _list(self, run_id: int, page: int) -> None:
+                items = [fake.item(artifact_id, f"http://{self.headers['Host']}") for artifact_id in fake.runs[run_id]]
+                more = page * 2 < len(items)
+                link = {"Link": f'<http://{self.headers["Host"]}{urlparse(self.path).path}?per_page=2&page={page + 1}>; rel="next"'} if more else {}
+                self._json({"total_count": len(items), "artifacts": items[(page - 1) * 2: page * 2]}, link)
+
+            def _download(self, artifact_id: int) -> None:
+                data = fake.archives[artifact_id][1]
+                etag = '"' + hashlib.md5(data).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def item(self, artifact_id: int, base: str) -> dict:
+        name, data = self.archives[artifact_id]
+        item = {"id": artifact_id, "name": name, "expired": artifact_id == 3, "archive_download_url": f"{base}/download/{artifact_id}"}
+        if self.digests.get(artifact_id):
+            item["digest"] = "sha256:" + hashlib.sha256(data).hexdigest()
+        return item
+
+    def downloads(self) -> list:
+        return [(path, etag) for path, _, etag in self.requests if path.startswith("/download/")]
+
+
+@pytest.fixture()
+def github():
+    fake = FakeGitHub()
+    thread = threading.Thread(target=fake.server.serve_forever, daemon=True)
+    thread.start()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+def test_concurrent_streamed_downloads_are_cached(github, tmp_path) -> None:
+    def fetch():
+        return fetch_run_artifacts(github.url, "o", "r", 7, dest=str(tmp_path / "out"), cache_dir=str(tmp_path / "cache"),
+                                   names=["reports-a", "reports-b"], jobs=2, token="t0ken")
+
+    first = fetch()
+    assert [(info["name"], info["source"]) for info in first] == [("reports-a", "download"), ("reports-b", "download")]
+    assert json.loads((tmp_path / "out/reports-b/e2e/mlm.json").read_text()) == {"ok": True}
+    assert (tmp_path / "out/reports-a/coverage.json").exists()
+    assert all(auth == "Bearer t0ken" for path, auth, _ in github.requests if not path.startswith("/download/"))
+    assert len(github.downloads()) == 2
+
+    # Same digest: no request at all; no digest: a conditional request answered 304.
+    second = fetch()
+    assert [info["source"] for info in second] == ["cache", "not-modified"]
+    assert len(github.downloads()) == 3 and github.downloads()[-1][1] is not None
+
+    # A new build of reports-a changes its digest and is fetched again.
+    github.archives[1] = ("reports-a", _zip({"coverage.json": '{"line": 95}'}))
+    assert [info["source"] for info in fetch()] == ["download", "not-modified"]
+    assert json.loads((tmp_path / "out/reports-a/coverage.json").read_text()) == {"line": 95}
+
+    with pytest.raises(RuntimeError, match="old"):  # expired artifacts are not offered
+        fetch_run_artifacts(github.url, "o", "r", 7, dest=str(tmp_path / "x"), cache_dir=str(tmp_path / "cache"), names=["old"])
+
+
+def test_artifact_cache_evicts_least_recently_used_archives(github, tmp_path, monkeypatch) -> None:
+    monkeypatch.delenv(reports_fs.ENV_MOUNTS, raising=False)
+    cache = tmp_path / "cache"
+
+    def fetch(name, max_bytes=1 << 30):
+        return fetch_run_artifacts(github.url, "o", "r", 7, dest=str(tmp_path / "out"), cache_dir=str(cache),
+                                   names=[name], token="t0ken", unpack=False, max_bytes=max_bytes)
+
+    fetch("reports-a")
+    # Only this fetch's archive fits: the older one goes.
+    fetch("reports-b", max_bytes=1)
+    assert sorted(path.name for path in cache.iterdir()) == ["2.json", "2.zip"]
+
+    # Mounted archives stay however small the budget.
+    with reports_fs.mounted(str(tmp_path / "out"), str(cache / "2.zip")):
+        fetch("reports-a", max_bytes=1)
+    assert sorted(path.name for path in cache.iterdir()) == ["1.json", "1.zip", "2.json", "2.zip"]
+    fetch("reports-a", max_bytes=1)
+    assert sorted(path.name for path in cache.iterdir()) == ["1.json", "1.zip"]
+
+
+def test_ci_intake_fetches_first_artifact_into_reports(github, tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("GH_TOKEN", "t0ken")
+    args = argparse.Namespace(
+        fetch=True, gh_cli=False, run_id=7, download_dir=None, owner="o", repo="r", artifact=None,
+        all_artifacts=False, api_url=github.url, download_jobs=4, artifact_cache=None, unpack="all",
+    )
+    fetched = ci_intake.fetch_artifacts(args, tmp_path)
+    assert fetched == [{"name": "reports-a", "source": "download", "bytes": len(github.archives[1][1])}]
+    assert (tmp_path / "coverage.json").exists() and (tmp_path / ".cache/artifacts/1.zip").exists()
+    assert ci_intake.fetch_artifacts(args, tmp_path)[0]["source"] == "cache"
+
+
+def test_ci_intake_mounts_archives_instead_of_unpacking(github, tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("GH_TOKEN", "t0ken")
+    monkeypatch.delenv(reports_fs.ENV_MOUNTS, raising=False)
+    args = argparse.Namespace(
+        fetch=True, gh_cli=False, run_id=7, download_dir=None, owner="o", repo="r", artifact=["reports-a", "reports-b"],
+        all_artifacts=False, api_url=github.url, download_jobs=2, artifact_cache=None, unpack="none",
+    )
+    ci_intake.fetch_artifacts(args, tmp_path)
+    assert not (tmp_path / "reports-b").exists()
+    assert reports_fs.read_json(tmp_path / "reports-b/e2e/mlm.json") == {"ok": True}
+    assert reports_fs.read_json(tmp_path / "reports-a/coverage.json") == {"line": 90}
+
+
+def test_fetched_run_is_not_shadowed_by_stale_local_reports(github, tmp_path, monkeypatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GH_TOKEN", "t0ken")
+    monkeypatch.delenv(reports_fs.ENV_MOUNTS, raising=False)
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "reports/coverage.json").write_text('{"line": 50}', encoding="utf-8")  # from an earlier run
+    (tmp_path / "checks.yaml").write_text("coverage:\n  thresholds: {line: 85}\n", encoding="utf-8")
+    args = argparse.Namespace(
+        mode="report-only", fetch=True, gh_cli=False, run_id=7, artifact=["reports-a"], all_artifacts=False, api_url=github.url,
+        download_jobs=1, artifact_cache=None, unpack="none", download_dir=None, owner="o", repo="r", branch=None, pull=None,
+        checks="checks.yaml", skip_verify=True, service=None, embed_raw=None,
+    )
+    payload = ci_intake.aggregate(args, cfg={})
+    assert payload["dod"]["coverage"]["actual"]["line"] == 90
+    assert (tmp_path / "reports/.cache/artifacts/1.zip").exists() and not (tmp_path / "reports/runs/7/coverage.json").exists()
+
+    # Extracting referenced files replaces what an earlier intake of the run left there.
+    (tmp_path / "reports/runs/7/coverage.json").write_text('{"line": 50}', encoding="utf-8")
+    payload = ci_intake.aggregate(argparse.Namespace(**{**vars(args), "unpack": "referenced"}), cfg={})
+    assert payload["dod"]["coverage"]["actual"]["line"] == 90 and payload["metrics"]["fetch"]["materialized"]
+    assert json.loads((tmp_path / "reports/runs/7/coverage.json").read_text()) == {"line": 90}
+    reports_fs.unmount()
+
+
+def test_batch_intake_evaluates_runs_concurrently_in_isolated_dirs(github, tmp_path, monkeypatch) -> None:
+    import batch_intake
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GH_TOKEN", "t0ken")
+    monkeypatch.delenv(reports_fs.ENV_MOUNTS, raising=False)
+    passing = {"adr_trace.json": '{"pass": true}', "adr_log_check.json": '{"pass": true}', "security.json": '{"critical": 0}'}
+    github.archives[10] = ("reports", _zip({**passing, "coverage.json": '{"line": 90}', "verify.json": '{"summary": {"ok": true}}'}))
+    github.archives[11] = ("reports", _zip({**passing, "coverage.json": '{"line": 60}'}))
+    github.runs.update({8: [10], 9: [11]})
+    github.pulls.update({12: 8, 13: 9})
+    (tmp_path / "checks.yaml").write_text("coverage:\n  thresholds: {line: 85}\n", encoding="utf-8")
+    (tmp_path / "runs.jsonl").write_text('8\n# comment\n{"pull": 13}\n{"run_id": 404}\n', encoding="utf-8")
+
+    args = argparse.Namespace(
+        mode="report-only", fetch=False, gh_cli=False, run_id=None, artifact=None, all_artifacts=False, api_url=github.url,
+        download_jobs=2, artifact_cache=None, unpack="none", download_dir=None, owner="o", repo="r", branch=None, pull=None,
+        checks="checks.yaml", skip_verify=False, service=None, out=None, embed_raw=None, runs_file="runs.jsonl", pulls=[12], workflow="ci.yml",
+        concurrency=2, batch_dir=str(tmp_path / "batch"), table=None,
+    )
+    table = batch_intake.run_batch(args, batch_intake.entries_from_args(args))
+    rows = table["runs"]
+    assert [(row["run_id"], row["pull"], row["ok"]) for row in rows] == [(8, None, True), (9, 13, False), (404, None, False), (8, 12, True)]
+    assert rows[1]["branch"] == "feature-13" and rows[1]["miss"] == ["coverage: line coverage 60 < 85"]
+    assert "404" in rows[2]["error"]
+    assert table["summary"] == {"ok": False, "runs": 4, "passed": 2, "failed": ["run 9", "run 404"], "mode": "report-only", "source": "ci_intake"}
+
+    # Each run has its own directory with its verdict; archives were read in place.
+    payload = json.loads((tmp_path / "batch/9/dod_gate.json").read_text())
+    assert payload["metadata"]["pull_request"] == 13 and payload["dod"]["coverage"]["actual"]["line"] == 60
+    assert not (tmp_path / "batch/9/coverage.json").exists() and reports_fs.ENV_MOUNTS not in os.environ
+
+    batch_intake.write_table(str(tmp_path / "verdicts.jsonl"), table)
+    assert [json.loads(line)["run_id"] for line in (tmp_path / "verdicts.jsonl").read_text().splitlines()] == [8, 9, 404, 8]
+
+    # Monorepo: each service's reports directory is rerooted under the run's directory, not read from ./reports.
+    (tmp_path / ".adrflow.yaml").write_text(
+        "repo:\n  type: mono\n  services:\n    api: {root: ., reports: reports/}\n    web: {}\npaths:\n  reports: reports/\n", encoding="utf-8"
+    )
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "reports/coverage.json").write_text('{"line": 99}', encoding="utf-8")
+    args.runs_file, args.pulls = None, [13]
+    mono = batch_intake.run_batch(args, batch_intake.entries_from_args(args))["runs"]
+    assert mono[0]["miss"] == ["api: coverage: line coverage 60 < 85", "web: coverage: line coverage 60 < 85"]
+    services = json.loads((tmp_path / "batch/9/dod_gate.json").read_text())["dod"]["services"]
+    assert services["api"]["coverage"]["actual"]["line"] == 60 == services["web"]["coverage"]["actual"]["line"]
+
+    # Required artifacts and e2e evidence listed under reports/ are looked up in the run's directory too.
+    (tmp_path / "checks.yaml").write_text("coverage:\n  thresholds: {line: 85}\nrequired_artifacts:\n  logs: [reports/debug.log.jsonl]\n", encoding="utf-8")
+    (tmp_path / "docs/dod").mkdir(parents=True)
+    (tmp_path / "docs/dod/DoD.yaml").write_text("evidence:\n  e2e: [reports/e2e/mlm.json]\n", encoding="utf-8")
+    (tmp_path / "reports/e2e").mkdir()
+    (tmp_path / "reports/e2e/mlm.json").write_text('{"ok": true}', encoding="utf-8")
+    (tmp_path / "reports/debug.log.jsonl").write_text("{}\n", encoding="utf-8")
+    evidence = {"debug.log.jsonl": "{}\n", "e2e/mlm.json": '{"ok": true}'}
+    github.archives[20] = ("reports", _zip({**passing, "coverage.json": '{"line": 90}', **evidence}))
+    github.archives[21] = ("reports", _zip({**passing, "coverage.json": '{"line": 90}'}))
+    github.runs.update({18: [20], 19: [21]})
+    github.pulls.update({22: 18, 23: 19})
+    args.pulls = [22, 23]
+    rows = batch_intake.run_batch(args, batch_intake.entries_from_args(args))["runs"]
+    run_dir = tmp_path / "batch/19"
+    assert [row["ok"] for row in rows] == [True, False]
+    assert rows[1]["miss"] == [
+        f"{service}: {miss}"
+        for service in ("api", "web")
+        for miss in (f"artifact missing: {run_dir / 'debug.log.jsonl'}", f"e2e: {run_dir / 'e2e/mlm.json'} not ok")
+    ]
@@ -0,0 +1,116 @@
+"""Cold-start regression: cached plugin manifest and lazily imported modules."""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+CLI = ROOT / "tools" / "cli.py"
+
+CONFIG = """paths:
+  reports: reports/
+plugins:
+  discovery:
+    - local:demo_plugins
+gates:
+  include: [demo-gate]
+"""
+
+PLUGIN = """from gates import register_gate
+from gates.base import Gate, GateResult
+
+
+@register_gate
+class DemoGate(Gate):
+    key = "demo-gate"
+
+    def run(self, cfg):
+        return GateResult(ok=True, miss=[])
+"""
+
+# Modules ``adrflow suggest`` must not import once the manifest is warm.
+DEFERRED = {"demo_plugins.demo_gate", "gates.scheduler", "gates.cache", "concurrent.futures", "adapters.logger"}
+
+
+@pytest.fixture()
+def repo(tmp_path) -> Path:
+    (tmp_path / ".adrflow.yaml").write_text(CONFIG, encoding="utf-8")
+    (tmp_path / "demo_plugins").mkdir()
+    (tmp_path / "demo_plugins" / "demo_gate.py").write_text(PLUGIN, encoding="utf-8")
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "reports" / "verify.json").write_text(json.dumps({"summary": {"ok": True}}), encoding="utf-8")
+    return tmp_path
+
+
+# ``-X importtime`` does not see ``importlib.import_module`` (how plugins
+# are loaded), so the run also dumps ``sys.modules`` on exit.
+RUNNER = """import atexit, json, os, runpy, sys
+dump = sys.argv.pop(1)
+atexit.register(lambda: json.dump(sorted(sys.modules), open(dump, "w")))
+sys.argv = sys.argv[1:]
+sys.path.insert(0, os.path.dirname(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def _imported(repo: Path, *argv: str) -> set:
+    """Modules imported by ``python -X importtime tools/cli.py <argv>``."""
+    env = {k: v for k, v in os.environ.items() if k not in ("ADRFLOW_TRACE_FILE", "TRACEPARENT")}
+    dump = repo / "modules.json"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER, str(dump), str(CLI), *argv],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    timed = {line.rsplit("|", 1)[1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")}
+    return timed | set(json.loads(dump.read_text(encoding="utf-8")))
+
+
+def test_warm_manifest_skips_plugin_and_gate_imports(repo) -> None:
+    cold = _imported(repo, "suggest")
+    assert "demo_plugins.demo_gate" in cold
+    manifest = json.loads((repo / "reports/.cache/plugins.json").read_text(encoding="utf-8"))
+    assert manifest["registries"]["gates"] == {"demo-gate": "demo_plugins.demo_gate"}
+
+    warm = _imported(repo, "suggest")
+    assert not warm & DEFERRED
+
+    # A changed plugin folder invalidates the manifest.
+    (repo / "demo_plugins" / "other.py").write_text("", encoding="utf-8")
+    assert "demo_plugins.demo_gate" in _imported(repo, "suggest")
+
+
+def test_lazy_plugin_is_imported_on_first_get(repo) -> None:
+    _imported(repo, "suggest")  # writes the manifest
+    script = (
+        "import sys\n"
+        f"sys.path.insert(0, {str(ROOT / 'tools')!r})\n"
+        "import yaml\n"
+        "from ext_registry import discover_plugins\n"
+        "discover_plugins(yaml.safe_load(open('.adrflow.yaml')))\n"
+        "from gates import all_gates, get_gate\n"
+        "assert 'demo_plugins.demo_gate' not in sys.modules\n"
+        "assert 'demo-gate' in all_gates()\n"
+        "assert type(get_gate('demo-gate')).__name__ == 'DemoGate'\n"
+        "assert get_gate('adr-trace').key == 'adr-trace'\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", script], cwd=repo, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+
+def test_verify_runs_lazily_registered_gate(repo) -> None:
+    _imported(repo, "suggest")
+    proc = subprocess.run(
+        [sys.executable, str(CLI), "verify", "--no-json", "--no-cache"], cwd=repo, capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    report = json.loads((repo / "reports" / "verify.json").read_text(encoding="utf-8"))
+    assert report["demo-gate"]["ok"] and report["summary"]["ok"]
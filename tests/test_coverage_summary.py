@@ -0,0 +1,101 @@
+"""Coverage totals streamed from large coverage.json reports, referenced rather than embedded."""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+
+import pytest
+
+import coverage_summary
+from dod_gate import evaluate_dod
+
+
+def _report(files: int = 60) -> dict:
+    entries = {}
+    totals = dict.fromkeys(coverage_summary.SUMMARY_KEYS, 0)
+    for n in range(files):
+        summary = {"num_statements": 40, "covered_lines": 30 + n % 10, "num_branches": 10, "covered_branches": n % 10}
+        entries[f"src/pkg{n % 3}/mod_{n}.py"] = {"executed_lines": list(range(1, summary["covered_lines"] + 1)), "summary": summary}
+        for key in totals:
+            totals[key] += summary[key]
+    covered = totals["covered_lines"] + totals["covered_branches"]
+    totals.update(
+        percent_covered=round(100 * covered / (totals["num_statements"] + totals["num_branches"]), 2),
+        percent_covered_branch=round(100 * totals["covered_branches"] / totals["num_branches"], 2),
+    )
+    return {"meta": {"version": "7.6.1", "branch_coverage": True}, "files": entries, "totals": totals}
+
+
+@pytest.fixture()
+def large(monkeypatch):
+    # Everything past the first 512 bytes counts as "large".
+    monkeypatch.setattr(coverage_summary, "SMALL_BYTES", 512)
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_large_reports_are_streamed(large, tmp_path, indent) -> None:
+    report = _report()
+    path = tmp_path / "coverage.json"
+    path.write_text(json.dumps(report, indent=indent), encoding="utf-8")
+
+    summary = coverage_summary.summarize(str(path))
+    assert summary["parser"] == "stream" and "packages" not in summary
+    assert summary["line"] == report["totals"]["percent_covered"] and summary["branch"] == report["totals"]["percent_covered_branch"]
+    assert summary["source"] == {"path": str(path.resolve()), "sha256": hashlib.sha256(path.read_bytes()).hexdigest(), "bytes": path.stat().st_size}
+
+    packaged = coverage_summary.summarize(str(path), packages=2)
+    assert sorted(packaged["packages"]) == ["src/pkg0", "src/pkg1", "src/pkg2"]
+    assert packaged["packages"]["src/pkg0"] == {"line": 86.25, "branch": 45.0, "statements": 800, "branches": 200}
+    assert packaged["packages"] == coverage_summary.from_report(report, 2)["packages"]
+
+    # Key order does not matter.
+    reordered = {"totals": report["totals"], "files": report["files"], "meta": report["meta"]}
+    path.write_text(json.dumps(reordered), encoding="utf-8")
+    assert coverage_summary.summarize(str(path))["line"] == report["totals"]["percent_covered"]
+
+
+@pytest.mark.parametrize("indent", [None, 1])
+def test_members_stream_across_chunk_boundaries(monkeypatch, indent) -> None:
+    # Tiny chunks split keys, strings and numbers ("12345" -> "12" + "345") mid-token.
+    monkeypatch.setattr(coverage_summary, "CHUNK_BYTES", 3)
+    report = _report(files=5)
+    report["files"]["src/ünï/mod.py"] = {"executed_lines": [12345, 67890], "summary": {"covered_lines": 2, "ratio": 0.125}}
+    report["empty"] = {}
+    members = list(coverage_summary.iter_members(io.BytesIO(json.dumps(report, indent=indent, ensure_ascii=False).encode("utf-8"))))
+    assert [key for key, _ in members][:2] == [("meta",), ("files", "src/pkg0/mod_0.py")]
+    assert dict((key[-1], value) for key, value in members if key[0] == "files") == report["files"]
+    assert dict(members)[("totals",)] == report["totals"] and dict(members)[("empty",)] == {}
+
+
+def test_malformed_stream_fails_without_reading_on(monkeypatch) -> None:
+    monkeypatch.setattr(coverage_summary, "CHUNK_BYTES", 64)
+    text = json.dumps(_report()).replace('"executed_lines": [1, 2', '"executed_lines": [1 2', 1).encode("utf-8")
+    stream = io.BytesIO(text)
+    with pytest.raises(ValueError, match="delimiter"):
+        list(coverage_summary.iter_members(stream))
+    assert stream.tell() < 1024 < len(text)
+
+    # A value cut right after a literal's first letters is completed from the next chunk.
+    cut = io.BytesIO(b'{"a": [' + b" " * 58 + b'true, null, -1.5e3], "b": "x\\u00e9"}')
+    assert list(coverage_summary.iter_members(cut)) == [(("a",), [True, None, -1500.0]), (("b",), "x\u00e9")]
+
+
+def test_dod_references_coverage_instead_of_embedding_it(large, tmp_path) -> None:
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "coverage.json").write_text(json.dumps(_report()), encoding="utf-8")
+    (tmp_path / "checks.yaml").write_text("coverage:\n  thresholds: {line: 70, branch: 40}\n", encoding="utf-8")
+
+    verdict = evaluate_dod(str(tmp_path / "DoD.yaml"), str(tmp_path / "checks.yaml"), reports_dir=str(reports))
+    actual = verdict["coverage"]["actual"]
+    assert verdict["coverage"]["ok"] and "raw" not in actual
+    assert actual["source"]["sha256"] == hashlib.sha256((reports / "coverage.json").read_bytes()).hexdigest()
+
+    embedded = evaluate_dod(str(tmp_path / "DoD.yaml"), str(tmp_path / "checks.yaml"), reports_dir=str(reports), embed_raw=True)
+    assert embedded["coverage"]["actual"]["raw"]["totals"] == _report()["totals"]
+
+    # The flat {"line", "branch"} form keeps working.
+    (reports / "coverage.json").write_text('{"line": 50, "branch": 45}', encoding="utf-8")
+    flat = evaluate_dod(str(tmp_path / "DoD.yaml"), str(tmp_path / "checks.yaml"), reports_dir=str(reports))
+    assert flat["coverage"]["miss"] == ["line coverage 50 < 70"]
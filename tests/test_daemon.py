@@ -0,0 +1,109 @@
+"""``adrflow serve``: CLI commands answered by a warm daemon, with fallback."""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import daemon
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CONFIG = """paths:
+  adr_dir: docs/adr
+  dod_file: docs/dod/DoD.yaml
+  reports: reports/
+plugins:
+  discovery: []
+trace:
+  exclude: [".git/", "tools/", "reports/", "**/docs/adr/"]
+  jobs: 1
+gates:
+  include: [adr-trace]
+"""
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _cli(repo: Path, *argv: str, **env: str) -> subprocess.CompletedProcess:
+    environ = {k: v for k, v in os.environ.items() if k not in ("ADRFLOW_TRACE_FILE", "TRACEPARENT")}
+    environ.update(env)
+    return subprocess.run([sys.executable, "tools/cli.py", *argv], cwd=repo, capture_output=True, text=True, env=environ)
+
+
+def _status(repo: Path) -> dict:
+    proc = _cli(repo, "serve", "--status")
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout)
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    _write(tmp_path / ".adrflow.yaml", CONFIG)
+    _write(tmp_path / "docs/adr/ADR-0042-demo.md", "---\nadr_id: ADR-0042\n---\n")
+    _write(tmp_path / "src/app.py", "# ADR" + ": ADR-0042\n")
+    (tmp_path / "tools").symlink_to(ROOT / "tools")
+    return tmp_path
+
+
+@pytest.fixture()
+def server(repo):
+    proc = subprocess.Popen([sys.executable, "tools/cli.py", "serve"], cwd=repo, stderr=subprocess.PIPE, text=True)
+    path = str(repo / "reports/.cache" / daemon.SOCKET_NAME)
+    cwd = os.getcwd()
+    os.chdir(repo)
+    try:
+        assert daemon.wait_for(path), proc.stderr.read() if proc.poll() is not None else "daemon did not start"
+    finally:
+        os.chdir(cwd)
+    yield proc
+    if proc.poll() is None:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def test_commands_are_served_and_memoised_until_files_change(repo, server) -> None:
+    first = _cli(repo, "verify", "--no-json", "--no-exit-code")
+    assert first.returncode == 0, first.stderr
+    report = json.loads((repo / "reports/verify.json").read_text(encoding="utf-8"))
+    assert report["adr-trace"]["ok"] is False  # no test references yet
+    assert _status(repo)["requests"] == 1
+
+    _cli(repo, "verify", "--no-json", "--no-exit-code")
+    assert _status(repo)["memo_hits"] == 1
+
+    generation = _status(repo)["generation"]
+    _write(repo / "tests/test_app.py", "# TEST-ADR" + ": ADR-0042\n")
+    deadline = time.monotonic() + 10
+    while _status(repo)["generation"] == generation and time.monotonic() < deadline:
+        time.sleep(0.05)
+    proc = _cli(repo, "verify", "--no-exit-code")
+    assert json.loads(proc.stdout)["adr-trace"]["ok"] is True
+    status = _status(repo)
+    assert (status["requests"], status["memo_hits"]) == (3, 1)
+
+    suggest = _cli(repo, "suggest")
+    assert json.loads(suggest.stdout) == {"summary": {"ok": True}}
+
+    # Opting out, or another directory, bypasses the daemon.
+    assert _cli(repo, "verify", "--no-json", ADRFLOW_DAEMON="0").returncode == 0
+    assert _status(repo)["requests"] == 4
+
+    assert _cli(repo, "serve", "--stop").returncode == 0
+    server.wait(timeout=10)
+    assert not (repo / "reports/.cache" / daemon.SOCKET_NAME).exists()
+    assert _cli(repo, "verify", "--no-json").returncode == 0  # falls back to running in-process
+
+
+def test_request_without_daemon_returns_none(tmp_path) -> None:
+    assert daemon.request(str(tmp_path / "missing.sock"), "verify") is None
+    (tmp_path / "stale.sock").write_text("", encoding="utf-8")
+    assert daemon.request(str(tmp_path / "stale.sock"), "verify") is None
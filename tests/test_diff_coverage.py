@@ -0,0 +1,141 @@
+"""Diff coverage: changed lines from git intersected with coverage.json as interval sets."""
+from __future__ import annotations
+
+import json
+import random
+import subprocess
+
+import pytest
+
+from diff_coverage import IntervalSet, diff_coverage, git_changed_lines, parse_unified_diff
+from dod_gate import evaluate_dod
+
+
+def test_interval_set_matches_plain_sets() -> None:
+    rng = random.Random(5)
+    for _ in range(200):
+        a = {rng.randint(1, 60) for _ in range(rng.randint(0, 40))}
+        b = {rng.randint(1, 60) for _ in range(rng.randint(0, 40))}
+        left, right = IntervalSet.from_lines(a), IntervalSet.from_lines(b)
+        expand = lambda s: {line for start, end in s for line in range(start, end + 1)}  # noqa: E731
+        assert expand(left & right) == a & b and expand(left | right) == a | b and expand(left - right) == a - b
+        assert len(left) == len(a) and all((line in left) == (line in a) for line in range(0, 62))
+    assert IntervalSet.from_lines([3, 1, 2, 7, 8, 10]).ranges() == [[1, 3], [7, 8], [10, 10]]
+
+
+DIFF = """diff --git a/src/app.py b/src/app.py
+--- a/src/app.py
++++ b/src/app.py
+@@ -3,0 +4,3 @@ def handler():
++    a = 1
++    if a:
++        b = 2
+@@ -20 +23 @@ def other():
+-    x = 0
++    x = 1
+diff --git a/docs/readme.md b/docs/readme.md
+--- a/docs/readme.md
++++ b/docs/readme.md
+@@ -1 +1,2 @@
++new
+diff --git a/src/gone.py b/src/gone.py
+--- a/src/gone.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+"""
+
+def test_hunk_lines_that_look_like_headers() -> None:
+    diff = [
+        "--- a/notes.txt", "+++ b/notes.txt", "@@ -1,2 +1,3 @@",
+        "--- removed line", " context", "+++ added line", "+@@ -9 +9 @@",
+        "@@ -10 +11 @@", "-x", "+y", "\\ No newline at end of file",
+        "--- a/other.py", "+++ b/other.py", "@@ -5,0 +6 @@", "+x = 1",
+    ]
+    assert parse_unified_diff(diff) == {"notes.txt": IntervalSet([1, 3, 11, 11]), "other.py": IntervalSet([6, 6])}
+
+
+COVERAGE = {
+    "meta": {"branch_coverage": True},
+    "files": {
+        "src/app.py": {
+            "executed_lines": [1, 2, 4, 5, 23],
+            "missing_lines": [6, 30],
+            "excluded_lines": [],
+            "executed_branches": [[5, 6]],
+            "missing_branches": [[5, 23], [30, 31]],
+        },
+        "src/untouched.py": {"executed_lines": [1], "missing_lines": [2], "executed_branches": [], "missing_branches": []},
+    },
+    "totals": {"percent_covered": 50.0},
+}
+
+
+def test_changed_lines_against_coverage(tmp_path) -> None:
+    changed = parse_unified_diff(DIFF.splitlines())
+    assert {path: lines.ranges() for path, lines in changed.items()} == {"src/app.py": [[4, 6], [23, 23]], "docs/readme.md": [[1, 2]]}
+
+    (tmp_path / "coverage.json").write_text(json.dumps(COVERAGE), encoding="utf-8")
+    report = diff_coverage(str(tmp_path / "coverage.json"), changed)
+    assert report["files"]["src/app.py"] == {"changed": 4, "coverable": 4, "covered": 3, "missing": [[6, 6]], "branches": 2, "covered_branches": 1}
+    assert (report["line"], report["branch"], report["unmeasured"]) == (75.0, 50.0, ["docs/readme.md"])
+
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "diff_coverage.json").write_text(json.dumps({"head": "c0ffee" * 7, "base": "origin/main", **report}), encoding="utf-8")
+    (tmp_path / "checks.yaml").write_text("coverage:\n  diff_thresholds: {line: 80, branch: 50}\n  diff_base: origin/main\n", encoding="utf-8")
+
+    def verdict(head):
+        return evaluate_dod(str(tmp_path / "DoD.yaml"), str(tmp_path / "checks.yaml"), reports_dir=str(reports), head=head)
+
+    assert verdict("c0ffee" * 7)["diff_coverage"]["miss"] == ["changed-line coverage 75.0 < 80"]
+    assert "diff-coverage: changed-line coverage 75.0 < 80" in verdict(None)["summary"]["miss"]
+
+    # A leftover report from another commit or base does not count.
+    assert verdict("badbad" * 7)["diff_coverage"]["miss"] == ["diff_coverage.json is for commit c0ffeec0ffee, not badbadbadbad"]
+    (reports / "diff_coverage.json").write_text(json.dumps({"base": "origin/dev", **report}), encoding="utf-8")
+    assert verdict(None)["diff_coverage"]["miss"] == [
+        "diff_coverage.json does not record the commit it was computed for",
+        "diff_coverage.json diffs against origin/dev, not origin/main",
+    ]
+
+
+def test_git_changed_lines(tmp_path) -> None:
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    try:
+        git("init", "-q")
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("git unavailable")
+    git("config", "user.email", "dev@example.com")
+    git("config", "user.name", "dev")
+    # Prefixes and quoting from the user's config must not change the paths.
+    git("config", "diff.noprefix", "true")
+    git("config", "diff.mnemonicPrefix", "true")
+    (tmp_path / "mod.py").write_text("".join(f"x{n} = {n}\n" for n in range(10)), encoding="utf-8")
+    git("add", "mod.py")
+    git("commit", "-q", "-m", "base")
+    (tmp_path / "mod.py").write_text("".join(f"x{n} = {n * (2 if n in (2, 3, 7) else 1)}\n" for n in range(10)) + "y = 1\n", encoding="utf-8")
+    (tmp_path / "new.py").write_text("a = 1\nb = 2\n", encoding="utf-8")
+    (tmp_path / "sp ace ü.py").write_text("a = 1\n", encoding="utf-8")
+    git("add", "sp ace ü.py")
+    git("commit", "-q", "-m", "odd name")
+    (tmp_path / "sp ace ü.py").write_text("a = 1\nb = \"\\t\"\n", encoding="utf-8")
+
+    changed = git_changed_lines("HEAD~1", str(tmp_path))
+    assert {path: lines.ranges() for path, lines in changed.items()} == {
+        "mod.py": [[3, 4], [8, 8], [11, 11]], "new.py": [[1, 2]], "sp ace ü.py": [[1, 2]],
+    }
+
+    # Commits landing on the base after the fork are not changes of this branch.
+    (tmp_path / "lib.py").write_text("m = 1\n", encoding="utf-8")
+    git("add", "lib.py")
+    git("commit", "-q", "-m", "fork point")
+    git("checkout", "-q", "-b", "upstream")
+    (tmp_path / "lib.py").write_text("m = 2\n", encoding="utf-8")
+    git("commit", "-q", "-m", "on base", "lib.py")
+    git("checkout", "-q", "-")
+    assert {path: lines.ranges() for path, lines in git_changed_lines("upstream", str(tmp_path)).items()} == {
+        "mod.py": [[3, 4], [8, 8], [11, 11]], "new.py": [[1, 2]], "sp ace ü.py": [[2, 2]],
+    }
+    assert parse_unified_diff(['+++ "b/tab\\there \\303\\274.py"\t', "@@ -0,0 +1 @@"]) == {"tab\there ü.py": IntervalSet([1, 1])}
@@ -0,0 +1,49 @@
+"""Tests for the inotify / polling file watcher."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from fswatch import Watcher
+
+BACKENDS = [False, True]  # polling?
+
+
+def _drain(watcher: Watcher, timeout: float = 2.0) -> set:
+    changed = watcher.poll(timeout)
+    # Bursts may span several reads; collect what arrives right after.
+    while True:
+        more = watcher.poll(0.2)
+        if not more:
+            return changed
+        changed |= more
+
+
+@pytest.mark.parametrize("polling", BACKENDS, ids=["auto", "polling"])
+def test_reports_created_modified_and_removed_files(tmp_path, polling) -> None:
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("a", encoding="utf-8")
+    (tmp_path / "node_modules").mkdir()
+    with Watcher(str(tmp_path), poll_interval=0.05, polling=polling) as watcher:
+        assert watcher.poll(0.1) == set()
+
+        (tmp_path / "src" / "a.py").write_text("changed", encoding="utf-8")
+        (tmp_path / "node_modules" / "ignored.js").write_text("", encoding="utf-8")
+        assert _drain(watcher) == {"src/a.py"}
+
+        (tmp_path / "src" / "pkg").mkdir()
+        (tmp_path / "src" / "pkg" / "b.py").write_text("b", encoding="utf-8")
+        changed = _drain(watcher)
+        assert "src/pkg/b.py" in changed or "src/pkg" in changed
+
+        (tmp_path / "src" / "pkg" / "b.py").write_text("bb", encoding="utf-8")
+        assert _drain(watcher) == {"src/pkg/b.py"}  # the new directory is watched too
+
+        os.unlink(tmp_path / "src" / "a.py")
+        assert _drain(watcher) == {"src/a.py"}
+
+
+def test_polling_fallback_is_explicit(tmp_path) -> None:
+    with Watcher(str(tmp_path), polling=True) as watcher:
+        assert watcher.backend == "polling"
@@ -0,0 +1,120 @@
+"""Tests for the fingerprinted gate result cache."""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from gates import get_gate, register_gate
+from gates.base import Gate, GateResult
+from gates.cache import GateCache
+from gates.scheduler import run_gates
+
+RUNS = []
+
+
+def _gate(key, tmp: Path, cacheable=True):
+    class _Gate(Gate):
+        config_sections = ("demo",)
+
+        def inputs(self, cfg):
+            return [str(tmp / "src"), str(tmp / "input.txt")]
+
+        def outputs(self, cfg):
+            return [str(tmp / "reports" / f"{key}.json")]
+
+        def run(self, cfg):
+            RUNS.append(key)
+            text = (tmp / "input.txt").read_text(encoding="utf-8")
+            Path(self.outputs(cfg)[0]).write_text(json.dumps({"text": text}), encoding="utf-8")
+            return GateResult(ok=text == "good", miss=[] if text == "good" else ["bad input"])
+
+    _Gate.key = key
+    _Gate.cacheable = cacheable
+    register_gate(_Gate)
+    return key
+
+
+def _plain(entry):
+    return {k: v for k, v in entry.items() if k != "metrics"}
+
+
+def _setup(tmp_path: Path) -> None:
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "input.txt").write_text("good", encoding="utf-8")
+
+
+def test_unchanged_inputs_are_served_from_cache(tmp_path) -> None:
+    _setup(tmp_path)
+    key = _gate("t-cached", tmp_path)
+    cfg = {"demo": {"level": 1}}
+    cache = lambda: GateCache(str(tmp_path / "cache"), reports_dir=str(tmp_path / "reports"))  # noqa: E731
+
+    RUNS.clear()
+    first = run_gates(cfg, [key], cache=cache())
+    assert _plain(first[key]) == {"ok": True, "miss": []} and RUNS == [key]
+
+    # Same content with a new mtime, and a deleted artifact: still a hit,
+    # and the artifact is restored from the cache.
+    os.utime(tmp_path / "src" / "a.py", ns=(0, 10**9))
+    (tmp_path / "reports" / f"{key}.json").unlink()
+    second = run_gates(cfg, [key], cache=cache())
+    assert _plain(second[key]) == {"ok": True, "miss": [], "cached": True} and RUNS == [key]
+    assert json.loads((tmp_path / "reports" / f"{key}.json").read_text()) == {"text": "good"}
+
+    (tmp_path / "input.txt").write_text("bad!", encoding="utf-8")
+    assert _plain(run_gates(cfg, [key], cache=cache())[key]) == {"ok": False, "miss": ["bad input"]}
+    (tmp_path / "src" / "b.py").write_text("", encoding="utf-8")
+    run_gates(cfg, [key], cache=cache())
+    run_gates({"demo": {"level": 2}}, [key], cache=cache())
+    assert RUNS == [key] * 4
+
+
+def test_gates_must_opt_in(tmp_path) -> None:
+    _setup(tmp_path)
+    key = _gate("t-uncached", tmp_path, cacheable=False)
+    RUNS.clear()
+    for _ in range(2):
+        run_gates({}, [key], cache=GateCache(str(tmp_path / "cache")))
+    assert RUNS == [key, key]
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path) -> None:
+    _setup(tmp_path)
+    key = _gate("t-lru", tmp_path)
+    root = str(tmp_path / "cache")
+    for level in range(3):
+        run_gates({"demo": level}, [key], cache=GateCache(root))
+    entries = sorted(Path(root).glob("t-lru-*.json"), key=lambda p: p.stat().st_mtime_ns)
+    size = entries[0].stat().st_size
+    os.utime(entries[0], ns=(0, 1))  # level 0 is the oldest ...
+    os.utime(entries[1], ns=(0, 2))
+    run_gates({"demo": 0}, [key], cache=GateCache(root))  # ... until it is hit again
+
+    GateCache(root, max_bytes=2 * size).evict()
+    assert sorted(Path(root).glob("t-lru-*.json")) == sorted([entries[0], entries[2]])
+
+
+def test_dod_gate_fingerprint_follows_head_and_diff_base(tmp_path, monkeypatch) -> None:
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    try:
+        git("init", "-q")
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip("git unavailable")
+    monkeypatch.chdir(tmp_path)
+    git("-c", "user.email=dev@example.com", "-c", "user.name=dev", "commit", "-q", "--allow-empty", "-m", "one")
+    (tmp_path / "governance").mkdir()
+    (tmp_path / "governance/ci_checks.yaml").write_text("coverage:\n  diff_base: origin/main\n", encoding="utf-8")
+    gate = get_gate("dod-gate")
+    first = gate.fingerprint_extra({})
+    assert first["diff_base"] == "origin/main" and len(first["head"]) == 40
+
+    git("-c", "user.email=dev@example.com", "-c", "user.name=dev", "commit", "-q", "--allow-empty", "-m", "two")
+    assert gate.fingerprint_extra({})["head"] != first["head"]
@@ -0,0 +1,93 @@
+"""In-process vs subprocess execution of the builtin gates."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from dod_gate import evaluate_dod
+from gates.scheduler import run_gates
+
+ROOT = Path(__file__).resolve().parents[1]
+KEYS = ["adr-trace", "log-vs-adr", "dod-gate"]
+REPORTS = ["adr_trace.json", "adr_log_check.json", "dod_gate.json"]
+
+ADR = """---
+adr_id: ADR-0042
+title: demo
+observability_signals:
+  logs:
+    - level: INFO
+      event: "demo.done"
+      must_have_fields: [trace_id]
+---
+body
+"""
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.fixture()
+def repo(tmp_path, monkeypatch):
+    _write(tmp_path / "docs/adr/ADR-0042-demo.md", ADR)
+    _write(tmp_path / "src/app.py", "# ADR" + ": ADR-0042\n")
+    _write(tmp_path / "tests/test_app.py", "# TEST-ADR" + ": ADR-0042\n")
+    _write(tmp_path / "reports/debug.log.jsonl", json.dumps({"level": "INFO", "event": "demo.done", "trace_id": "t"}) + "\n")
+    _write(tmp_path / "reports/coverage.json", json.dumps({"line": 90, "branch": 80}))
+    _write(tmp_path / "governance/ci_checks.yaml", "coverage:\n  thresholds: {line: 85}\n")
+    _write(tmp_path / "docs/dod/DoD.yaml", "evidence: {}\n")
+    # Subprocess mode runs ``python tools/<tool>.py`` relative to the cwd.
+    (tmp_path / "tools").symlink_to(ROOT / "tools")
+    monkeypatch.chdir(tmp_path)
+    return {
+        "paths": {"adr_dir": "docs/adr", "dod_file": "docs/dod/DoD.yaml", "reports": "reports/"},
+        "trace": {"exclude": ["tools/", "reports/", "**/docs/adr/"], "jobs": 1},
+    }
+
+
+def _snapshot(root: Path) -> dict:
+    out = {}
+    for name in REPORTS:
+        data = json.loads((root / "reports" / name).read_text(encoding="utf-8"))
+        data.pop("index", None)  # cache hit/miss counters differ between runs
+        out[name] = data
+    return out
+
+
+def test_inprocess_matches_subprocess(repo, tmp_path) -> None:
+    sub = run_gates(repo, KEYS, execution="subprocess")
+    sub_reports = _snapshot(tmp_path)
+    inproc = run_gates(repo, KEYS, execution="inprocess")
+    metrics = {key: (inproc[key].pop("metrics"), sub[key].pop("metrics")) for key in KEYS}
+    assert inproc == sub
+    assert _snapshot(tmp_path) == sub_reports
+    assert inproc["adr-trace"]["ok"] and inproc["log-vs-adr"]["ok"]
+    # Both modes report the same tool phases, the subprocess one via --timings.
+    for key, (inproc_metrics, sub_metrics) in metrics.items():
+        assert set(inproc_metrics["phases"]) == set(sub_metrics["phases"]), key
+    assert {"walk", "scan"} <= set(metrics["adr-trace"][0]["phases"])
+    assert {"parse", "match"} <= set(metrics["log-vs-adr"][0]["phases"])
+    sub_dod = metrics["dod-gate"][1]
+    assert sub_dod["cpu_ms"] > 0 and sub_dod["max_rss_kb"] > 0
+
+
+def test_dod_uses_reports_passed_in_memory(repo, tmp_path) -> None:
+    on_disk = evaluate_dod("docs/dod/DoD.yaml", "governance/ci_checks.yaml", "reports")
+    assert on_disk["coverage"]["ok"] and not on_disk["adr_trace"]["ok"]
+    verdict = evaluate_dod(
+        "docs/dod/DoD.yaml",
+        "governance/ci_checks.yaml",
+        "reports",
+        reports={"adr_trace.json": {"pass": True, "miss": []}, "coverage.json": {"line": 10}},
+    )
+    assert verdict["adr_trace"]["ok"]
+    assert verdict["coverage"]["miss"] == ["line coverage 10 < 85"]
+
+
+def test_unknown_execution_mode_is_rejected(repo) -> None:
+    with pytest.raises(ValueError, match="execution mode"):
+        run_gates(repo, KEYS, execution="docker")
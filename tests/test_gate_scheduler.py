@@ -0,0 +1,79 @@
+"""Tests for the DAG gate scheduler used by ``adrflow verify``."""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from gates import register_gate
+from gates.base import Gate, GateResult
+from gates.scheduler import build_dag, run_gates
+
+EVENTS = []
+LOCK = threading.Lock()
+
+
+def _gate(key, *, ok=True, delay=0.0, inputs=(), outputs=(), depends_on=()):
+    class _Gate(Gate):
+        def run(self, cfg):
+            with LOCK:
+                EVENTS.append(("start", key))
+            time.sleep(delay)
+            with LOCK:
+                EVENTS.append(("end", key))
+            return GateResult(ok=ok, miss=[] if ok else [f"{key} failed"])
+
+        def inputs(self, cfg):
+            return list(inputs)
+
+        def outputs(self, cfg):
+            return list(outputs)
+
+    _Gate.key = key
+    _Gate.depends_on = tuple(depends_on)
+    register_gate(_Gate)
+    return key
+
+
+def _plain(entry):
+    return {k: v for k, v in entry.items() if k != "metrics"}
+
+
+def test_independent_gates_overlap_and_consumers_wait() -> None:
+    EVENTS.clear()
+    a = _gate("t-trace", delay=0.2, outputs=["reports/t_trace.json"])
+    b = _gate("t-logs", delay=0.2, outputs=["reports/t_logs.json"])
+    c = _gate("t-dod", inputs=["reports/./t_trace.json", "reports/t_logs.json"])
+
+    assert build_dag([c, a, b], {}) == {c: {a, b}, a: set(), b: set()}
+    started = time.perf_counter()
+    result = run_gates({}, [c, a, b], jobs=3)
+    assert time.perf_counter() - started < 0.35
+    assert list(result) == [c, a, b]
+    assert EVENTS.index(("start", c)) > max(EVENTS.index(("end", a)), EVENTS.index(("end", b)))
+
+
+def test_fail_fast_cancels_gates_not_started() -> None:
+    a = _gate("t-bad", ok=False)
+    b = _gate("t-after", depends_on=["t-bad"])
+    result = run_gates({}, [a, b], jobs=2, fail_fast=True)
+    assert _plain(result[a]) == {"ok": False, "miss": ["t-bad failed"]}
+    assert result[b]["cancelled"] and not result[b]["ok"]
+    assert _plain(run_gates({}, [a, b], jobs=2)[b]) == {"ok": True, "miss": []}
+
+
+def test_cycles_are_rejected() -> None:
+    a = _gate("t-cycle-a", depends_on=["t-cycle-b"])
+    b = _gate("t-cycle-b", depends_on=["t-cycle-a"])
+    with pytest.raises(ValueError, match="cycle"):
+        build_dag([a, b], {})
+
+
+def test_entries_carry_metrics_and_profiles(tmp_path) -> None:
+    a = _gate("t-measured", delay=0.05)
+    entry = run_gates({}, [a], profile_dir=str(tmp_path / "profile"))[a]
+    assert entry["metrics"]["wall_ms"] >= 50
+    assert entry["metrics"]["cpu_ms"] < entry["metrics"]["wall_ms"]  # sleeping is not CPU
+    assert entry["metrics"]["max_rss_kb"] > 0
+    assert (tmp_path / "profile" / "t-measured.pstats").stat().st_size > 0
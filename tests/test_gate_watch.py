@@ -0,0 +1,84 @@
+"""``adrflow verify --watch``: which gates a change re-runs, and the loop itself."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import cli
+from gates.scheduler import affected_gates
+
+KEYS = ["adr-trace", "log-vs-adr", "dod-gate"]
+
+ADR = """---
+adr_id: ADR-0042
+title: demo
+observability_signals:
+  logs:
+    - level: INFO
+      event: "demo.done"
+      must_have_fields: [trace_id]
+---
+"""
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.fixture()
+def repo(tmp_path, monkeypatch):
+    _write(tmp_path / "docs/adr/ADR-0042-demo.md", ADR)
+    _write(tmp_path / "src/app.py", "# ADR" + ": ADR-0042\n")
+    _write(tmp_path / "reports/debug.log.jsonl", json.dumps({"level": "INFO", "event": "demo.done", "trace_id": "t"}) + "\n")
+    _write(tmp_path / "governance/ci_checks.yaml", "coverage:\n  thresholds: {line: 0}\n")
+    _write(tmp_path / "docs/dod/DoD.yaml", "evidence: {}\n")
+    monkeypatch.chdir(tmp_path)
+    return {
+        "paths": {"adr_dir": "docs/adr", "dod_file": "docs/dod/DoD.yaml", "reports": "reports/"},
+        "trace": {"exclude": ["tools/", "reports/", "**/docs/adr/"], "jobs": 1},
+        "gates": {"include": KEYS, "cache": False},
+    }
+
+
+@pytest.mark.parametrize(
+    "changed, expected",
+    [
+        (["src/app.py"], ["adr-trace", "dod-gate"]),
+        (["src"], ["adr-trace", "dod-gate"]),
+        (["reports/debug.log.jsonl"], ["log-vs-adr", "dod-gate"]),
+        (["governance/ci_checks.yaml"], ["adr-trace", "dod-gate"]),  # the trace scans it for tags
+        (["reports/coverage.json"], ["dod-gate"]),
+        (["docs/adr/ADR-0042-demo.md"], KEYS),
+        (["."], KEYS),
+        (["reports/adr_trace.json", "reports/dod_gate.json"], []),  # written by the gates themselves
+        (["tools/helper.py", "reports/unrelated.txt"], []),  # excluded from the trace walk
+    ],
+)
+def test_affected_gates(repo, changed, expected) -> None:
+    assert affected_gates(repo, KEYS, changed) == expected
+
+
+def test_watch_reruns_only_affected_gates(repo, tmp_path) -> None:
+    options = {"jobs": 1, "execution": "inprocess", "use_cache": False}
+    worker = threading.Thread(target=cli._watch, args=(repo, options, 0.1), kwargs={"rounds": 1}, daemon=True)
+    worker.start()
+    verify_path = tmp_path / "reports/verify.json"
+    deadline = time.monotonic() + 20
+    while not verify_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    before = json.loads(verify_path.read_text(encoding="utf-8"))
+    assert before["adr-trace"]["ok"] is False and not before["summary"]["ok"]
+
+    _write(tmp_path / "tests/test_app.py", "# TEST-ADR" + ": ADR-0042\n")
+    worker.join(timeout=20)
+    assert not worker.is_alive()
+    after = json.loads(verify_path.read_text(encoding="utf-8"))
+    assert list(after) == KEYS + ["summary"]
+    assert after["adr-trace"]["ok"] is True
+    assert after["log-vs-adr"] == before["log-vs-adr"]  # not re-run: same metrics
+    assert after["dod-gate"]["metrics"] != before["dod-gate"]["metrics"]
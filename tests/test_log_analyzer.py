@@ -0,0 +1,273 @@
+"""Tests for the single-pass log vs ADR checker."""
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.log_analyzer import check_logs_against_specs, iter_jsonl
+
+
+def _reference(adr, logs_path):
+    """Per-ADR full scan, as the analyzer used to work."""
+    missing, samples = [], []
+    log_requirements = (adr.get("observability_signals") or {}).get("logs") or []
+    entries = list(iter_jsonl(logs_path) or [])
+    if not entries and log_requirements:
+        return {"pass": False, "miss": [f"logs file not found or empty: {logs_path}"], "sample": []}
+    for requirement in log_requirements:
+        want_level, want_event = requirement.get("level"), requirement.get("event")
+        need_fields = set(requirement.get("must_have_fields") or [])
+        for entry in entries:
+            if want_level and entry.get("level") != want_level:
+                continue
+            if want_event and entry.get("event") != want_event:
+                continue
+            if not need_fields.issubset(entry.keys()):
+                continue
+            samples.append(entry)
+            break
+        else:
+            missing.append(f"no log event {want_event} with fields {sorted(need_fields)}")
+    return {"pass": not missing, "miss": missing, "sample": samples[:3]}
+
+
+def _specs(rng: random.Random, count: int):
+    specs = {}
+    for i in range(count):
+        logs = []
+        for _ in range(rng.randint(0, 4)):
+            requirement = {"must_have_fields": rng.sample(["trace_id", "provider", "outcome", "latency_ms"], rng.randint(0, 3))}
+            if rng.random() < 0.8:
+                requirement["event"] = f"evt.{rng.randint(0, 9)}"
+            if rng.random() < 0.6:
+                requirement["level"] = rng.choice(["DEBUG", "INFO", "ERROR"])
+            logs.append(requirement)
+        specs[f"ADR-{i:04d}"] = {"adr_id": f"ADR-{i:04d}", "observability_signals": {"logs": logs}}
+    return specs
+
+
+def test_single_pass_matches_per_adr_scan(tmp_path) -> None:
+    rng = random.Random(7)
+    logs = tmp_path / "debug.log.jsonl"
+    lines = []
+    for n in range(400):
+        entry = {"n": n, "event": f"evt.{rng.randint(0, 12)}"}
+        if rng.random() < 0.9:
+            entry["level"] = rng.choice(["DEBUG", "INFO", "ERROR", "WARN"])
+        for field in ("trace_id", "provider", "outcome", "latency_ms"):
+            if rng.random() < 0.5:
+                entry[field] = field
+        lines.append(json.dumps(entry))
+    lines.insert(5, "not json")
+    logs.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    specs = _specs(rng, 60)
+    results = check_logs_against_specs(specs, str(logs))
+    assert results == {adr_id: _reference(spec, str(logs)) for adr_id, spec in specs.items()}
+
+
+def test_missing_log_file_reports_every_adr_with_requirements(tmp_path) -> None:
+    specs = _specs(random.Random(1), 10)
+    missing = str(tmp_path / "absent.jsonl")
+    results = check_logs_against_specs(specs, missing)
+    assert results == {adr_id: _reference(spec, missing) for adr_id, spec in specs.items()}
+
+
+def test_prefilter_skips_lines_without_changing_results(tmp_path) -> None:
+    from tools.log_analyzer import LogMatcher
+
+    logs = tmp_path / "debug.log.jsonl"
+    lines = [json.dumps({"level": "INFO", "event": f"noise.{n}", "trace_id": "t"}) for n in range(50)]
+    lines.append(json.dumps({"level": "DEBUG", "event": "oauth.exchange", "trace_id": "t"}))
+    logs.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    specs = {
+        "ADR-0001": {"observability_signals": {"logs": [{"level": "DEBUG", "event": "oauth.exchange", "must_have_fields": ["trace_id"]}]}},
+        "ADR-0002": {"observability_signals": {"logs": [{"event": "never.logged"}]}},
+    }
+    assert check_logs_against_specs(specs, str(logs)) == {k: _reference(v, str(logs)) for k, v in specs.items()}
+
+    matcher = LogMatcher(specs)
+    assert not matcher.may_match(lines[0].encode())
+    assert matcher.may_match(lines[-1].encode())
+
+    # Other valid escapes of the event name are not missed.
+    escaped = tmp_path / "escaped.jsonl"
+    escaped.write_text(lines[0] + '\n{"level": "DEBUG", "event": "oauth\\u002eexchange", "trace_id": "t"}\n', encoding="utf-8")
+    assert check_logs_against_specs(specs, str(escaped))["ADR-0001"]["pass"]
+
+    only_noise = tmp_path / "noise.jsonl"
+    only_noise.write_text("\n".join(lines[:3]) + "\n", encoding="utf-8")
+    assert check_logs_against_specs(specs, str(only_noise)) == {
+        k: _reference(v, str(only_noise)) for k, v in specs.items()
+    }
+
+
+def test_rotated_compressed_shards_parallel_matches_sequential(tmp_path) -> None:
+    import bz2
+    import gzip
+
+    rng = random.Random(3)
+    plain = []
+    for shard in range(4):
+        lines = [
+            json.dumps({"shard": shard, "n": n, "level": rng.choice(["DEBUG", "INFO"]), "event": f"evt.{rng.randint(0, 9)}", "trace_id": "t"})
+            for n in range(300)
+        ]
+        payload = ("\n".join(lines) + "\n").encode()
+        if shard == 0:
+            (tmp_path / "debug.log.jsonl").write_bytes(payload)
+        elif shard == 1:
+            (tmp_path / "debug.log.jsonl.1.gz").write_bytes(gzip.compress(payload))
+        else:
+            (tmp_path / f"debug.log.jsonl.{shard}.bz2").write_bytes(bz2.compress(payload))
+        plain.extend(lines)
+    combined = tmp_path / "combined.jsonl"
+    combined.write_text("\n".join(plain) + "\n", encoding="utf-8")
+
+    specs = _specs(rng, 30)
+    pattern = str(tmp_path / "debug.log.jsonl*")
+    sequential = check_logs_against_specs(specs, [pattern], jobs=1)
+    assert sequential == {adr_id: _reference(spec, str(combined)) for adr_id, spec in specs.items()}
+    assert check_logs_against_specs(specs, [pattern], jobs=3) == sequential
+    timings: dict = {}
+    assert check_logs_against_specs(specs, [pattern], jobs=1, timings=timings) == sequential
+    assert set(timings) == {"parse", "match"}
+
+
+def test_follow_resumes_from_checkpoint(tmp_path) -> None:
+    from tools.log_analyzer import follow_logs
+
+    logs = tmp_path / "debug.log.jsonl"
+    checkpoint = str(tmp_path / "follow.json")
+    specs = {
+        "ADR-0001": {"observability_signals": {"logs": [
+            {"level": "DEBUG", "event": "oauth.exchange", "must_have_fields": ["trace_id"]},
+            {"event": "oauth.refresh"},
+        ]}},
+    }
+    first = json.dumps({"level": "DEBUG", "event": "oauth.exchange", "trace_id": "t1"})
+    logs.write_text(first + "\n" + '{"event": "oauth.re', encoding="utf-8")
+
+    partial = follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)
+    assert not partial["ADR-0001"]["pass"]
+    assert partial["ADR-0001"]["miss"] == ["no log event oauth.refresh with fields []"]
+
+    # The follower restarts: the first line must not be re-read, the partial
+    # line is completed by the writer and picked up from the saved offset.
+    with logs.open("a", encoding="utf-8") as handle:
+        handle.write('fresh"}\n')
+    resumed = follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=5, poll_interval=0.01)
+    assert resumed["ADR-0001"]["pass"]
+    assert resumed["ADR-0001"]["sample"][0]["trace_id"] == "t1"
+    assert json.loads(Path(checkpoint).read_text())["files"][str(logs)]["offset"] == logs.stat().st_size
+
+
+def test_follow_drops_matches_of_a_replaced_log(tmp_path) -> None:
+    from tools.log_analyzer import follow_logs
+
+    logs = tmp_path / "debug.log.jsonl"
+    checkpoint = str(tmp_path / "follow.json")
+    specs = {"ADR-0001": {"observability_signals": {"logs": [{"event": "oauth.exchange"}]}}}
+    logs.write_text('{"event": "oauth.exchange", "n": 1}\n', encoding="utf-8")
+    assert follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)["ADR-0001"]["pass"]
+
+    # Replaced by a log of the same size that lacks the event: the old sample must not survive.
+    logs.unlink()
+    logs.write_text('{"event": "other", "nnnnnnnn": 1}\n', encoding="utf-8")
+    replaced = follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)["ADR-0001"]
+    assert not replaced["pass"] and replaced["miss"] == ["no log event oauth.exchange with fields []"]
+
+    # Appending to the same file keeps what was read and picks up the new line.
+    with logs.open("a", encoding="utf-8") as handle:
+        handle.write('{"event": "oauth.exchange", "n": 2}\n')
+    assert follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)["ADR-0001"]["sample"][0]["n"] == 2
+
+    # Truncated and rewritten in place (same inode).
+    logs.write_text('{"event": "other"}\n', encoding="utf-8")
+    assert not follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)["ADR-0001"]["pass"]
+
+
+def test_follow_reports_missing_requirements_for_filtered_logs(tmp_path) -> None:
+    from tools.log_analyzer import follow_logs
+
+    logs = tmp_path / "debug.log.jsonl"
+    checkpoint = str(tmp_path / "follow.json")
+    specs = {"ADR-0001": {"observability_signals": {"logs": [{"event": "oauth.refresh"}]}}}
+    # No line mentions the event, so the byte prefilter skips them all.
+    logs.write_text('{"event": "other"}\n{"event": "another"}\n', encoding="utf-8")
+
+    expected = ["no log event oauth.refresh with fields []"]
+    assert follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)["ADR-0001"]["miss"] == expected
+    # Restored from the checkpoint, with nothing new to read.
+    assert follow_logs(specs, str(logs), checkpoint=checkpoint, deadline=0, poll_interval=0)["ADR-0001"]["miss"] == expected
+
+
+def test_columnar_cache_matches_streaming_check(tmp_path, monkeypatch) -> None:
+    from tools import log_columns
+
+    rng = random.Random(11)
+    logs = tmp_path / "debug.log.jsonl"
+    lines = []
+    for n in range(500):
+        entry = {"n": n, "event": f"evt.{rng.randint(0, 12)}", "latency_ms": rng.randint(1, 500)}
+        if rng.random() < 0.9:
+            entry["level"] = rng.choice(["DEBUG", "INFO", "ERROR", "WARN"])
+        for field in ("trace_id", "provider", "outcome"):
+            if rng.random() < 0.5:
+                entry[field] = f"{field}-{rng.randint(0, 3)}"
+        lines.append(json.dumps(entry))
+    lines[10:10] = ["[1, 2]", "garbage"]
+    logs.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    specs = _specs(rng, 40)
+    cache = str(tmp_path / "cols")
+
+    expected = check_logs_against_specs(specs, str(logs))
+    assert log_columns.check_logs_columnar(specs, str(logs), cache) == expected
+    assert len(list((tmp_path / "cols").iterdir())) == 1
+    assert log_columns.check_logs_columnar(specs, str(logs), cache) == expected
+
+    columns = log_columns.load_columns(str(logs), cache)
+    assert columns.rows == 501
+    errors = columns.mask(level="ERROR", fields=["provider"])
+    assert [r for r in columns.iter_rows(errors)] == [
+        i for i, line in enumerate(l for l in lines if l != "garbage")
+        if line.startswith("{") and json.loads(line).get("level") == "ERROR" and "provider" in json.loads(line)
+    ]
+    assert list(columns.column("latency_ms"))[0] == json.loads(lines[0])["latency_ms"]
+    # trace_id is hashed into a column file, not dictionary-encoded into meta.json.
+    traced = [i for i, line in enumerate(l for l in lines if l != "garbage") if '"trace_id": "trace_id-2"' in line]
+    hashes = list(columns.column("trace_id"))
+    assert [i for i, value in enumerate(hashes) if value == log_columns.value_hash("trace_id-2")] == traced
+    meta = json.loads(next((tmp_path / "cols").iterdir()).joinpath("meta.json").read_text())
+    assert sorted(meta["values"]) == ["event", "level"]
+
+    # Samples are re-read through one handle per log, not one per matched requirement.
+    opened = []
+    real_open = log_columns.open_log
+    monkeypatch.setattr(log_columns, "open_log", lambda path: opened.append(path) or real_open(path))
+    assert log_columns.check_logs_columnar(specs, str(logs), cache) == expected
+    assert opened == [str(logs)]
+    monkeypatch.undo()
+
+    # Dictionary lookups keep True and 1 apart, like the streaming matcher.
+    typed = tmp_path / "typed.log.jsonl"
+    typed.write_text('{"level": true, "event": "e"}\n{"level": 1, "event": "e"}\n', encoding="utf-8")
+    typed_specs = {"ADR-0002": {"observability_signals": {"logs": [{"level": 1, "event": "e"}]}}}
+    found = log_columns.check_logs_columnar(typed_specs, str(typed), str(tmp_path / "typed-cols"))
+    assert found == check_logs_against_specs(typed_specs, str(typed)) and found["ADR-0002"]["sample"] == [{"level": 1, "event": "e"}]
+    typed_columns = log_columns.load_columns(str(typed), str(tmp_path / "typed-cols"))
+    assert list(typed_columns.iter_rows(typed_columns.mask(level=True))) == [0]
+
+    # Rewritten (rotated) logs get new caches; the least recently used ones are evicted.
+    size = sum(item.stat().st_size for item in next((tmp_path / "cols").iterdir()).iterdir())
+    for n in range(3):
+        logs.write_text("\n".join(lines[: 400 + n]) + "\n", encoding="utf-8")
+        log_columns.check_logs_columnar(specs, str(logs), cache, max_bytes=2 * size)
+    assert len(list((tmp_path / "cols").iterdir())) == 2
+    assert log_columns.load_columns(str(logs), cache).rows == 401
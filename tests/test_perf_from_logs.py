@@ -0,0 +1,79 @@
+"""Tests for deriving performance.json from raw logs."""
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from tools.perf_from_logs import PerfAggregator, QuantileSketch, aggregate_logs
+
+
+def test_sketch_quantiles_within_relative_accuracy() -> None:
+    rng = random.Random(5)
+    values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    halves = [QuantileSketch(relative_accuracy=0.01), QuantileSketch(relative_accuracy=0.01)]
+    for i, value in enumerate(values):
+        sketch.add(value)
+        halves[i % 2].add(value)
+    halves[0].merge(halves[1])
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+        assert halves[0].quantile(q) == sketch.quantile(q)
+
+
+def test_sharded_aggregation_matches_single_pass(tmp_path) -> None:
+    rng = random.Random(9)
+    lines = []
+    for n in range(3000):
+        lines.append(json.dumps({
+            "ts": 1_700_000_000 + n * 0.05,
+            "level": "ERROR" if n % 50 == 0 else "DEBUG",
+            "event": rng.choice(["oauth.exchange", "oauth.refresh"]),
+            "provider": rng.choice(["google", "github"]),
+            "latency_ms": rng.randint(10, 400),
+        }))
+    (tmp_path / "all.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    for shard in range(3):
+        chunk = lines[shard * 1000:(shard + 1) * 1000]
+        (tmp_path / f"shard-{shard}.jsonl").write_text("\n".join(chunk) + "\n", encoding="utf-8")
+
+    single = aggregate_logs([str(tmp_path / "all.jsonl")]).report()
+    sharded = aggregate_logs([str(tmp_path / "shard-*.jsonl")], jobs=2).report()
+    assert sharded == single
+    assert single["error_rate_pct"] == 2.0
+    assert single["throughput_rps"] == round(3000 / (2999 * 0.05), 4)
+    assert set(single["by_event"]) == {"oauth.exchange", "oauth.refresh"}
+    assert sum(w["count"] for w in single["windows"]) == 3000
+
+    state = PerfAggregator.from_dict(json.loads(json.dumps(aggregate_logs([str(tmp_path / "all.jsonl")]).to_dict())))
+    assert state.report() == single
+
+
+def test_windows_and_groups_stay_bounded(tmp_path) -> None:
+    lines = [
+        json.dumps({"ts": 1_700_000_000 + n * 7, "event": f"evt.{n}", "provider": "p", "latency_ms": n % 100})
+        for n in range(2000)
+    ]
+    (tmp_path / "all.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    for shard in range(4):
+        (tmp_path / f"shard-{shard}.jsonl").write_text("\n".join(lines[shard::4]) + "\n", encoding="utf-8")
+    options = {"window_s": 60, "max_windows": 16, "max_groups": 10}
+
+    single = aggregate_logs([str(tmp_path / "all.jsonl")], **options).report()
+    # ~14000 s of logs: 60 s windows double until at most 16 remain.
+    assert single["window_s"] == 960 and len(single["windows"]) <= 16
+    assert sum(w["count"] for w in single["windows"]) == 2000
+    assert len(single["by_event"]) == 11 and single["by_event"]["__other__"]["count"] == 1990
+    assert single["by_provider"]["p"]["count"] == 2000
+
+    sharded = aggregate_logs([str(tmp_path / "shard-*.jsonl")], jobs=2, **options).report()
+    assert sharded["window_s"] == single["window_s"] and sharded["windows"] == single["windows"]
+    assert len(sharded["by_event"]) == 11 and sum(g["count"] for g in sharded["by_event"].values()) == 2000
@@ -0,0 +1,101 @@
+"""Reports read in place from artifact zips, with real files taking precedence."""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+import reports_fs
+from adapters import get_adapter
+from dod_gate import evaluate_dod, referenced_paths
+from log_analyzer import run_log_check
+
+DOD = """evidence:
+  e2e: ["reports/e2e/mlm.json"]
+"""
+
+CHECKS = """coverage:
+  thresholds: {line: 85}
+security:
+  thresholds: {max_critical: 0}
+required_artifacts:
+  logs: [reports/debug.log.jsonl.1.gz]
+  e2e: [reports/e2e/mlm.json]
+"""
+
+
+def _archive(path, files: dict) -> str:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for name, data in files.items():
+            bundle.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture()
+def repo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(reports_fs.ENV_MOUNTS, raising=False)
+    (tmp_path / "docs/adr").mkdir(parents=True)
+    (tmp_path / "docs/adr/ADR-0001.md").write_text(
+        "---\n" + json.dumps({"adr_id": "ADR-0001", "observability_signals": {"logs": [{"level": "INFO", "event": "order.created"}]}}) + "\n---\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "DoD.yaml").write_text(DOD, encoding="utf-8")
+    (tmp_path / "checks.yaml").write_text(CHECKS, encoding="utf-8")
+    log = gzip.compress(b'{"level": "INFO", "event": "order.created"}\n')
+    archive = _archive(tmp_path / "artifact.zip", {
+        "coverage.json": json.dumps({"line": 90}),
+        "security.json": json.dumps({"critical": 0}),
+        "adr_trace.json": json.dumps({"pass": True, "miss": []}),
+        "e2e/mlm.json": json.dumps({"ok": True}),
+        "debug.log.jsonl.1.gz": log,
+        "screenshots/big.png": b"\0" * 4096,
+    })
+    (tmp_path / "reports").mkdir()
+    return tmp_path, archive
+
+
+def test_dod_adapters_and_logs_read_mounted_members(repo) -> None:
+    root, archive = repo
+    reports_fs.mount("reports", archive)
+
+    verdict = evaluate_dod("DoD.yaml", "checks.yaml", reports_dir="reports")
+    assert verdict["coverage"]["ok"] and verdict["security"]["ok"] and verdict["adr_trace"]["ok"]
+    assert verdict["required_artifacts"]["ok"] and verdict["e2e"]["ok"]
+    assert get_adapter("coverage", "coverage-json").read({}) == {"line": 90}
+    assert get_adapter("e2e", "json").read({}) == {"mlm": {"ok": True}}
+    assert [str(p) for p in get_adapter("logger", "jsonl").paths({"paths": {"logs": "reports/debug.log.jsonl.*"}})] == ["reports/debug.log.jsonl.1.gz"]
+
+    report = run_log_check("docs/adr", ["reports/debug.log.jsonl.*"], "out/adr_log_check.json", cfg={})
+    assert report["pass"] and report["items"][0]["sample"][0]["event"] == "order.created"
+    assert list((root / "reports").iterdir()) == []  # nothing was extracted
+
+    # A file written locally shadows the archived member.
+    (root / "reports/coverage.json").write_text(json.dumps({"line": 50}), encoding="utf-8")
+    assert not evaluate_dod("DoD.yaml", "checks.yaml", reports_dir="reports")["coverage"]["ok"]
+
+    reports_fs.unmount()
+    assert not reports_fs.exists("reports/security.json")
+
+
+def test_explicit_members_and_materialize(repo) -> None:
+    root, archive = repo
+    assert reports_fs.read_json(reports_fs.join(archive, "e2e", "mlm.json")) == {"ok": True}
+    assert evaluate_dod("DoD.yaml", "checks.yaml", reports_dir=archive)["coverage"]["ok"]
+    assert reports_fs.glob(archive + "!*.json") == sorted(f"{archive}!{name}" for name in ("adr_trace.json", "coverage.json", "security.json"))
+    assert reports_fs.absolute("artifact.zip!coverage.json") == f"{root / 'artifact.zip'}!coverage.json"
+
+    with reports_fs.mounted("reports", archive):
+        written = reports_fs.materialize(referenced_paths("DoD.yaml", "checks.yaml", "reports"))
+    assert reports_fs.ENV_MOUNTS not in os.environ
+    assert sorted(written) == ["reports/adr_trace.json", "reports/coverage.json", "reports/debug.log.jsonl.1.gz", "reports/e2e/mlm.json", "reports/security.json"]
+    assert not (root / "reports/screenshots").exists()
+    with gzip.open(root / "reports/debug.log.jsonl.1.gz") as handle:
+        assert json.load(io.TextIOWrapper(handle))["event"] == "order.created"
+
+    with pytest.raises(ValueError, match="not a zip"):
+        reports_fs.mount("reports", "DoD.yaml")
@@ -0,0 +1,76 @@
+"""Per-service verification of a monorepo: roots, ADR subsets, reports and modes."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import cli
+import services
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _adr(number: str, service: str = "") -> str:
+    return f"---\nadr_id: ADR-{number}\n" + (f"service: {service}\n" if service else "") + "---\n"
+
+
+@pytest.fixture()
+def repo(tmp_path, monkeypatch):
+    _write(tmp_path / "docs/adr/ADR-0001-api.md", _adr("0001", "api"))
+    _write(tmp_path / "docs/adr/ADR-0002-web.md", _adr("0002", "web"))
+    _write(tmp_path / "docs/adr/ADR-0003-shared.md", _adr("0003"))
+    for adr in ("0001", "0003"):
+        _write(tmp_path / f"services/api/adr_{adr}.py", "# ADR" + f": ADR-{adr}\n")
+        _write(tmp_path / f"services/api/tests/test_{adr}.py", "# TEST-ADR" + f": ADR-{adr}\n")
+    _write(tmp_path / "services/web/app.py", "# ADR" + ": ADR-0002\n")  # no tests, ADR-0003 not referenced
+    monkeypatch.chdir(tmp_path)
+    return {
+        "repo": {"type": "mono", "services": ["api", "web"], "jobs": 2},
+        "paths": {"adr_dir": "docs/adr", "reports": "reports/"},
+        "plugins": {"discovery": []},
+        "trace": {"jobs": 1},
+        "gates": {"include": ["adr-trace"], "cache": False},
+        "enforcement_matrix": {"web": "report-only"},
+    }
+
+
+def test_service_cfg_defaults(repo) -> None:
+    derived = services.service_cfg(repo, "web")
+    assert derived["paths"]["reports"] == str(Path("reports/web"))
+    assert derived["service"] == {"name": "web", "root": str(Path("services/web")), "mode": "report-only"}
+    assert services.service_cfg({**repo, "repo": {"type": "mono", "services": {"api": {"root": "."}}}}, "api")["service"]["root"] == "."
+    with pytest.raises(ValueError, match="unknown service 'db'"):
+        services.service_cfg(repo, "db")
+
+
+def test_verify_runs_each_service_on_its_own_tree(repo, tmp_path) -> None:
+    payload = cli._verify_payload(repo, execution="inprocess")
+    assert list(payload) == ["api", "web", "summary"]
+    assert payload["api"]["ok"] is True and payload["api"]["blocking"] is True
+    assert payload["web"]["ok"] is False and payload["web"]["blocking"] is False
+    assert payload["web"]["miss"] and all(miss.startswith("adr-trace: ") for miss in payload["web"]["miss"])
+    # The failing service is report-only, so the summary still passes.
+    assert payload["summary"] == {"ok": True, "services": {"api": True, "web": False}}
+    assert json.loads((tmp_path / "reports/verify.json").read_text(encoding="utf-8")) == payload
+
+    api_trace = json.loads((tmp_path / "reports/api/adr_trace.json").read_text(encoding="utf-8"))
+    web_trace = json.loads((tmp_path / "reports/web/adr_trace.json").read_text(encoding="utf-8"))
+    assert "ADR-0002" not in json.dumps(api_trace)
+    assert "ADR-0001" not in json.dumps(web_trace) and "ADR-0003" in json.dumps(web_trace)
+
+
+def test_single_service_and_blocking_mode(repo) -> None:
+    repo["enforcement_matrix"] = {}
+    payload = cli._verify_payload(repo, service="web", execution="inprocess")
+    assert list(payload) == ["web", "summary"]
+    assert payload["summary"] == {"ok": False, "services": {"web": False}}
+
+    with pytest.raises(ValueError, match="unknown service"):
+        cli._verify_payload(repo, service="db")
+    with pytest.raises(ValueError, match="--service needs"):
+        cli._verify_payload({**repo, "repo": {}}, service="api")
@@ -0,0 +1,98 @@
+"""``--shard i/N`` partial reports merge into the single-node reports, byte for byte."""
+from __future__ import annotations
+
+import gzip
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+import sharding
+from adr_trace import run_trace
+from log_analyzer import run_log_check
+from merge_reports import merge_reports
+
+SHARDS = 3
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    rng = random.Random(11)
+    for n in range(6):
+        requirements = [
+            {"level": rng.choice(["INFO", "DEBUG"]), "event": f"evt.{rng.randint(0, 7)}", "must_have_fields": rng.sample(["trace_id", "outcome"], rng.randint(0, 2))}
+            for _ in range(rng.randint(0, 3))
+        ]
+        _write(tmp_path / f"docs/adr/ADR-{n:04d}.md", "---\n" + json.dumps({"adr_id": f"ADR-{n:04d}", "observability_signals": {"logs": requirements}}) + "\n---\n")
+    for n in range(60):
+        tags = "".join(("# TEST-ADR" if rng.random() < 0.3 else "# ADR") + f": ADR-{rng.randint(0, 6):04d}\n" for _ in range(rng.randint(0, 3)))
+        _write(tmp_path / f"src/pkg{n % 4}/mod_{n}.py", tags)
+    for shard in range(5):
+        lines = "".join(
+            json.dumps({"level": rng.choice(["INFO", "DEBUG"]), "event": f"evt.{rng.randint(0, 9)}", "shard": shard, "n": n,
+                        **({"trace_id": "t"} if rng.random() < 0.5 else {}), **({"outcome": "ok"} if rng.random() < 0.5 else {})}) + "\n"
+            for n in range(40)
+        )
+        name = tmp_path / f"logs/debug.log.jsonl.{shard}"
+        if shard % 2:
+            Path(f"{name}.gz").parent.mkdir(parents=True, exist_ok=True)
+            Path(f"{name}.gz").write_bytes(gzip.compress(lines.encode()))
+        else:
+            _write(name, lines)
+    return tmp_path
+
+
+def test_parse_and_partition() -> None:
+    assert sharding.parse_shard("2/4") == (2, 4)
+    for bad in ("0/4", "5/4", "2", "a/b", "1/0"):
+        with pytest.raises(ValueError):
+            sharding.parse_shard(bad)
+    keys = [f"src/mod_{n}.py" for n in range(200)]
+    owners = [[key for key in keys if sharding.owns(key, (index, 4))] for index in range(1, 5)]
+    assert sorted(sum(owners, [])) == sorted(keys) and all(owners)
+    assert sharding.owns("./src/mod_1.py", (sharding.shard_of("src/mod_1.py", 4), 4))
+
+
+def test_merged_trace_is_byte_identical(repo) -> None:
+    src, adr = str(repo / "src"), str(repo / "docs/adr")
+    single = repo / "single/adr_trace.json"
+    run_trace(src, adr, str(single), jobs=1)
+    partials = []
+    for index in range(1, SHARDS + 1):
+        out = repo / f"shards/trace.{index}.json"
+        run_trace(src, adr, str(out), jobs=1, shard=(index, SHARDS))
+        partials.append(str(out))
+
+    summary = merge_reports(partials, str(repo / "merged"))
+    assert summary["adr_trace"]["shards"] == SHARDS
+    assert (repo / "merged/adr_trace.json").read_bytes() == single.read_bytes()
+
+    with pytest.raises(ValueError, match="--shard cannot be combined"):
+        run_trace(src, adr, str(repo / "x.json"), changes=[], shard=(1, 2))
+
+
+def test_merged_log_check_is_byte_identical(repo) -> None:
+    adr, logs = str(repo / "docs/adr"), [str(repo / "logs/debug.log.jsonl.*")]
+    single = repo / "single/adr_log_check.json"
+    run_log_check(adr, logs, str(single), cfg={})
+    partials = []
+    for index in range(1, SHARDS + 1):
+        out = repo / f"shards/logs.{index}.json"
+        run_log_check(adr, logs, str(out), jobs=2 if index == 1 else 1, cfg={}, shard=(index, SHARDS))
+        partials.append(str(out))
+
+    merge_reports(partials, str(repo / "merged"), cfg={})
+    assert (repo / "merged/adr_log_check.json").read_bytes() == single.read_bytes()
+
+    with pytest.raises(ValueError, match="missing shards 3/3"):
+        merge_reports(partials[:2], str(repo / "merged"), cfg={})
+    with pytest.raises(ValueError, match="duplicate"):
+        merge_reports(partials + partials[:1], str(repo / "merged"), cfg={})
+    with pytest.raises(ValueError, match="not a partial report"):
+        merge_reports([str(single)], str(repo / "merged"), cfg={})
@@ -0,0 +1,85 @@
+"""Span tracing: OTLP/JSON lines and trace context across gate subprocesses."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+import tracing
+from gates.scheduler import run_gates
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _spans(path: Path) -> list:
+    spans = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        request = json.loads(line)
+        (resource,) = request["resourceSpans"]
+        (scope,) = resource["scopeSpans"]
+        spans.extend(scope["spans"])
+    return spans
+
+
+def _attrs(span: dict) -> dict:
+    return {item["key"]: next(iter(item["value"].values())) for item in span["attributes"]}
+
+
+@pytest.fixture()
+def trace_file(tmp_path, monkeypatch) -> Path:
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setenv(tracing.ENV_FILE, str(path))
+    monkeypatch.delenv(tracing.ENV_PARENT, raising=False)
+    return path
+
+
+def test_spans_nest_and_record_errors(trace_file) -> None:
+    with tracing.span("outer", **{"adrflow.n": 1}):
+        with pytest.raises(RuntimeError):
+            with tracing.span("inner"):
+                raise RuntimeError("boom")
+    inner, outer = _spans(trace_file)
+    assert inner["traceId"] == outer["traceId"] and inner["parentSpanId"] == outer["spanId"]
+    assert "parentSpanId" not in outer
+    assert inner["status"] == {"code": 2, "message": "RuntimeError: boom"} and outer["status"] == {"code": 1}
+    assert _attrs(outer) == {"adrflow.n": "1"}
+    assert int(outer["endTimeUnixNano"]) >= int(inner["endTimeUnixNano"])
+
+
+def test_disabled_tracing_writes_nothing(tmp_path, monkeypatch) -> None:
+    monkeypatch.delenv(tracing.ENV_FILE, raising=False)
+    with tracing.span("quiet"):
+        assert tracing.child_env().get(tracing.ENV_PARENT) is None
+    assert tracing.configure({"tracing": {"enabled": False}}) is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_remote_parent_is_taken_from_traceparent(trace_file, monkeypatch) -> None:
+    parent = tracing.new_traceparent()
+    monkeypatch.setenv(tracing.ENV_PARENT, parent)
+    with tracing.span("child"):
+        pass
+    (child,) = _spans(trace_file)
+    assert (child["traceId"], child["parentSpanId"]) == tracing.parse_traceparent(parent)
+
+
+def test_gate_subprocesses_join_the_trace(trace_file, tmp_path, monkeypatch) -> None:
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("# ADR" + ": ADR-0042\n", encoding="utf-8")
+    (tmp_path / "docs" / "adr").mkdir(parents=True)
+    (tmp_path / "tools").symlink_to(ROOT / "tools")
+    monkeypatch.chdir(tmp_path)
+    cfg = {
+        "paths": {"adr_dir": "docs/adr", "reports": "reports/"},
+        "trace": {"exclude": ["tools/", "reports/"], "jobs": 1},
+    }
+    with tracing.span("adrflow verify"):
+        run_gates(cfg, ["adr-trace"], execution="subprocess")
+
+    spans = {span["name"]: span for span in _spans(trace_file)}
+    root, gate, child = spans["adrflow verify"], spans["gate adr-trace"], spans["adr_trace"]
+    assert {root["traceId"], gate["traceId"], child["traceId"]} == {root["traceId"]}
+    assert gate["parentSpanId"] == root["spanId"]
+    assert child["parentSpanId"] == gate["spanId"]
+    assert _attrs(gate)["adrflow.execution"] == "subprocess"
@@ -1,8 +1,8 @@
 """Builtin coverage adapters."""
 from __future__ import annotations
-import json
-import pathlib
 from typing import Any, Dict
+
+import reports_fs
 from . import register_adapter
 
 
@@ -11,10 +11,7 @@ class CoverageJsonAdapter:
 
     def read(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
         reports_dir = cfg.get("paths", {}).get("reports", "reports/")
-        path = pathlib.Path(reports_dir) / "coverage.json"
-        if not path.exists():
-            return {}
-        return json.loads(path.read_text(encoding="utf-8"))
+        return reports_fs.read_json(reports_fs.join(reports_dir, "coverage.json"), {})
 
 
 register_adapter("coverage", "coverage-json", CoverageJsonAdapter())
@@ -3,6 +3,8 @@ from __future__ import annotations
 import json
 import pathlib
 from typing import Any, Dict
+
+import reports_fs
 from . import register_adapter
 
 
@@ -10,13 +12,13 @@ class SimpleE2EAdapter:
     key = "json"
 
     def read(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
-        reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/")) / "e2e"
+        reports_dir = reports_fs.join(cfg.get("paths", {}).get("reports", "reports/"), "e2e")
         result: Dict[str, Any] = {}
-        if not reports_dir.exists():
+        if not reports_fs.is_dir(reports_dir):
             return result
-        for path in reports_dir.glob("*.json"):
+        for path in reports_fs.glob(reports_fs.join(reports_dir, "*.json")):
             try:
-                result[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+                result[pathlib.PurePath(path).stem] = json.loads(reports_fs.read_text(path))
             except json.JSONDecodeError:
                 continue
         return result
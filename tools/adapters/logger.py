@@ -1,16 +1,35 @@
 """Builtin logger adapters."""
 from __future__ import annotations
+import glob
 import pathlib
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List
+
+import reports_fs
 from . import register_adapter
 
 
 class JsonlLoggerAdapter:
     key = "jsonl"
 
-    def paths(self, cfg: Dict[str, Any]) -> Iterable[pathlib.Path]:
+    def patterns(self, cfg: Dict[str, Any]) -> List[str]:
+        """Configured log globs (``paths.logs``), plain or compressed shards."""
         reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
-        return [reports_dir / "debug.log.jsonl"]
+        configured = cfg.get("paths", {}).get("logs")
+        if not configured:
+            return [str(reports_dir / "debug.log.jsonl")]
+        if isinstance(configured, str):
+            configured = [configured]
+        return [str(item) for item in configured]
+
+    def paths(self, cfg: Dict[str, Any]) -> Iterable[pathlib.Path]:
+        found: List[pathlib.Path] = []
+        for pattern in self.patterns(cfg):
+            matches = reports_fs.glob(pattern) if glob.has_magic(pattern) else [pattern]
+            for match in matches:
+                path = pathlib.Path(match)
+                if reports_fs.is_file(match) and path not in found:
+                    found.append(path)
+        return found
 
 
 register_adapter("logger", "jsonl", JsonlLoggerAdapter())
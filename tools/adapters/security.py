@@ -1,8 +1,8 @@
 """Builtin security adapters."""
 from __future__ import annotations
-import json
-import pathlib
 from typing import Any, Dict
+
+import reports_fs
 from . import register_adapter
 
 
@@ -11,10 +11,7 @@ class SecurityJsonAdapter:
 
     def read(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
         reports_dir = cfg.get("paths", {}).get("reports", "reports/")
-        path = pathlib.Path(reports_dir) / "security.json"
-        if not path.exists():
-            return {}
-        return json.loads(path.read_text(encoding="utf-8"))
+        return reports_fs.read_json(reports_fs.join(reports_dir, "security.json"), {})
 
 
 register_adapter("security", "json", SecurityJsonAdapter())
@@ -0,0 +1,149 @@
+"""Shared, cached loader for ADR front matter.
+
+Both ``adr_trace`` and ``log_analyzer`` need the parsed front matter of every
+``ADR-*.md``. This module parses each file at most once per change: entries
+are memoised in-process and persisted to JSON keyed by path, size and
+mtime, with a hash of the front-matter text as a fallback so touched but
+unchanged ADRs skip YAML parsing as well.
+
+The cache lives under ``<reports>/.cache/``, where downloaded CI artifacts
+land too, so it is plain data: YAML dates are tagged, and an entry that
+does not survive a JSON round trip is simply not persisted.
+"""
+from __future__ import annotations
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+from typing import Any, Dict, Optional
+
+import yaml
+
+from common import YamlLoader, read_front_matter
+
+CACHE_VERSION = 2
+_DATE = "__adrflow_date__"
+_DATETIME = "__adrflow_datetime__"
+_memo: Dict[str, Dict[str, Any]] = {}
+
+
+def default_cache_path(reports_dir: str) -> str:
+    return str(pathlib.Path(reports_dir) / ".cache" / "adr_specs.json")
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {_DATETIME: value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {_DATE: value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not cacheable")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if _DATETIME in obj:
+            return datetime.datetime.fromisoformat(obj[_DATETIME])
+        if _DATE in obj:
+            return datetime.date.fromisoformat(obj[_DATE])
+    return obj
+
+
+def _load_cache(cache_path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    if not cache_path:
+        return {}
+    try:
+        with open(cache_path, encoding="utf-8") as handle:
+            data = json.load(handle, object_hook=_decode)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    entries = data.get("entries")
+    return entries if isinstance(entries, dict) else {}
+
+
+def _persistable(entry: Dict[str, Any]) -> bool:
+    """Whether ``entry`` reads back unchanged (non-string keys, sets, ... do not)."""
+    try:
+        return json.loads(json.dumps(entry, default=_encode), object_hook=_decode) == entry
+    except (TypeError, ValueError):
+        return False
+
+
+def _save_cache(cache_path: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    path = pathlib.Path(cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    kept = {key: entry for key, entry in entries.items() if _persistable(entry)}
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump({"version": CACHE_VERSION, "entries": kept}, handle, default=_encode)
+    os.replace(tmp, path)  # atomic: gates may run concurrently
+
+
+def _parse(path: str, st: os.stat_result, cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not isinstance(cached, dict) or "spec" not in cached:
+        cached = None
+    if cached and cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns:
+        return cached
+    text = read_front_matter(path)
+    digest = hashlib.sha1((text or "").encode("utf-8")).hexdigest() if text is not None else None
+    if cached and cached.get("digest") == digest:
+        spec = cached["spec"]
+    else:
+        spec = (yaml.load(text, Loader=YamlLoader) or {}) if text is not None else {}
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": digest, "spec": spec}
+
+
+def load_front_matters(adr_dir: str, cache_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Front matter of every ``ADR-*.md`` under ``adr_dir``, keyed by path (glob order).
+
+    Callers must treat the returned specs as read-only; they are shared.
+    """
+    persisted = _load_cache(cache_path)
+    result: Dict[str, Dict[str, Any]] = {}
+    changed = False
+    for path in pathlib.Path(adr_dir).glob("ADR-*.md"):
+        key = str(path)
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        cached = _memo.get(key) or persisted.get(key)
+        entry = _parse(key, st, cached)
+        if persisted.get(key) != entry:
+            changed = True
+        _memo[key] = entry
+        result[key] = entry["spec"]
+    stale = [k for k in persisted if pathlib.Path(k).parent == pathlib.Path(adr_dir) and k not in result]
+    if cache_path and (changed or stale):
+        current = {key: _memo[key] for key in result}
+        # Keep entries of other ADR directories sharing the same cache file.
+        current.update({k: v for k, v in persisted.items() if pathlib.Path(k).parent != pathlib.Path(adr_dir)})
+        _save_cache(cache_path, current)
+    return result
+
+
+def applies_to(front_matter: Dict[str, Any], service: Optional[str]) -> bool:
+    """Whether an ADR concerns ``service``.
+
+    ADRs name their services in ``service:`` or ``services:``; an ADR naming
+    none is repo-wide and applies to every service.
+    """
+    if service is None:
+        return True
+    named = front_matter.get("services", front_matter.get("service"))
+    if not named:
+        return True
+    if isinstance(named, str):
+        named = [named]
+    return service in {str(item) for item in named}
+
+
+def load_adr_specs(adr_dir: str, cache_path: Optional[str] = None, service: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """ADR specs with front matter, keyed by ``adr_id`` (only those applying to ``service``)."""
+    specs: Dict[str, Dict[str, Any]] = {}
+    for front_matter in load_front_matters(adr_dir, cache_path).values():
+        if front_matter and applies_to(front_matter, service):
+            specs[front_matter["adr_id"]] = front_matter
+    return specs
@@ -1,55 +1,382 @@
 #!/usr/bin/env python
 import argparse
+import hashlib
+import mmap
+import os
 import pathlib
 import re
-from typing import Dict, List
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from common import fail, load_yaml_front_matter, ok, write_json
+from adr_catalog import applies_to, default_cache_path, load_front_matters
+from common import fail, ok, read_json, write_json
+from diff_coverage import _unquote
+from fswalk import is_excluded, walk_files
+import sharding
+import tracing
+from metrics import timed, write_timings
 
 CODE_TAG = re.compile(r"ADR:\s*(ADR-\d+)", re.IGNORECASE)
 TEST_TAG = re.compile(r"TEST-ADR:\s*(ADR-\d+)", re.IGNORECASE)
+# Both tags in one pass: every match is a code reference (CODE_TAG also hits
+# inside "TEST-ADR:"), and the optional prefix marks it as a test reference.
+TAG = re.compile(rb"(TEST-)?ADR:\s*(ADR-\d+)", re.IGNORECASE)
 
+INDEX_VERSION = 2
+MAX_FILE_BYTES = 10 * 1024 * 1024
+SNIFF_BYTES = 8192
+PARALLEL_MIN_FILES = 256
 
-def scan_adr(adr_dir: str) -> List[str]:
+
+def scan_adr(adr_dir: str, cache_path: Optional[str] = None, service: Optional[str] = None) -> List[str]:
     ids = []
-    for path in pathlib.Path(adr_dir).glob("ADR-*.md"):
-        front_matter = load_yaml_front_matter(str(path))
-        if front_matter.get("adr_id"):
+    for front_matter in load_front_matters(adr_dir, cache_path).values():
+        if front_matter.get("adr_id") and applies_to(front_matter, service):
             ids.append(front_matter["adr_id"])
     return sorted(set(ids))
 
 
-def scan_repo(src_dir: str) -> Dict[str, Dict[str, List[str]]]:
-    result: Dict[str, Dict[str, List[str]]] = {}
-    src_path = pathlib.Path(src_dir)
-    for path in src_path.rglob("*.*"):
-        lowered = str(path).lower()
-        if any(skip in lowered for skip in ["/.git/", "/reports/", "/docs/adr/", "/node_modules/", "/.venv/"]):
+def default_index_path(out_path: str, shard: Optional[sharding.Shard] = None) -> str:
+    name = f"adr_trace_index.{shard[0]}-of-{shard[1]}.json" if shard else "adr_trace_index.json"
+    return str(pathlib.Path(out_path).parent / ".cache" / name)
+
+
+# Index files already read or written by this process, keyed by path with the
+# file's (size, mtime_ns); keeps the index warm across runs in ``adrflow serve``.
+_index_memo: Dict[str, Tuple[Tuple[int, int], Dict[str, Dict[str, Any]]]] = {}
+
+
+def _index_stamp(index_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(index_path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def load_index(index_path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Return cached per-file tag hits, or an empty map if the index is absent or stale.
+
+    The result is shared with later calls and must not be mutated.
+    """
+    if not index_path:
+        return {}
+    stamp = _index_stamp(index_path)
+    memo = _index_memo.get(index_path)
+    if memo is not None and stamp is not None and memo[0] == stamp:
+        return memo[1]
+    try:
+        data = read_json(index_path, {}) or {}
+    except ValueError:
+        return {}
+    if data.get("version") != INDEX_VERSION:
+        return {}
+    files = data.get("files", {})
+    if stamp is not None:
+        _index_memo[index_path] = (stamp, files)
+    return files
+
+
+def save_index(index_path: str, files: Dict[str, Dict[str, Any]]) -> None:
+    memo = _index_memo.get(index_path)
+    if memo is not None and memo[0] == _index_stamp(index_path) and memo[1] == files:
+        return  # unchanged since it was read or written
+    write_json(index_path, {"version": INDEX_VERSION, "files": files})
+    stamp = _index_stamp(index_path)
+    if stamp is not None:
+        _index_memo[index_path] = (stamp, files)
+
+
+def _skipped(reason: str) -> Dict[str, Any]:
+    return {"sha1": None, "code": [], "tests": [], "skipped": reason}
+
+
+def _match(buf) -> Dict[str, Any]:
+    code: List[str] = []
+    tests: List[str] = []
+    for match in TAG.finditer(buf):
+        adr = match.group(2).decode("ascii").upper()
+        code.append(adr)
+        if match.group(1):
+            tests.append(adr)
+    return {"sha1": hashlib.sha1(buf).hexdigest(), "code": code, "tests": tests}
+
+
+def scan_file(path: pathlib.Path, max_bytes: int = MAX_FILE_BYTES) -> Optional[Dict[str, Any]]:
+    """Collect ADR ids tagged in one file, in match order (duplicates preserved).
+
+    Binaries (NUL byte in the first block) and files over ``max_bytes`` are
+    not read further and come back marked as ``skipped``.
+    """
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if max_bytes and size > max_bytes:
+            return _skipped("size")
+        if size == 0:
+            return _match(b"")
+        if b"\0" in handle.read(SNIFF_BYTES):
+            return _skipped("binary")
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return _match(buf)
+
+
+def _scan_batch(paths: List[str], max_bytes: int) -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Scan a list of files; unreadable ones map to ``None``."""
+    out = []
+    for key in paths:
+        try:
+            out.append((key, scan_file(pathlib.Path(key), max_bytes)))
+        except (OSError, ValueError):
+            out.append((key, None))
+    return out
+
+
+def _scan_many(paths: List[str], max_bytes: int, jobs: int) -> Iterable[Tuple[str, Optional[Dict[str, Any]]]]:
+    workers = jobs or os.cpu_count() or 1
+    if workers <= 1 or len(paths) < PARALLEL_MIN_FILES:
+        return _scan_batch(paths, max_bytes)
+    size = max(64, len(paths) // (workers * 4))
+    batches = [paths[i:i + size] for i in range(0, len(paths), size)]
+    results: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pool.map(_scan_batch, batches, [max_bytes] * len(batches)):
+            results.extend(chunk)
+    return results
+
+
+def _iter_candidates(src_dir: str, excludes: Optional[List[str]], gitignore: bool) -> Iterable[Tuple[str, os.stat_result]]:
+    for rel, entry in walk_files(src_dir, excludes=excludes, gitignore=gitignore):
+        # Only files with an extension are traced (historical ``rglob("*.*")``).
+        if "." not in entry.name:
             continue
         try:
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
+            yield str(pathlib.Path(src_dir) / rel), entry.stat(follow_symlinks=False)
+        except OSError:
             continue
-        for match in CODE_TAG.finditer(text):
-            adr = match.group(1).upper()
-            result.setdefault(adr, {}).setdefault("code", []).append(str(path))
-        for match in TEST_TAG.finditer(text):
-            adr = match.group(1).upper()
-            result.setdefault(adr, {}).setdefault("tests", []).append(str(path))
+
+
+def _lookup(cached: Optional[Dict[str, Any]], key: str, st: os.stat_result) -> Optional[Dict[str, Any]]:
+    if not cached or cached.get("size") != st.st_size:
+        return None
+    if cached.get("mtime_ns") == st.st_mtime_ns:
+        return cached
+    # Same size, new mtime (checkout, touch): fall back to the content hash.
+    try:
+        data = pathlib.Path(key).read_bytes()
+    except OSError:
+        return None
+    if hashlib.sha1(data).hexdigest() == cached.get("sha1"):
+        return {**cached, "mtime_ns": st.st_mtime_ns}
+    return None
+
+
+def merge_hits(files: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, List[str]]]:
+    result: Dict[str, Dict[str, List[str]]] = {}
+    for path in sorted(files):
+        entry = files[path]
+        for adr in entry.get("code", []):
+            result.setdefault(adr, {}).setdefault("code", []).append(path)
+        for adr in entry.get("tests", []):
+            result.setdefault(adr, {}).setdefault("tests", []).append(path)
     return result
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--src", default=".")
-    parser.add_argument("--adr", default="docs/adr")
-    parser.add_argument("--out", default="reports/adr_trace.json")
-    args = parser.parse_args()
+def scan_repo(
+    src_dir: str,
+    index_path: Optional[str] = None,
+    rebuild: bool = False,
+    stats: Optional[Dict[str, Any]] = None,
+    excludes: Optional[List[str]] = None,
+    gitignore: bool = True,
+    max_bytes: int = MAX_FILE_BYTES,
+    jobs: int = 0,
+    timings: Optional[Dict[str, float]] = None,
+    shard: Optional[sharding.Shard] = None,
+) -> Dict[str, Dict[str, List[str]]]:
+    """Map ADR ids to tagged code/test files.
 
-    declared = set(scan_adr(args.adr))
-    traced = scan_repo(args.src)
+    With ``index_path`` only files whose size/mtime (or content hash) changed
+    since the previous run are re-read; everything else comes from the index.
+    Files that need reading are fanned out over ``jobs`` processes
+    (``0`` = one per CPU). ``timings`` receives per-phase milliseconds.
+    ``shard`` restricts the scan to the files that shard owns.
+    """
+    with timed(timings, "index_load"), tracing.span("artifact.read", **{"adrflow.artifact": index_path}):
+        previous = {} if rebuild else load_index(index_path)
+    files: Dict[str, Dict[str, Any]] = {}
+    pending: Dict[str, os.stat_result] = {}
+    hits = 0
+    with timed(timings, "walk"):
+        for key, st in _iter_candidates(src_dir, excludes, gitignore):
+            if shard is not None and not sharding.owns(key, shard):
+                continue
+            entry = _lookup(previous.get(key), key, st)
+            if entry is not None:
+                files[key] = entry
+                hits += 1
+            else:
+                pending[key] = st
+    with timed(timings, "scan"):
+        for key, entry in _scan_many(list(pending), max_bytes, jobs):
+            if entry is None:
+                continue
+            st = pending[key]
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            files[key] = entry
 
-    report = {"items": [], "pass": True, "miss": []}
+    if index_path:
+        with timed(timings, "index_save"):
+            save_index(index_path, files)
+    if stats is not None:
+        stats.update(
+            enabled=bool(index_path),
+            hits=hits,
+            misses=len(pending),
+            removed=len(set(previous) - set(files)),
+        )
+    return merge_hits(files)
+
+
+def parse_name_status(lines: Iterable[str]) -> List[Tuple[str, str, Optional[str]]]:
+    """Parse ``git diff --name-status`` output (or bare paths) into changes.
+
+    Each change is ``(status, path, new_path)``; bare paths are reported as
+    ``"?"`` and resolved against the working tree by :func:`apply_changes`.
+    C-quoted paths (git's default for unusual names) are decoded.
+    """
+    changes: List[Tuple[str, str, Optional[str]]] = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        parts = line.split("\t")
+        if len(parts) == 1:
+            changes.append(("?", _unquote(parts[0].strip()), None))
+            continue
+        status = parts[0][:1].upper()
+        if status in ("R", "C") and len(parts) >= 3:
+            changes.append((status, _unquote(parts[1]), _unquote(parts[2])))
+        else:
+            changes.append((status, _unquote(parts[1]), None))
+    return changes
+
+
+def parse_name_status_z(data: str) -> List[Tuple[str, str, Optional[str]]]:
+    """Parse ``git diff --name-status -z`` output: NUL-separated, paths verbatim."""
+    changes: List[Tuple[str, str, Optional[str]]] = []
+    fields = data.split("\0")
+    index = 0
+    while index < len(fields) and fields[index]:
+        status = fields[index][:1].upper()
+        if status in ("R", "C"):
+            changes.append((status, fields[index + 1], fields[index + 2]))
+            index += 3
+        else:
+            changes.append((status, fields[index + 1], None))
+            index += 2
+    return changes
+
+
+def git_changes(src_dir: str, since: str) -> List[Tuple[str, str, Optional[str]]]:
+    """Working-tree changes under ``src_dir`` relative to ``since`` (local git only)."""
+    diff = subprocess.run(
+        ["git", "diff", "--name-status", "-z", "-M", "--relative", since, "--"],
+        cwd=src_dir, capture_output=True, text=True, check=True,
+    ).stdout
+    untracked = subprocess.run(
+        ["git", "ls-files", "-z", "--others", "--exclude-standard"],
+        cwd=src_dir, capture_output=True, text=True, check=True,
+    ).stdout
+    return parse_name_status_z(diff) + [("A", path, None) for path in untracked.split("\0") if path]
+
+
+def apply_changes(
+    files: Dict[str, Dict[str, Any]],
+    changes: List[Tuple[str, str, Optional[str]]],
+    src_dir: str,
+    excludes: Optional[List[str]] = None,
+    gitignore: bool = True,
+    max_bytes: int = MAX_FILE_BYTES,
+    jobs: int = 0,
+) -> Dict[str, int]:
+    """Patch a per-file index in place with a diff; returns per-status counts."""
+    counts = {"added": 0, "modified": 0, "deleted": 0, "renamed": 0, "rescanned": 0}
+    touched: List[str] = []
+    for status, path, new_path in changes:
+        if status in ("R", "C"):
+            if status == "R":
+                files.pop(str(pathlib.Path(src_dir) / path), None)
+            counts["renamed" if status == "R" else "added"] += 1
+            touched.append(new_path or path)
+        elif status == "D":
+            files.pop(str(pathlib.Path(src_dir) / path), None)
+            counts["deleted"] += 1
+        elif status == "?" and not (pathlib.Path(src_dir) / path).exists():
+            files.pop(str(pathlib.Path(src_dir) / path), None)
+            counts["deleted"] += 1
+        else:
+            touched.append(path)
+            counts["added" if status == "A" else "modified"] += 1
+
+    pending: Dict[str, os.stat_result] = {}
+    for rel in touched:
+        key = str(pathlib.Path(src_dir) / rel)
+        target = pathlib.Path(key)
+        if "." not in target.name or is_excluded(src_dir, rel, excludes, gitignore) or not target.is_file():
+            files.pop(key, None)
+            continue
+        pending[key] = target.stat()
+    for key, entry in _scan_many(list(pending), max_bytes, jobs):
+        if entry is None:
+            files.pop(key, None)
+            continue
+        st = pending[key]
+        entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+        files[key] = entry
+    counts["rescanned"] = len(pending)
+    return counts
+
+
+def _same_path(left: str, right: str) -> bool:
+    return os.path.normcase(os.path.abspath(left)) == os.path.normcase(os.path.abspath(right))
+
+
+def scan_diff(
+    src_dir: str,
+    baseline_path: str,
+    changes: List[Tuple[str, str, Optional[str]]],
+    index_path: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    **scan_opts: Any,
+) -> Optional[Dict[str, Dict[str, List[str]]]]:
+    """Trace by applying ``changes`` to a baseline index instead of walking the tree.
+
+    Returns ``None`` when there is no usable baseline; callers fall back to
+    :func:`scan_repo`. The result is saved to ``index_path`` unless that is
+    the baseline itself, which must keep describing the base ref.
+    """
+    baseline = load_index(baseline_path)
+    if not baseline:
+        return None
+    files = dict(baseline)
+    counts = apply_changes(files, changes, src_dir, **scan_opts)
+    if index_path and not _same_path(index_path, baseline_path):
+        save_index(index_path, files)
+    if stats is not None:
+        stats.update(
+            enabled=True,
+            hits=len(files) - counts["rescanned"],
+            misses=counts["rescanned"],
+            removed=len(set(baseline) - set(files)),
+            diff=counts,
+        )
+    return merge_hits(files)
+
+
+def build_report(declared: Iterable[str], traced: Dict[str, Dict[str, List[str]]], stats: Dict[str, Any]) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"items": [], "pass": True, "miss": [], "index": stats}
     for adr in sorted(declared):
         code_refs = traced.get(adr, {}).get("code", [])
         test_refs = traced.get(adr, {}).get("tests", [])
@@ -61,9 +388,144 @@ def main():
                 report["miss"].append(f"{adr}: no code references (tag 'ADR: {adr}')")
             if not test_refs:
                 report["miss"].append(f"{adr}: no test references (tag 'TEST-ADR: {adr}')")
+    return report
+
+
+def merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The report of a single-node run, rebuilt from the partial reports of every shard.
+
+    Each file belongs to exactly one shard, so sorting the concatenated
+    reference lists restores the path order of :func:`merge_hits`; index
+    counters are summed.
+    """
+    declared = partials[0]["declared"]
+    traced: Dict[str, Dict[str, List[str]]] = {}
+    stats: Dict[str, Any] = {}
+    for partial in partials:
+        if partial["declared"] != declared:
+            raise ValueError("adr_trace shards disagree on the declared ADRs (different --adr or --service?)")
+        for adr, refs in partial["traced"].items():
+            for kind, paths in refs.items():
+                traced.setdefault(adr, {}).setdefault(kind, []).extend(paths)
+        for key, value in (partial.get("index") or {}).items():
+            stats[key] = (stats.get(key, False) or value) if isinstance(value, bool) else stats.get(key, 0) + value
+    for refs in traced.values():
+        for paths in refs.values():
+            paths.sort()
+    return build_report(declared, traced, stats)
+
+
+def run_trace(
+    src: str = ".",
+    adr: str = "docs/adr",
+    out: str = "reports/adr_trace.json",
+    index: Optional[str] = None,
+    no_cache: bool = False,
+    rebuild_index: bool = False,
+    excludes: Optional[List[str]] = None,
+    gitignore: bool = True,
+    max_bytes: int = MAX_FILE_BYTES,
+    jobs: int = 0,
+    since: Optional[str] = None,
+    changes: Optional[List[Tuple[str, str, Optional[str]]]] = None,
+    baseline: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+    service: Optional[str] = None,
+    shard: Optional[sharding.Shard] = None,
+) -> Dict[str, Any]:
+    """Build the trace report, write it to ``out`` and return it.
+
+    This is everything ``main`` does except argument parsing and the exit
+    status, so gates can run the trace in-process. ``timings`` receives
+    per-phase milliseconds (ADR loading, walk, regex scan, index I/O).
+    ``service`` limits the declared ADRs to those applying to it. With
+    ``shard`` only that shard's files are scanned and ``out`` receives a
+    partial report for :func:`merge_partials`.
+    """
+    if shard is not None and (since or changes is not None):
+        raise ValueError("--shard cannot be combined with --since/--changed-files")
+    index_path = None if no_cache else (index or default_index_path(out, shard))
+    with timed(timings, "adr_specs"):
+        declared = set(scan_adr(adr, cache_path=None if no_cache else default_cache_path(str(pathlib.Path(out).parent)), service=service))
+    stats: Dict[str, Any] = {}
+    scan_opts = {"excludes": excludes, "gitignore": gitignore, "max_bytes": max_bytes, "jobs": jobs}
+    traced = None
+    if since or changes is not None:
+        if changes is None:
+            changes = git_changes(src, since)
+        baseline = baseline or index or default_index_path(out)
+        with timed(timings, "diff"):
+            traced = scan_diff(src, baseline, changes, index_path=index_path, stats=stats, **scan_opts)
+        if traced is None:
+            print(f"[adr_trace] baseline index {baseline} not found, falling back to a full scan")
+            if index_path and _same_path(index_path, baseline):
+                # A full scan of this tree is not a baseline for the base ref.
+                index_path = None
+    if traced is None:
+        traced = scan_repo(src, index_path=index_path, rebuild=rebuild_index, stats=stats, timings=timings, shard=shard, **scan_opts)
+
+    if shard is not None:
+        partial = {"partial": sharding.header("adr_trace", shard), "declared": sorted(declared), "traced": traced, "index": stats}
+        with timed(timings, "report"):
+            write_json(out, partial)
+        return partial
+    with timed(timings, "report"):
+        report = build_report(declared, traced, stats)
+        write_json(out, report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--src", default=".")
+    parser.add_argument("--adr", default="docs/adr")
+    parser.add_argument("--out", default="reports/adr_trace.json")
+    parser.add_argument("--index", help="Trace index location (default: <out dir>/.cache/adr_trace_index.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Scan every file and do not touch the index")
+    parser.add_argument("--rebuild-index", action="store_true", help="Ignore the existing index and rewrite it")
+    parser.add_argument("--exclude", action="append", help="gitignore-style exclude pattern (repeatable; replaces defaults)")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not honour .gitignore files")
+    parser.add_argument("--max-file-bytes", type=int, default=MAX_FILE_BYTES, help="Skip files larger than this (0 = no cap)")
+    parser.add_argument("--jobs", type=int, default=0, help="Scan worker processes (0 = one per CPU, 1 = in-process)")
+    parser.add_argument("--since", help="Only rescan files changed since this git ref (applied to --baseline)")
+    parser.add_argument("--changed-files", help="File with changed paths or --name-status lines ('-' = stdin)")
+    parser.add_argument("--baseline", help="Trace index from the main-branch run (default: the --index path, left untouched)")
+    parser.add_argument("--service", help="Only ADRs that apply to this service (front matter service/services)")
+    parser.add_argument("--shard", type=sharding.shard_arg, metavar="I/N", help="Scan only this shard's files and write a partial report (see merge_reports.py)")
+    parser.add_argument("--timings", help="Write per-phase timings (ms) as JSON to this file")
+    args = parser.parse_args()
+    if args.shard and (args.since or args.changed_files):
+        parser.error("--shard cannot be combined with --since/--changed-files")
 
-    write_json(args.out, report)
-    if report["pass"]:
+    changes = None
+    timings: Optional[Dict[str, float]] = {} if args.timings else None
+    if args.changed_files == "-":
+        changes = parse_name_status(sys.stdin)
+    elif args.changed_files:
+        changes = parse_name_status(pathlib.Path(args.changed_files).read_text(encoding="utf-8").splitlines())
+    with tracing.span("adr_trace", **{"adrflow.src": args.src, "adrflow.out": args.out}):
+        report = run_trace(
+            args.src,
+            args.adr,
+            args.out,
+            index=args.index,
+            no_cache=args.no_cache,
+            rebuild_index=args.rebuild_index,
+            excludes=args.exclude,
+            gitignore=not args.no_gitignore,
+            max_bytes=args.max_file_bytes,
+            jobs=args.jobs,
+            since=args.since,
+            changes=changes,
+            baseline=args.baseline,
+            timings=timings,
+            service=args.service,
+            shard=args.shard,
+        )
+    write_timings(args.timings, timings)
+    if args.shard:
+        ok(f"ADR trace shard {sharding.label(args.shard)} written to {args.out}")
+    elif report["pass"]:
         ok("ADR trace PASS")
     else:
         fail("ADR trace FAIL:\n- " + "\n- ".join(report["miss"]))
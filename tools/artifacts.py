@@ -0,0 +1,261 @@
+"""GitHub Actions artifact downloads for ``ci_intake``: streamed, concurrent, cached.
+
+The artifacts of a run are listed through the REST API (``api_url`` may
+point at GitHub Enterprise or a local stand-in) and downloaded over one
+pooled ``requests.Session``, several at a time. Archives stream to disk in
+chunks into a content cache (by default ``<reports>/.cache/artifacts``)
+keyed by artifact id:
+
+* an artifact whose id and ``digest`` match the cached copy is not
+  requested at all;
+* otherwise the cached copy's ``ETag`` goes out as ``If-None-Match`` and a
+  ``304 Not Modified`` reuses it.
+
+Downloads are checked against the artifact's ``sha256:`` digest when the API
+reports one. With ``unpack=False`` archives stay zipped in the cache and
+are read in place through ``reports_fs`` mounts. Hits touch an archive's
+``<id>.json`` and, after each fetch, the least recently used archives are
+evicted once the cache outgrows ``max_bytes`` (mounted ones are kept).
+"""
+from __future__ import annotations
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import reports_fs
+import tracing
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+CHUNK_BYTES = 1 << 20
+PAGE_SIZE = 100
+TIMEOUT = (10, 60)  # connect, read (between chunks)
+
+
+def session(token: Optional[str], pool_size: int = 8):
+    """A keep-alive session authenticated with ``token`` and a connection pool of ``pool_size``."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    http = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+    http.headers.update({"Accept": "application/vnd.github+json"})
+    if token:
+        http.headers["Authorization"] = f"Bearer {token}"
+    return http
+
+
+def list_artifacts(http, api_url: str, owner: str, repo: str, run_id: int) -> List[Dict[str, Any]]:
+    """Every artifact of the run, following pagination."""
+    url: Optional[str] = f"{api_url.rstrip('/')}/repos/{owner}/{repo}/actions/runs/{run_id}/artifacts"
+    params: Optional[Dict[str, Any]] = {"per_page": PAGE_SIZE}
+    items: List[Dict[str, Any]] = []
+    while url:
+        response = http.get(url, params=params, timeout=TIMEOUT)
+        response.raise_for_status()
+        items.extend(response.json().get("artifacts", []))
+        url = response.links.get("next", {}).get("url")
+        params = None  # the next link carries them
+    return items
+
+
+def pull_run(http, api_url: str, owner: str, repo: str, number: int, workflow: Optional[str] = None) -> Dict[str, Any]:
+    """The latest workflow run on pull request ``number``'s head commit.
+
+    ``workflow`` narrows the runs to one workflow (its name or file name).
+    """
+    base = f"{api_url.rstrip('/')}/repos/{owner}/{repo}"
+    response = http.get(f"{base}/pulls/{number}", timeout=TIMEOUT)
+    response.raise_for_status()
+    head = response.json().get("head") or {}
+    response = http.get(f"{base}/actions/runs", params={"head_sha": head.get("sha"), "per_page": PAGE_SIZE}, timeout=TIMEOUT)
+    response.raise_for_status()
+    runs = [
+        run for run in response.json().get("workflow_runs", [])
+        if workflow is None or workflow in (run.get("name"), os.path.basename(str(run.get("path", ""))))
+    ]
+    if not runs:
+        raise RuntimeError(f"no workflow run found for pull request #{number} ({head.get('sha')})")
+    return {"run_id": runs[0]["id"], "pull": number, "branch": head.get("ref"), "head_sha": head.get("sha")}  # newest first
+
+
+def select(items: List[Dict[str, Any]], names: Optional[Sequence[str]], everything: bool = False) -> List[Dict[str, Any]]:
+    """The artifacts to fetch: all, the named ones (in the order given), or the first."""
+    live = [item for item in items if not item.get("expired")]
+    if everything:
+        return live
+    if not names:
+        if not live:
+            raise RuntimeError("Artifact not found in run download response")
+        return live[:1]
+    by_name = {}
+    for item in live:
+        by_name.setdefault(item.get("name"), item)
+    missing = [name for name in names if name not in by_name]
+    if missing:
+        raise RuntimeError(f"Artifact not found in run download response: {', '.join(missing)}")
+    return [by_name[name] for name in dict.fromkeys(names)]
+
+
+class ArtifactCache:
+    """Archives on disk as ``<id>.zip`` with their ``digest``/``etag`` in ``<id>.json``."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+
+    def archive(self, item: Dict[str, Any]) -> pathlib.Path:
+        return self.root / f"{item['id']}.zip"
+
+    def _meta_path(self, item: Dict[str, Any]) -> pathlib.Path:
+        return self.root / f"{item['id']}.json"
+
+    def meta(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Metadata of the cached copy, or ``None`` if there is no complete one."""
+        try:
+            meta = json.loads(self._meta_path(item).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if self.archive(item).is_file() else None
+
+    def store(self, item: Dict[str, Any], part: pathlib.Path, meta: Dict[str, Any]) -> pathlib.Path:
+        target = self.archive(item)
+        os.replace(part, target)
+        self._meta_path(item).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        return target
+
+    def touch(self, item: Dict[str, Any]) -> None:
+        with contextlib.suppress(OSError):
+            os.utime(self._meta_path(item))
+
+    def evict(self, keep: Sequence[str] = ()) -> None:
+        """Drop least recently used archives until the cache fits ``max_bytes``.
+
+        Archives in ``keep`` (absolute paths) and those currently mounted are
+        never dropped.
+        """
+        kept = {os.path.abspath(path) for path in keep} | {item.archive for item in reports_fs.mounts()}
+        entries = []
+        try:
+            for archive in self.root.glob("*.zip"):
+                meta = archive.with_suffix(".json")
+                try:
+                    size = archive.stat().st_size
+                    used = meta.stat().st_mtime_ns
+                    size += meta.stat().st_size
+                except OSError:
+                    used = 0  # no metadata: never completed, oldest
+                entries.append((used, size, archive))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, archive in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if os.path.abspath(archive) in kept:
+                continue
+            for path in (archive, archive.with_suffix(".json")):
+                with contextlib.suppress(OSError):
+                    path.unlink()
+            total -= size
+
+
+def _expected_sha256(item: Dict[str, Any]) -> Optional[str]:
+    digest = str(item.get("digest") or "")
+    return digest.split(":", 1)[1].lower() if digest.lower().startswith("sha256:") else None
+
+
+def download(http, item: Dict[str, Any], cache: ArtifactCache) -> Dict[str, Any]:
+    """Bring one artifact's archive into ``cache``; returns where it came from.
+
+    ``source`` is ``"cache"`` (digest unchanged, no request), ``"not-modified"``
+    (``304`` for the cached ETag) or ``"download"``.
+    """
+    info = {"name": item.get("name"), "id": item["id"], "path": str(cache.archive(item)), "bytes": 0}
+    cached = cache.meta(item)
+    if cached is not None and item.get("digest") and cached.get("digest") == item.get("digest"):
+        cache.touch(item)
+        return {**info, "source": "cache"}
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+    cache.root.mkdir(parents=True, exist_ok=True)
+    part = cache.root / f"{item['id']}.zip.part"
+    with http.get(item["archive_download_url"], headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 304 and cached is not None:
+            cache.touch(item)
+            return {**info, "source": "not-modified"}
+        response.raise_for_status()
+        sha256 = hashlib.sha256()
+        size = 0
+        with open(part, "wb") as handle:
+            for chunk in response.iter_content(CHUNK_BYTES):
+                handle.write(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+        etag = response.headers.get("ETag")
+    expected = _expected_sha256(item)
+    if expected and sha256.hexdigest() != expected:
+        part.unlink()
+        raise RuntimeError(f"artifact {item.get('name')!r} does not match its digest {item.get('digest')}")
+    cache.store(item, part, {"name": item.get("name"), "digest": item.get("digest"), "etag": etag, "sha256": sha256.hexdigest(), "size": size})
+    return {**info, "source": "download", "bytes": size}
+
+
+def extract(archive: str, dest: pathlib.Path) -> None:
+    """Unpack member by member; ``zipfile`` drops absolute and ``..`` components."""
+    dest.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(archive) as bundle:
+        bundle.extractall(dest)
+
+
+def fetch_run_artifacts(
+    api_url: str,
+    owner: str,
+    repo: str,
+    run_id: int,
+    dest: str,
+    cache_dir: str,
+    names: Optional[Sequence[str]] = None,
+    everything: bool = False,
+    jobs: int = 4,
+    token: Optional[str] = None,
+    unpack: bool = True,
+    http=None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> List[Dict[str, Any]]:
+    """Download (or reuse) the selected artifacts of a run and unpack them into ``dest``.
+
+    One artifact is unpacked into ``dest`` itself; several go to
+    ``dest/<name>/``, as ``gh run download`` does. Each result's ``dest``
+    names that directory; with ``unpack=False`` nothing is unpacked. ``http``
+    shares one pooled session across calls instead of opening one here.
+    The cache is then trimmed to ``max_bytes``, keeping this run's archives.
+    """
+    jobs = max(1, jobs)
+    cache = ArtifactCache(cache_dir, max_bytes)
+    with contextlib.nullcontext(http) if http is not None else session(token, pool_size=jobs) as http:
+        with tracing.span("artifacts.list", **{"adrflow.run_id": run_id}):
+            items = select(list_artifacts(http, api_url, owner, repo, run_id), names, everything)
+        target = pathlib.Path(dest)
+        parent = tracing.current()
+
+        def fetch(item: Dict[str, Any]) -> Dict[str, Any]:
+            with tracing.attach(parent), tracing.span("artifact.download", **{"adrflow.artifact": str(item.get("name"))}) as span:
+                info = download(http, item, cache)
+                span.set_attribute("adrflow.source", info["source"])
+                span.set_attribute("adrflow.bytes", info["bytes"])
+                info["dest"] = str(target if len(items) == 1 else target / str(item.get("name")))
+                if unpack:
+                    extract(info["path"], pathlib.Path(info["dest"]))
+            return info
+
+        with ThreadPoolExecutor(max_workers=min(jobs, max(1, len(items)))) as pool:
+            fetched = list(pool.map(fetch, items))
+    cache.evict(keep=[info["path"] for info in fetched])
+    return fetched
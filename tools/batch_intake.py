@@ -0,0 +1,179 @@
+"""Batch mode of ``ci_intake``: DoD verdicts for many CI runs at once.
+
+``ci_intake.py --runs-file runs.jsonl`` or ``--pulls 12,13`` evaluates every
+listed run (a pull request stands for the latest workflow run on its head
+commit) on an asyncio loop, at most ``--concurrency`` at a time. The
+blocking work (downloads over one shared pooled session, zip reads, DoD
+evaluation) runs in a thread pool of that size. ``.adrflow.yaml`` is loaded
+once; each run gets its own reports directory ``<batch-dir>/<run_id>/``
+holding its mounted (or unpacked) artifacts and its full ``dod_gate.json``;
+in a monorepo every service's reports directory is rerooted there too.
+The verdicts form one table, written as JSON or, for a ``.jsonl`` table, one
+row per line.
+
+A batch never reruns ``verify`` locally (the working tree is not the pull
+request's); each run's ``verify.json`` artifact is used when it has one.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import ci_intake
+import reports_fs
+import services
+import tracing
+from artifacts import pull_run, session
+from common import write_json
+from metrics import measure
+
+
+def load_runs_file(path: str) -> List[Dict[str, Any]]:
+    """Runs to evaluate: a JSON array, or one run id / JSON object per line.
+
+    Objects carry ``run_id`` and optionally ``pull``, ``branch`` and
+    ``head_sha``; an object with only ``pull`` is resolved to that pull
+    request's latest run.
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        items = json.loads(text)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    entries: List[Dict[str, Any]] = []
+    for item in items:
+        entry = dict(item) if isinstance(item, dict) else {"run_id": item}
+        if entry.get("run_id") is None and entry.get("pull") is None:
+            raise ValueError(f"{path}: every run needs a run_id or a pull")
+        entries.append(entry)
+    return entries
+
+
+def entries_from_args(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    entries = load_runs_file(args.runs_file) if args.runs_file else []
+    entries.extend({"pull": number} for number in args.pulls or [])
+    return entries
+
+
+def _label(entry: Dict[str, Any]) -> str:
+    return f"run {entry['run_id']}" if entry.get("run_id") is not None else f"pull #{entry['pull']}"
+
+
+def _row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {"run_id": entry.get("run_id"), "pull": entry.get("pull"), "branch": entry.get("branch")}
+
+
+def _failure(entry: Dict[str, Any], exc: Exception) -> Dict[str, Any]:
+    return {**_row(entry), "ok": False, "miss": [], "error": f"{type(exc).__name__}: {exc}"}
+
+
+def resolve(args: argparse.Namespace, entry: Dict[str, Any], http) -> Dict[str, Any]:
+    """``entry`` with its ``run_id`` (and ``branch``) filled in from its pull request."""
+    if entry.get("run_id") is not None:
+        return entry
+    resolved = pull_run(http, args.api_url, args.owner, args.repo, int(entry["pull"]), args.workflow)
+    return {**resolved, **{key: value for key, value in entry.items() if value is not None}}
+
+
+def intake_one(args: argparse.Namespace, cfg: Dict[str, Any], entry: Dict[str, Any], http, parent=None) -> Dict[str, Any]:
+    """Fetch and evaluate one run in its own reports directory; returns its table row.
+
+    A failing run (missing artifacts, HTTP errors, ...) yields a row with
+    ``error`` rather than aborting the batch.
+    """
+    run_dir = Path(args.batch_dir) / str(entry["run_id"])
+    with tracing.attach(parent), tracing.span("ci_intake.run", **{"adrflow.run_id": entry["run_id"]}) as span:
+        with measure() as timing:
+            try:
+                run_cfg = services.reroot(cfg, str(run_dir))
+                run_args = argparse.Namespace(**{
+                    **vars(args),
+                    "run_id": int(entry["run_id"]),
+                    "pull": entry.get("pull"),
+                    "branch": entry.get("branch") or args.branch,
+                    "head_sha": entry.get("head_sha"),
+                    "fetch": True,
+                    "gh_cli": False,
+                    "download_dir": None,
+                    "skip_verify": True,
+                })
+                payload = ci_intake.aggregate(run_args, cfg=run_cfg, http=http)
+                write_json(str(run_dir / "dod_gate.json"), payload)
+                row = {**_row(entry), "ok": bool(payload["summary"]["ok"]), "miss": payload["summary"]["miss"], "report": str(run_dir / "dod_gate.json")}
+            except Exception as exc:  # one broken run must not sink the batch
+                row = _failure(entry, exc)
+            finally:
+                reports_fs.unmount(str(run_dir))
+        row["wall_ms"] = timing["wall_ms"]
+        span.set_attribute("adrflow.ok", row["ok"])
+    return row
+
+
+async def _gather(args: argparse.Namespace, cfg: Dict[str, Any], entries: List[Dict[str, Any]], http) -> List[Dict[str, Any]]:
+    limit = asyncio.Semaphore(args.concurrency)
+    loop = asyncio.get_running_loop()
+    parent = tracing.current()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+
+        async def call(func, *params):
+            async with limit:
+                return await loop.run_in_executor(pool, func, *params)
+
+        async def resolved(entry: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                return await call(resolve, args, entry, http)
+            except Exception as exc:  # reported in the entry's row
+                return _failure(entry, exc)
+
+        targets = await asyncio.gather(*(resolved(entry) for entry in entries))
+        # A run listed twice (by id and through its pull request) is evaluated once.
+        unique: Dict[Any, Dict[str, Any]] = {}
+        for target in targets:
+            if "error" not in target:
+                unique.setdefault(target["run_id"], target)
+        verdicts = dict(zip(unique, await asyncio.gather(*(call(intake_one, args, cfg, target, http, parent) for target in unique.values()))))
+
+    rows: List[Dict[str, Any]] = []
+    for target in targets:
+        rows.append(target if "error" in target else {**verdicts[target["run_id"]], **_row(target)})
+    return rows
+
+
+def run_batch(args: argparse.Namespace, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Evaluate ``entries`` concurrently; returns ``{"runs": [rows], "summary": ...}``."""
+    if args.gh_cli:
+        raise RuntimeError("batch intake downloads over REST; drop --gh-cli")
+    if not (args.owner and args.repo):
+        raise RuntimeError("--owner and --repo are required for batch intake")
+    args.concurrency = max(1, args.concurrency)
+    with tracing.span("config.load", **{"adrflow.config": ".adrflow.yaml"}):
+        cfg = ci_intake.load_cfg(Path(".adrflow.yaml"))
+        tracing.configure(cfg)
+    token = ci_intake.rest_token()
+    with session(token, pool_size=args.concurrency * max(1, args.download_jobs)) as http:
+        rows = asyncio.run(_gather(args, cfg, entries, http))
+    failed = [_label(row) for row in rows if not row["ok"]]
+    summary = {
+        "ok": not failed,
+        "runs": len(rows),
+        "passed": len(rows) - len(failed),
+        "failed": failed,
+        "mode": args.mode,
+        "source": "ci_intake",
+    }
+    return {"runs": rows, "summary": summary}
+
+
+def write_table(path: str, table: Dict[str, Any]) -> None:
+    """The verdict table as JSON, or JSONL rows for a ``.jsonl`` path."""
+    if not path.endswith(".jsonl"):
+        write_json(path, table)
+        return
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with target.open("w", encoding="utf-8") as handle:
+        for row in table["runs"]:
+            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
@@ -9,22 +9,27 @@ import os
 import shutil
 import subprocess
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
-from common import read_json, write_json
-from dod_gate import evaluate_dod
+import reports_fs
+import services
+import tracing
+from artifacts import DEFAULT_API_URL, DEFAULT_MAX_BYTES, fetch_run_artifacts
+from common import write_json
+from dod_gate import LOCAL_HEAD, evaluate_dod, referenced_paths
+from metrics import measure, run_measured
 
 
 def run_cmd(cmd: List[str], *, check: bool = False) -> int:
     """Run a command and stream output."""
 
     print(f"[ci_intake] $ {' '.join(cmd)}", flush=True)
-    result = subprocess.run(cmd, check=False)
-    if check and result.returncode != 0:
-        raise subprocess.CalledProcessError(result.returncode, cmd)
-    return result.returncode
+    returncode = run_measured(cmd)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
 
 
 def load_cfg(path: Path) -> Dict[str, Any]:
@@ -39,9 +44,29 @@ def ensure_reports_dir(cfg: Dict[str, Any]) -> Path:
     return reports_path
 
 
-def fetch_artifacts(args: argparse.Namespace, reports_dir: Path) -> None:
+def _number_list(value: str) -> List[int]:
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated numbers, got {value!r}") from None
+
+
+def rest_token() -> str:
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if not token:
+        raise RuntimeError("GH_TOKEN must be set for REST artifact download")
+    return token
+
+
+def fetch_artifacts(args: argparse.Namespace, reports_dir: Path, http=None) -> List[Dict[str, Any]]:
+    """Download the run's artifacts into ``--download-dir`` (default: the reports dir).
+
+    Over REST the archives are mounted there (``reports_fs``) rather than
+    unpacked unless ``--unpack all``. Returns what was fetched (name,
+    source, bytes) for the metrics. ``http`` is a shared REST session.
+    """
     if not args.fetch:
-        return
+        return []
 
     if args.gh_cli and shutil.which("gh") is None:
         raise RuntimeError("GitHub CLI not found but --fetch requested")
@@ -62,47 +87,38 @@ def fetch_artifacts(args: argparse.Namespace, reports_dir: Path) -> None:
             "-D",
             str(dest),
         ]
-        if args.artifact:
-            cmd.extend(["-n", args.artifact])
+        for name in args.artifact or []:
+            cmd.extend(["-n", name])
         run_cmd(cmd, check=True)
-    else:
-        import requests
-
-        token = os.environ.get("GH_TOKEN")
-        if not token:
-            raise RuntimeError("GH_TOKEN must be set for REST artifact download")
-        if not (args.owner and args.repo):
-            raise RuntimeError("--owner and --repo are required for REST artifact download")
-
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/vnd.github+json",
-        }
-        api = f"https://api.github.com/repos/{args.owner}/{args.repo}/actions/runs/{args.run_id}/artifacts"
-        response = requests.get(api, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        items = data.get("artifacts", [])
-        target = None
-        if args.artifact:
-            for item in items:
-                if item.get("name") == args.artifact:
-                    target = item
-                    break
-        else:
-            target = items[0] if items else None
-        if not target:
-            raise RuntimeError("Artifact not found in run download response")
-        download_url = target.get("archive_download_url")
-        response = requests.get(download_url, headers=headers, timeout=60)
-        response.raise_for_status()
-        archive_path = dest / "artifact.zip"
-        archive_path.write_bytes(response.content)
-        shutil.unpack_archive(str(archive_path), str(dest))
-        archive_path.unlink()
-
-
-def collect_verify_summary(reports_dir: Path, rerun: bool) -> Dict[str, Any]:
+        return []
+
+    token = rest_token()
+    if not (args.owner and args.repo):
+        raise RuntimeError("--owner and --repo are required for REST artifact download")
+
+    fetched = fetch_run_artifacts(
+        args.api_url,
+        args.owner,
+        args.repo,
+        args.run_id,
+        dest=str(dest),
+        cache_dir=args.artifact_cache or str(reports_dir / ".cache" / "artifacts"),
+        names=args.artifact,
+        everything=args.all_artifacts,
+        jobs=args.download_jobs,
+        token=token,
+        unpack=args.unpack == "all",
+        http=http,
+        max_bytes=getattr(args, "artifact_cache_max_bytes", None) or DEFAULT_MAX_BYTES,
+    )
+    for info in fetched:
+        if args.unpack != "all":
+            reports_fs.mount(info["dest"], info["path"])
+        print(f"[ci_intake] artifact {info['name']}: {info['source']} ({info['bytes']} bytes)", flush=True)
+    return [{key: info[key] for key in ("name", "source", "bytes")} for info in fetched]
+
+
+def collect_verify_summary(reports_dir: Path, rerun: bool, service: Optional[str] = None) -> Dict[str, Any]:
     if rerun:
         run_cmd([
             "python",
@@ -110,23 +126,126 @@ def collect_verify_summary(reports_dir: Path, rerun: bool) -> Dict[str, Any]:
             "verify",
             "--json",
             "--exit-code",
+            *(["--service", service] if service else []),
         ])
-    verify_report = read_json(reports_dir / "verify.json", {}) or {}
+    with tracing.span("artifact.read", **{"adrflow.artifact": str(reports_dir / "verify.json")}):
+        verify_report = reports_fs.read_json(reports_dir / "verify.json", {}) or {}
     return verify_report
 
 
-def aggregate(args: argparse.Namespace) -> Dict[str, Any]:
-    cfg = load_cfg(Path(".adrflow.yaml"))
-    reports_dir = ensure_reports_dir(cfg)
+def reports_rebase(cfg: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """``(origin, root)`` when the reports tree was rerooted (batch intake), else ``None``."""
+    paths = cfg.get("paths", {}) or {}
+    if not paths.get("reports_origin"):
+        return None
+    return str(paths["reports_origin"]), str(paths.get("reports", "reports/"))
 
-    fetch_artifacts(args, reports_dir)
 
-    verify_report = collect_verify_summary(reports_dir, rerun=not args.skip_verify)
+def referenced_reports(cfg: Dict[str, Any], checks_file: str, names: Optional[List[str]]) -> List[str]:
+    """The files the DoD evaluation reads, for every selected service in services mode."""
+    if services.enabled(cfg):
+        scopes = [services.service_cfg(cfg, name)["paths"] for name in services.select(cfg, names)]
+    else:
+        scopes = [cfg.get("paths", {})]
+    paths: List[str] = []
+    for scope in scopes:
+        paths.extend(
+            referenced_paths(scope.get("dod_file", "docs/dod/DoD.yaml"), checks_file, str(scope.get("reports", "reports")), reports_rebase(cfg))
+        )
+    return list(dict.fromkeys(paths))
+
+
+def evaluate_services_dod(
+    cfg: Dict[str, Any],
+    checks_file: str,
+    names: Optional[List[str]],
+    timings: Dict[str, float],
+    embed_raw: Optional[bool] = None,
+    head: Optional[str] = LOCAL_HEAD,
+) -> Dict[str, Any]:
+    """DoD verdict per service, each against its own reports directory."""
+    rebase = reports_rebase(cfg)
+    verdicts: Dict[str, Any] = {}
+    miss: List[str] = []
+    ok = True
+    for name in services.select(cfg, names):
+        derived = services.service_cfg(cfg, name)
+        paths = derived["paths"]
+        with tracing.span("dod.evaluate.service", **{"adrflow.service": name}):
+            verdict = evaluate_dod(
+                paths.get("dod_file", "docs/dod/DoD.yaml"),
+                checks_file,
+                reports_dir=paths["reports"],
+                timings=timings,
+                embed_raw=embed_raw,
+                head=head,
+                rebase=rebase,
+            )
+        verdicts[name] = verdict
+        passed = bool(verdict.get("summary", {}).get("ok", False))
+        if not passed and derived["service"]["mode"] != services.NON_BLOCKING:
+            ok = False
+            miss.extend(f"{name}: {item}" for item in verdict.get("summary", {}).get("miss", []))
+    return {"services": verdicts, "summary": {"ok": ok, "miss": miss}}
+
+
+def own_run_dir(args: argparse.Namespace, cfg: Dict[str, Any]) -> bool:
+    """Whether a single run is read from its artifacts alone, in ``<reports>/runs/<run_id>/``.
+
+    That is a REST fetch without ``--download-dir`` that is not re-verified
+    locally; a batch run already has a directory of its own.
+    """
+    return bool(
+        args.fetch and args.skip_verify and not args.gh_cli and not args.download_dir
+        and reports_rebase(cfg) is None
+    )
+
+
+def aggregate(args: argparse.Namespace, cfg: Optional[Dict[str, Any]] = None, http=None) -> Dict[str, Any]:
+    """Fetch, verify and evaluate one run; ``cfg`` skips loading ``.adrflow.yaml``."""
+    if cfg is None:
+        with tracing.span("config.load", **{"adrflow.config": ".adrflow.yaml"}):
+            cfg = load_cfg(Path(".adrflow.yaml"))
+            tracing.configure(cfg)
+    reports_dir = ensure_reports_dir(cfg)
+    if own_run_dir(args, cfg):
+        # Nothing is rerun here: local reports from earlier runs must not shadow the fetched ones.
+        args = argparse.Namespace(**{**vars(args), "artifact_cache": args.artifact_cache or str(reports_dir / ".cache" / "artifacts")})
+        cfg = services.reroot(cfg, str(reports_dir / "runs" / str(args.run_id)))
+        reports_dir = ensure_reports_dir(cfg)
+    metrics: Dict[str, Any] = {}
+
+    if args.service and not services.enabled(cfg):
+        raise RuntimeError("--service needs repo.type: mono and repo.services in .adrflow.yaml")
+    checks_file = args.checks or "governance/ci_checks.yaml"
+
+    with measure() as metrics["fetch"], tracing.span("artifacts.fetch", **{"adrflow.fetch": bool(args.fetch)}):
+        fetched = fetch_artifacts(args, reports_dir, http=http)
+        if fetched and args.unpack == "referenced":
+            # Only what ci_checks.yaml / DoD.yaml point at lands on disk.
+            written = reports_fs.materialize(referenced_reports(cfg, checks_file, [args.service] if args.service else None))
+            metrics["fetch"]["materialized"] = len(written)
+    if fetched:
+        metrics["fetch"]["artifacts"] = fetched
+
+    with measure() as metrics["verify"], tracing.span("verify", **{"adrflow.rerun": not args.skip_verify}):
+        verify_report = collect_verify_summary(reports_dir, rerun=not args.skip_verify, service=args.service)
     verify_ok = verify_report.get("summary", {}).get("ok", True)
 
-    dod_file = cfg.get("paths", {}).get("dod_file", "docs/dod/DoD.yaml")
-    checks_file = args.checks or "governance/ci_checks.yaml"
-    dod_payload = evaluate_dod(dod_file, checks_file, reports_dir=str(reports_dir))
+    # A run that is only fetched, not re-verified here, need not match the local checkout.
+    head = getattr(args, "head_sha", None) or (None if args.fetch and args.skip_verify else LOCAL_HEAD)
+    phases: Dict[str, float] = {}
+    with measure() as metrics["dod"], tracing.span("dod.evaluate"):
+        if services.enabled(cfg):
+            dod_payload = evaluate_services_dod(
+                cfg, checks_file, [args.service] if args.service else None, phases, embed_raw=args.embed_raw, head=head
+            )
+        else:
+            dod_file = cfg.get("paths", {}).get("dod_file", "docs/dod/DoD.yaml")
+            dod_payload = evaluate_dod(
+                dod_file, checks_file, reports_dir=str(reports_dir), timings=phases, embed_raw=args.embed_raw, head=head, rebase=reports_rebase(cfg)
+            )
+    metrics["dod"]["phases"] = phases
     dod_payload.setdefault("summary", {})["mode"] = args.mode
 
     summary_miss: List[str] = list(dod_payload.get("summary", {}).get("miss", []))
@@ -134,7 +253,8 @@ def aggregate(args: argparse.Namespace) -> Dict[str, Any]:
         for gate, gate_report in verify_report.items():
             if gate == "summary":
                 continue
-            if isinstance(gate_report, dict) and not gate_report.get("ok", True):
+            # Failing report-only services do not fail the summary either.
+            if isinstance(gate_report, dict) and not gate_report.get("ok", True) and gate_report.get("blocking", True):
                 for miss in gate_report.get("miss", []):
                     summary_miss.append(f"{gate}: {miss}")
 
@@ -155,6 +275,7 @@ def aggregate(args: argparse.Namespace) -> Dict[str, Any]:
         "metadata": {k: v for k, v in metadata.items() if v is not None},
         "verify": verify_report,
         "dod": dod_payload,
+        "metrics": metrics,
     }
     summary = {
         "ok": summary_ok,
@@ -173,19 +294,66 @@ def main() -> None:
     parser.add_argument("--fetch", action="store_true", help="Download artifacts via GitHub API/CLI")
     parser.add_argument("--gh-cli", action="store_true", help="Use GitHub CLI for downloads")
     parser.add_argument("--run-id", type=int, help="GitHub Actions run identifier")
-    parser.add_argument("--artifact", help="Specific artifact name to download")
+    parser.add_argument("--artifact", action="append", help="Artifact name to download (repeatable; default: the run's first artifact)")
+    parser.add_argument("--all-artifacts", action="store_true", help="Download every artifact of the run")
+    parser.add_argument(
+        "--api-url",
+        default=os.environ.get("GITHUB_API_URL", DEFAULT_API_URL),
+        help="GitHub REST API root (GitHub Enterprise or a local stand-in)",
+    )
+    parser.add_argument("--download-jobs", type=int, default=4, help="Artifacts downloaded concurrently over one pooled session")
+    parser.add_argument("--artifact-cache", help="Artifact archive cache (default: <reports>/.cache/artifacts)")
+    parser.add_argument(
+        "--artifact-cache-max-bytes",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help="Evict least recently used archives beyond this size (mounted ones are kept)",
+    )
+    parser.add_argument(
+        "--unpack",
+        choices=["none", "referenced", "all"],
+        default="none",
+        help="REST downloads: read reports from the zips in place, extract only the files ci_checks.yaml/DoD.yaml reference, or unpack everything",
+    )
     parser.add_argument("--download-dir", help="Destination folder for downloaded artifacts")
     parser.add_argument("--owner", help="GitHub repository owner")
     parser.add_argument("--repo", help="GitHub repository name")
     parser.add_argument("--branch", help="Git branch associated with the run")
     parser.add_argument("--pull", type=int, help="Pull request number")
+    parser.add_argument("--head-sha", help="Commit the run built; diff_coverage.json must be for it (default: local HEAD unless the run is only fetched)")
     parser.add_argument("--checks", help="Path to ci_checks.yaml override")
     parser.add_argument("--skip-verify", action="store_true", help="Do not rerun adrflow verify locally")
+    parser.add_argument("--service", help="Monorepo service to verify and evaluate (default: every service)")
     parser.add_argument("--out", default="reports/dod_gate.json", help="Where to write the aggregated JSON")
+    parser.add_argument(
+        "--embed-raw",
+        action="store_true",
+        default=None,
+        help="Copy coverage.json into the payload instead of referencing it by path and sha256",
+    )
+    batch = parser.add_argument_group("batch intake")
+    batch.add_argument("--runs-file", help="Evaluate many runs: JSON array or JSONL of run ids / {run_id|pull, branch}")
+    batch.add_argument("--pulls", type=_number_list, help="Evaluate the latest run of each pull request, e.g. 12,13,14")
+    batch.add_argument("--workflow", help="Only consider runs of this workflow (name or file) when resolving --pulls")
+    batch.add_argument("--concurrency", type=int, default=8, help="Runs fetched and evaluated at once")
+    batch.add_argument("--batch-dir", default="reports/batch", help="Per-run reports directories (<batch-dir>/<run_id>/)")
+    batch.add_argument("--table", help="Verdict table, .json or .jsonl (default: <batch-dir>/verdicts.json)")
     args = parser.parse_args()
 
-    payload = aggregate(args)
-    write_json(args.out, payload)
+    if args.runs_file or args.pulls:
+        import batch_intake
+
+        with tracing.span("ci_intake.batch", **{"adrflow.mode": args.mode}) as root:
+            table = batch_intake.run_batch(args, batch_intake.entries_from_args(args))
+            batch_intake.write_table(args.table or str(Path(args.batch_dir) / "verdicts.json"), table)
+            root.set_attribute("adrflow.ok", bool(table["summary"]["ok"]))
+        print(json.dumps(table, ensure_ascii=False, indent=2))
+        raise SystemExit(0 if table["summary"]["ok"] else 1)
+
+    with tracing.span("ci_intake", **{"adrflow.mode": args.mode}) as root:
+        payload = aggregate(args)
+        write_json(args.out, payload)
+        root.set_attribute("adrflow.ok", bool(payload["summary"]["ok"]))
     print(json.dumps(payload, ensure_ascii=False, indent=2))
 
     if payload["summary"]["ok"]:
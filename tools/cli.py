@@ -1,30 +1,43 @@
 """Command line entrypoint for adrflow."""
 from __future__ import annotations
 import json
+import os
 import pathlib
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import typer
 import yaml
 
+import daemon
+import tracing
 from ext_registry import discover_plugins
 from llm_judge import register_builtin as register_builtin_judges
-from gates import get_gate  # type: ignore
 
 app = typer.Typer(add_completion=False, no_args_is_help=True)
 
 
-def _load_cfg() -> dict:
+def _read_cfg() -> dict:
     path = pathlib.Path(".adrflow.yaml")
     if not path.exists():
         typer.echo("No .adrflow.yaml found. Run `adrflow init` first.", err=True)
         raise typer.Exit(2)
-    cfg = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
-    register_builtin_judges()
-    discover_plugins(cfg)
+    with tracing.span("config.load", **{"adrflow.config": str(path)}):
+        cfg = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        tracing.configure(cfg)
+    return cfg
+
+
+def _discover(cfg: dict) -> dict:
+    with tracing.span("plugins.discover"):
+        register_builtin_judges()
+        discover_plugins(cfg)
     return cfg
 
 
+def _load_cfg() -> dict:
+    return _discover(_read_cfg())
+
+
 def _write_cfg(cfg: dict) -> None:
     path = pathlib.Path(".adrflow.yaml")
     path.write_text(
@@ -33,24 +46,11 @@ def _write_cfg(cfg: dict) -> None:
     )
 
 
-def _execute_gates(cfg: dict) -> Dict[str, Dict[str, Any]]:
-    result: Dict[str, Dict[str, Any]] = {}
-    all_ok = True
+def _execute_gates(cfg: dict, **options: Any) -> Dict[str, Dict[str, Any]]:
+    # Deferred: only commands that run gates pay for the gate machinery.
+    from gates.scheduler import verify_gates  # type: ignore
 
-    for key in cfg.get("gates", {}).get("include", []):
-        gate = get_gate(key)
-        gate_result = gate.run(cfg)
-        ok = bool(gate_result.ok)
-        all_ok = all_ok and ok
-        result[key] = {
-            "ok": ok,
-            "miss": list(gate_result.miss),
-        }
-        if getattr(gate_result, "artifact", None):
-            result[key]["artifact"] = gate_result.artifact
-
-    result["summary"] = {"ok": all_ok}
-    return result
+    return verify_gates(cfg, **options)
 
 
 def _write_verify_report(cfg: dict, payload: Dict[str, Any]) -> pathlib.Path:
@@ -61,6 +61,145 @@ def _write_verify_report(cfg: dict, payload: Dict[str, Any]) -> pathlib.Path:
     return out_path
 
 
+# Command bodies, shared by the CLI and ``adrflow serve``: ``handler(cfg, **args)
+# -> payload``, raising ValueError for bad arguments.
+
+
+def _verify_payload(cfg: dict, service: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+    # Deferred like the gates: the services pool pulls in concurrent.futures.
+    import services  # type: ignore
+
+    if services.enabled(cfg):
+        payload = services.verify_services(cfg, [service] if service else None, **options)
+    elif service:
+        raise ValueError("--service needs repo.type: mono and repo.services in .adrflow.yaml")
+    else:
+        payload = _execute_gates(cfg, **options)
+    with tracing.span("report.write"):
+        _write_verify_report(cfg, payload)
+    return payload
+
+
+def _docs_payload(cfg: dict) -> Dict[str, Any]:
+    reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
+    governance = pathlib.Path("governance/ci_checks.yaml")
+    checks = yaml.safe_load(governance.read_text(encoding="utf-8")) if governance.exists() else {}
+    required = checks.get("required_artifacts", [])
+    return {
+        "reports": str(reports_dir.resolve()),
+        "required_artifacts": required,
+        "present": [
+            str(path.resolve().relative_to(pathlib.Path.cwd()))
+            for path in reports_dir.glob("**/*")
+            if path.is_file()
+        ],
+    }
+
+
+def _suggest_payload(cfg: dict) -> Dict[str, Any]:
+    reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports"))
+    verify_path = reports_dir / "verify.json"
+    if verify_path.exists():
+        payload = json.loads(verify_path.read_text(encoding="utf-8"))
+    else:
+        payload = _verify_payload(cfg)
+
+    fixes: Dict[str, Any] = {"summary": payload.get("summary", {})}
+    for gate, info in payload.items():
+        if gate == "summary":
+            continue
+        if isinstance(info, dict) and not info.get("ok", True):
+            fixes[gate] = info.get("miss", [])
+    return fixes
+
+
+HANDLERS = {"verify": _verify_payload, "docs": _docs_payload, "suggest": _suggest_payload}
+
+
+def _own_outputs(cfg: dict) -> list:
+    """Files written by the handlers themselves; they must not invalidate the daemon."""
+    import services  # type: ignore
+    from gates import get_gate  # type: ignore
+
+    reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports"))
+    outputs = [str(reports_dir / "verify.json")]
+    if tracing.enabled():
+        outputs.append(tracing.trace_path())
+    scopes = [services.service_cfg(cfg, name) for name in services.services(cfg)] if services.enabled(cfg) else [cfg]
+    for scope in scopes:
+        for key in scope.get("gates", {}).get("include", []):
+            try:
+                outputs.extend(get_gate(key).outputs(scope))
+            except KeyError:
+                continue
+    return outputs
+
+
+def _watch(cfg: dict, options: Dict[str, Any], debounce: float, rounds: Optional[int] = None) -> None:
+    """Re-run the gates affected by each burst of changes until interrupted.
+
+    ``verify.json`` always holds the latest result of every gate; ``rounds``
+    bounds the number of re-runs (for tests). Monorepos verified per service
+    re-run every service on each burst, relying on the gate cache.
+    """
+    import services  # type: ignore
+    from fswatch import Watcher, repo_excludes
+    from gates.scheduler import affected_gates  # type: ignore
+
+    reports_dir = cfg.get("paths", {}).get("reports", "reports/")
+    own = {os.path.normpath(path) for path in _own_outputs(cfg)}
+    with Watcher(".", excludes=repo_excludes(reports_dir)) as watcher:
+        payload = _verify_payload(cfg, **options)
+        typer.echo(f"[watch] {watcher.backend}: verify ok={payload['summary']['ok']}", err=True)
+        while rounds is None or rounds > 0:
+            changed = watcher.poll(None)
+            while True:  # debounce: wait for the burst of saves to settle
+                more = watcher.poll(debounce)
+                if not more:
+                    break
+                changed |= more
+            changed = {path for path in changed if os.path.normpath(path) not in own}
+            if not changed:
+                continue
+            if ".adrflow.yaml" in changed:
+                cfg = _load_cfg()
+                own = {os.path.normpath(path) for path in _own_outputs(cfg)}
+            if services.enabled(cfg):
+                with tracing.span("verify.rerun", **{"adrflow.changed": len(changed)}):
+                    payload = _verify_payload(cfg, **options)
+                keys = list(payload)[:-1]  # the services
+            else:
+                if ".adrflow.yaml" in changed:
+                    keys = list(cfg.get("gates", {}).get("include", []))
+                    payload = {}
+                else:
+                    keys = affected_gates(cfg, list(cfg.get("gates", {}).get("include", [])), changed)
+                if not keys:
+                    continue
+                with tracing.span("verify.rerun", **{"adrflow.changed": len(changed), "adrflow.gates": keys}):
+                    result = _execute_gates(cfg, keys=keys, **options)
+                    result.pop("summary")
+                    payload.pop("summary", None)
+                    payload.update(result)
+                    payload["summary"] = {"ok": all(item["ok"] for item in payload.values())}
+                    _write_verify_report(cfg, payload)
+            shown = ", ".join(sorted(changed)[:3]) + (f" (+{len(changed) - 3})" if len(changed) > 3 else "")
+            typer.echo(f"[watch] {shown} -> {', '.join(keys)}: ok={payload['summary']['ok']}", err=True)
+            if rounds is not None:
+                rounds -= 1
+
+
+def _run(command: str, **args: Any) -> Any:
+    """Run ``command`` on the daemon if one serves this directory, else here."""
+    cfg = _read_cfg()
+    response = daemon.request(daemon.socket_path(cfg), command, args)
+    if response is not None:
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["payload"]
+    return HANDLERS[command](_discover(cfg), **args)
+
+
 @app.command()
 def verify(
     json_out: bool = typer.Option(
@@ -71,11 +210,55 @@ def verify(
         "--exit-code/--no-exit-code",
         help="Возвращать код выхода 0/1 в зависимости от summary.ok",
     ),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", help="Сколько независимых гейтов выполнять параллельно (по умолчанию gates.jobs или число CPU)"
+    ),
+    fail_fast: bool = typer.Option(
+        False, "--fail-fast", help="Отменить ещё не запущенные гейты после первого провала"
+    ),
+    execution: Optional[str] = typer.Option(
+        None,
+        "--execution",
+        help="inprocess — гейты вызывают инструменты как функции; subprocess — каждый инструмент в отдельном процессе (по умолчанию gates.execution или inprocess)",
+    ),
+    use_cache: bool = typer.Option(
+        True, "--cache/--no-cache", help="Переиспользовать результаты гейтов, чьи входы не изменились"
+    ),
+    profile: bool = typer.Option(
+        False, "--profile", help="Сохранить cProfile-дампы каждого гейта в reports/profile/<гейт>.pstats"
+    ),
+    watch: bool = typer.Option(
+        False, "--watch", help="Следить за файлами и перезапускать только затронутые гейты, обновляя reports/verify.json"
+    ),
+    debounce: int = typer.Option(300, "--debounce", help="Пауза тишины в мс перед перезапуском в режиме --watch"),
+    service: Optional[str] = typer.Option(
+        None, "--service", help="Проверить только этот сервис монорепозитория (repo.services)"
+    ),
 ) -> None:
     """Locally execute configured gates and report JSON summary."""
-    cfg = _load_cfg()
-    payload = _execute_gates(cfg)
-    _write_verify_report(cfg, payload)
+    options = {"jobs": jobs, "fail_fast": fail_fast, "execution": execution, "use_cache": use_cache, "profile": profile}
+    if service:
+        options["service"] = service
+    if watch:
+        try:
+            _watch(_load_cfg(), options, debounce / 1000)
+        except KeyboardInterrupt:
+            pass
+        except ValueError as exc:
+            typer.echo(str(exc), err=True)
+            raise typer.Exit(2)
+        return
+    with tracing.span("adrflow verify") as root:
+        try:
+            payload = _run("verify", **options)
+        except ValueError as exc:
+            root.error = str(exc)
+            payload = None
+        else:
+            root.set_attribute("adrflow.ok", bool(payload["summary"]["ok"]))
+    if payload is None:
+        typer.echo(root.error, err=True)
+        raise typer.Exit(2)
 
     if json_out:
         typer.echo(json.dumps(payload, ensure_ascii=False, indent=2))
@@ -93,42 +276,64 @@ def init() -> None:  # pragma: no cover - scaffold stub
 @app.command()
 def docs() -> None:
     """Print summary of current DoD artifacts and mandatory files."""
-    cfg = _load_cfg()
-    reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
-    governance = pathlib.Path("governance/ci_checks.yaml")
-    checks = yaml.safe_load(governance.read_text(encoding="utf-8")) if governance.exists() else {}
-    required = checks.get("required_artifacts", [])
-    payload = {
-        "reports": str(reports_dir.resolve()),
-        "required_artifacts": required,
-        "present": [
-            str(path.relative_to(pathlib.Path.cwd()))
-            for path in reports_dir.glob("**/*")
-            if path.is_file()
-        ],
-    }
-    typer.echo(json.dumps(payload, ensure_ascii=False, indent=2))
+    typer.echo(json.dumps(_run("docs"), ensure_ascii=False, indent=2))
 
 
 @app.command()
 def suggest() -> None:
     """Print minimal fixes based on the latest verify report."""
-    cfg = _load_cfg()
-    reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports"))
-    verify_path = reports_dir / "verify.json"
-    if verify_path.exists():
-        payload = json.loads(verify_path.read_text(encoding="utf-8"))
-    else:
-        payload = _execute_gates(cfg)
-        _write_verify_report(cfg, payload)
+    typer.echo(json.dumps(_run("suggest"), ensure_ascii=False, indent=2))
 
-    fixes: Dict[str, Any] = {"summary": payload.get("summary", {})}
-    for gate, info in payload.items():
-        if gate == "summary":
-            continue
-        if isinstance(info, dict) and not info.get("ok", True):
-            fixes[gate] = info.get("miss", [])
-    typer.echo(json.dumps(fixes, ensure_ascii=False, indent=2))
+
+@app.command()
+def merge(
+    partials: List[str] = typer.Argument(..., help="Частичные отчёты, записанные adr_trace.py/log_analyzer.py --shard i/N"),
+    reports: Optional[str] = typer.Option(None, "--reports", help="Куда записать объединённые отчёты (по умолчанию paths.reports)"),
+) -> None:
+    """Combine per-shard partial reports into adr_trace.json / adr_log_check.json."""
+    from merge_reports import merge_reports
+
+    cfg = _read_cfg()
+    with tracing.span("adrflow merge", **{"adrflow.partials": len(partials)}):
+        try:
+            summary = merge_reports(partials, reports or cfg.get("paths", {}).get("reports", "reports/"), cfg=cfg)
+        except ValueError as exc:
+            typer.echo(str(exc), err=True)
+            raise typer.Exit(2)
+    typer.echo(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+@app.command()
+def serve(
+    socket_path: Optional[str] = typer.Option(
+        None, "--socket", help="Путь Unix-сокета (по умолчанию serve.socket или reports/.cache/adrflow.sock)"
+    ),
+    polling: bool = typer.Option(False, "--polling", help="Следить за файлами опросом mtime вместо inotify"),
+    status: bool = typer.Option(False, "--status", help="Показать состояние запущенного демона и выйти"),
+    stop: bool = typer.Option(False, "--stop", help="Остановить запущенный демон"),
+) -> None:
+    """Keep config, plugins and tool caches warm and answer verify/suggest/docs over a socket."""
+    cfg = _read_cfg()
+    path = socket_path or daemon.socket_path(cfg)
+    if status or stop:
+        response = daemon.request(path, "shutdown" if stop else "status", timeout=5)
+        if response is None:
+            typer.echo(f"No adrflow daemon on {path}", err=True)
+            raise typer.Exit(1)
+        typer.echo(json.dumps(response["payload"], ensure_ascii=False, indent=2))
+        return
+    server = daemon.Daemon(
+        _load_cfg,
+        HANDLERS,
+        outputs=_own_outputs,
+        polling=polling or bool(cfg.get("serve", {}).get("polling")),
+    )
+    typer.echo(f"adrflow daemon listening on {path} (watcher: {server.watcher.backend})", err=True)
+    try:
+        server.serve_forever(path)
+    except RuntimeError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(2)
 
 
 @app.command()
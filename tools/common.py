@@ -1,19 +1,36 @@
 import json
 import os
 import pathlib
-import re
 import sys
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import yaml
 
+try:  # libyaml is several times faster than the pure-Python loader
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # pragma: no cover - depends on the PyYAML build
+    from yaml import SafeLoader as YamlLoader
+
+
+def read_front_matter(md_path: str) -> Optional[str]:
+    """Return the raw YAML between the leading ``---`` fences, reading no further."""
+    with open(md_path, encoding="utf-8") as handle:
+        if handle.readline() != "---\n":
+            return None
+        lines = []
+        for line in handle:
+            if line == "---\n":
+                # An empty block never matched the old regex either.
+                return "".join(lines)[:-1] if lines else None
+            lines.append(line)
+    return None
+
 
 def load_yaml_front_matter(md_path: str) -> Dict[str, Any]:
-    text = pathlib.Path(md_path).read_text(encoding="utf-8")
-    match = re.match(r"^---\n(.*?)\n---\n", text, flags=re.DOTALL)
-    if not match:
+    text = read_front_matter(md_path)
+    if text is None:
         return {}
-    return yaml.safe_load(match.group(1)) or {}
+    return yaml.load(text, Loader=YamlLoader) or {}
 
 
 def read_json(path: str, default=None):
@@ -0,0 +1,240 @@
+"""Coverage figures from ``coverage.json`` without loading the whole report.
+
+coverage.py's JSON report carries per-file line data (tens of MB on a large
+repository) around the few numbers the DoD needs. :func:`summarize` reads
+the file once, hashing it on the way, and keeps only ``meta``, ``totals``
+and, when asked, per-package sums of the per-file ``summary`` blocks: the
+report is decoded by :func:`iter_members`, one top-level value or ``files``
+entry at a time, so memory stays at one entry.
+
+Files under ``SMALL_BYTES`` are simply loaded. The report itself is
+referenced by path and sha256 rather than copied into the verdict.
+"""
+from __future__ import annotations
+import codecs
+import hashlib
+import json
+import re
+from pathlib import PurePosixPath
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import reports_fs
+
+CHUNK_BYTES = 1 << 20
+SMALL_BYTES = 1 << 20
+SUMMARY_KEYS = ("num_statements", "covered_lines", "num_branches", "covered_branches")
+# A decode error this close to the end of the buffer may just be a value cut
+# off by the chunk boundary ("tru", "1.", "\u00"); anything earlier is real.
+_CUT_SLACK = 16
+
+_SPACE = re.compile(r'\s*')
+
+
+class _Digesting:
+    """Read-through wrapper that hashes the stream."""
+
+    def __init__(self, handle) -> None:
+        self.handle = handle
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.handle.read(size)
+        self.sha256.update(data)
+        self.size += len(data)
+        return data
+
+    def drain(self) -> None:
+        while self.read(CHUNK_BYTES):
+            pass
+
+
+class _Prefixed:
+    """Replays bytes already read before continuing with the stream."""
+
+    def __init__(self, first: bytes, stream: _Digesting) -> None:
+        self.first = first
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self.first:
+            data, self.first = (self.first, b"") if size < 0 or size >= len(self.first) else (self.first[:size], self.first[size:])
+            return data
+        return self.stream.read(size)
+
+
+class _Tokens:
+    """Incremental reader of JSON text: whole values are decoded from a sliding buffer."""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        if self.eof:
+            return False
+        data = self.stream.read(size or CHUNK_BYTES)
+        self.eof = not data
+        self.text = self.text[self.pos:] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _SPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self._fill():
+                return self.text[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} in JSON stream")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        size = CHUNK_BYTES
+        while True:
+            try:
+                value, end = self.json.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as exc:
+                cut = exc.msg.startswith("Unterminated string") or len(self.text) - exc.pos <= _CUT_SLACK
+                if not cut or not self._fill(size):
+                    raise
+                # Doubling the read keeps a value spanning many chunks linear to decode.
+                size *= 2
+                continue
+            # A number running to the end of the buffer may continue in the next chunk.
+            if end == len(self.text) and self._fill(size):
+                continue
+            self.pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object about to be read; each value must be consumed in turn."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+
+def iter_members(stream, expand: str = "files") -> Iterator[Tuple[Tuple[str, ...], Any]]:
+    """Top-level ``((key,), value)`` pairs of a JSON object read from ``stream``.
+
+    The object under ``expand`` is not built: its entries are yielded one at
+    a time as ``((expand, name), value)``, so memory stays at one entry.
+    """
+    tokens = _Tokens(stream)
+    for key in tokens.members():
+        if key == expand and tokens.peek() == "{":
+            for name in tokens.members():
+                yield (key, name), tokens.value()
+        else:
+            yield (key,), tokens.value()
+
+
+def _stream_sections(stream, packages: Optional[int]) -> Dict[str, Any]:
+    """What :func:`from_report` reads, with ``files`` entries cut down to their summaries."""
+    found: Dict[str, Any] = {}
+    files: Dict[str, Any] = {}
+    for path, value in iter_members(stream):
+        if len(path) == 1:
+            found[path[0]] = value
+        elif packages and isinstance(value, dict):
+            files[path[1]] = {"summary": value.get("summary")}
+    if packages:
+        found["files"] = files
+    return found
+
+
+def package_of(path: str, depth: int) -> str:
+    """The first ``depth`` directories of ``path`` (``"."`` for top-level files)."""
+    parts = PurePosixPath(str(path).replace("\\", "/")).parts[:-1]
+    return "/".join(parts[:depth]) or "."
+
+
+def _percent(covered: int, total: int) -> Optional[float]:
+    return round(100.0 * covered / total, 2) if total else None
+
+
+def _packages(summaries: Dict[str, Dict[str, Any]], depth: int) -> Dict[str, Dict[str, Any]]:
+    sums: Dict[str, Dict[str, int]] = {}
+    for path, summary in summaries.items():
+        bucket = sums.setdefault(package_of(path, depth), dict.fromkeys(SUMMARY_KEYS, 0))
+        for key in SUMMARY_KEYS:
+            bucket[key] += int((summary or {}).get(key) or 0)
+    return {
+        name: {
+            "line": _percent(bucket["covered_lines"], bucket["num_statements"]),
+            "branch": _percent(bucket["covered_branches"], bucket["num_branches"]),
+            "statements": bucket["num_statements"],
+            "branches": bucket["num_branches"],
+        }
+        for name, bucket in sorted(sums.items())
+    }
+
+
+def _figures(meta: Dict[str, Any], totals: Dict[str, Any], top: Dict[str, Any]) -> Tuple[Any, Any]:
+    line, branch = top.get("line"), top.get("branch")
+    if line is None:
+        line = totals.get("percent_covered")
+    if branch is None:
+        branch = totals.get("percent_covered_branch")
+    if branch is None and meta.get("branch_coverage") is False:
+        branch = line
+    return line, branch
+
+
+def from_report(data: Any, packages: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """The summary of a report already in memory (``None`` if it is empty)."""
+    if not isinstance(data, dict) or not data:
+        return None
+    meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+    totals = data.get("totals") if isinstance(data.get("totals"), dict) else {}
+    line, branch = _figures(meta, totals, data)
+    summary: Dict[str, Any] = {"line": line, "branch": branch, "totals": totals}
+    if packages:
+        files = data.get("files") if isinstance(data.get("files"), dict) else {}
+        summary["packages"] = _packages({path: entry.get("summary") for path, entry in files.items()}, packages)
+    return summary
+
+
+def summarize(path: str, packages: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Line/branch coverage of the report at ``path`` (plain or an archive member).
+
+    Returns ``{"line", "branch", "totals", "packages"?, "source": {"path",
+    "sha256", "bytes"}, "parser"}`` or ``None`` when the report is missing or
+    empty. ``packages`` groups per-file summaries by that many leading
+    directories.
+    """
+    if not reports_fs.is_file(path):
+        return None
+    parser = "json"
+    with reports_fs.open_binary(path) as handle:
+        stream = _Digesting(handle)
+        first = stream.read(SMALL_BYTES)
+        if len(first) < SMALL_BYTES:
+            data = json.loads(first)
+        else:
+            parser = "stream"
+            data = _stream_sections(_Prefixed(first, stream), packages)
+            stream.drain()
+    summary = from_report(data, packages)
+    if summary is None:
+        return None
+    summary["source"] = {"path": reports_fs.absolute(path), "sha256": stream.sha256.hexdigest(), "bytes": stream.size}
+    summary["parser"] = parser
+    return summary
+
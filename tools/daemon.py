@@ -0,0 +1,226 @@
+"""``adrflow serve``: a warm daemon answering CLI commands over a Unix socket.
+
+The daemon loads the config and plugins once and keeps everything the tools
+memoise per process (ADR front matter, the trace index, imported gates)
+across requests. A :class:`fswatch.Watcher` thread bumps a generation counter
+whenever something outside the daemon's own outputs changes; a memoised
+command whose generation is unchanged is answered without running anything,
+and a change to the config file reloads it.
+
+The protocol is one JSON line each way per connection::
+
+    -> {"command": "verify", "args": {...}, "cwd": "/repo"}
+    <- {"payload": {...}}            or  {"error": "...", "exit": 2}
+
+:func:`request` returns ``None`` whenever no daemon serves the current
+directory, so callers fall back to running the command themselves.
+"""
+from __future__ import annotations
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+SOCKET_NAME = "adrflow.sock"
+ENV_DISABLE = "ADRFLOW_DAEMON"  # "0" makes the CLI ignore a running daemon
+CONFIG_PATH = ".adrflow.yaml"
+
+Handler = Callable[..., Any]
+
+
+def socket_path(cfg: Dict[str, Any]) -> str:
+    configured = (cfg.get("serve") or {}).get("socket")
+    if configured:
+        return str(configured)
+    reports_dir = cfg.get("paths", {}).get("reports", "reports/")
+    return os.path.join(reports_dir, ".cache", SOCKET_NAME)
+
+
+def _send(conn: socket.socket, message: Dict[str, Any]) -> None:
+    conn.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def _recv(conn: socket.socket) -> Optional[Dict[str, Any]]:
+    chunks = []
+    while True:
+        chunk = conn.recv(1 << 16)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    data = b"".join(chunks)
+    return json.loads(data) if data.strip() else None
+
+
+def request(path: str, command: str, args: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Ask the daemon at ``path`` to run ``command``; ``None`` if none is serving this directory."""
+    if os.environ.get(ENV_DISABLE) == "0" or not os.path.exists(path):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(path)
+        _send(conn, {"command": command, "args": args or {}, "cwd": os.getcwd()})
+        response = _recv(conn)
+    except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+        return None
+    finally:
+        conn.close()
+    if not response or response.get("exit") == "wrong-root":
+        return None
+    return response
+
+
+class Daemon:
+    """Serve ``handlers`` (``handler(cfg, **args) -> payload``) for the current directory.
+
+    ``outputs(cfg)`` names the files the handlers themselves write; changes
+    to them do not invalidate memoised results. Handlers raise
+    ``ValueError`` for bad arguments.
+    """
+
+    def __init__(
+        self,
+        load_cfg: Callable[[], Dict[str, Any]],
+        handlers: Dict[str, Handler],
+        outputs: Callable[[Dict[str, Any]], Iterable[str]] = lambda cfg: (),
+        memoize: Iterable[str] = ("verify",),
+        watch: bool = True,
+        polling: bool = False,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.root = os.getcwd()
+        self.handlers = handlers
+        self._load_cfg = load_cfg
+        self._outputs = outputs
+        self._memoize = set(memoize)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._memo: Dict[Tuple[str, str], Tuple[int, Any]] = {}
+        self._stop = threading.Event()
+        self.stats = {"requests": 0, "memo_hits": 0, "reloads": 0, "changes": 0}
+        self.cfg: Dict[str, Any] = {}
+        self._ignored: Set[str] = set()
+        self._stale_cfg = False
+        self._reload()
+        self.watcher = None
+        if watch:
+            # Only the daemon watches; CLI clients skip importing ctypes & co.
+            from fswatch import Watcher, repo_excludes
+
+            excludes = repo_excludes(self.cfg.get("paths", {}).get("reports", "reports/"))
+            self.watcher = Watcher(".", excludes=excludes, polling=polling, poll_interval=poll_interval)
+            threading.Thread(target=self._watch, name="adrflow-watch", daemon=True).start()
+
+    def _reload(self) -> None:
+        self.cfg = self._load_cfg()
+        self._ignored = {os.path.normpath(path) for path in self._outputs(self.cfg)}
+        with self._lock:
+            self._memo.clear()
+            self.stats["reloads"] += 1
+
+    def _watch(self) -> None:
+        while not self._stop.is_set():
+            try:
+                changed = self.watcher.poll(timeout=0.5)
+            except (OSError, ValueError):  # closed on shutdown
+                return
+            relevant = {path for path in changed if os.path.normpath(path) not in self._ignored}
+            if not relevant:
+                continue
+            with self._lock:
+                self._generation += 1
+                self.stats["changes"] += len(relevant)
+                if CONFIG_PATH in relevant or "." in relevant:
+                    self._memo.clear()
+                    self._stale_cfg = True
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        command = message.get("command")
+        args = message.get("args") or {}
+        if message.get("cwd") and os.path.realpath(message["cwd"]) != os.path.realpath(self.root):
+            return {"error": f"daemon serves {self.root}", "exit": "wrong-root"}
+        if command == "status":
+            return {"payload": dict(self.stats, pid=os.getpid(), root=self.root, generation=self._generation,
+                                    watcher=self.watcher.backend if self.watcher else None)}
+        if command == "shutdown":
+            self._stop.set()
+            return {"payload": {"stopped": True}}
+        handler = self.handlers.get(command)
+        if handler is None:
+            return {"error": f"unknown command {command!r}", "exit": 2}
+        self.stats["requests"] += 1
+        if self._stale_cfg:
+            self._stale_cfg = False
+            self._reload()
+        key = (command, json.dumps(args, sort_keys=True))
+        with self._lock:
+            generation = self._generation
+            memo = self._memo.get(key) if command in self._memoize else None
+        if memo is not None and memo[0] == generation:
+            self.stats["memo_hits"] += 1
+            return {"payload": memo[1]}
+        try:
+            payload = handler(self.cfg, **args)
+        except ValueError as exc:
+            return {"error": str(exc), "exit": 2}
+        if command in self._memoize:
+            with self._lock:
+                # Memoise against the generation seen before the run, so edits
+                # made while it ran invalidate the result.
+                self._memo[key] = (generation, payload)
+        return {"payload": payload}
+
+    def serve_forever(self, path: str) -> None:
+        """Accept requests on ``path`` one at a time until ``shutdown`` or SIGTERM."""
+        if request(path, "status", timeout=2) is not None:
+            raise RuntimeError(f"a daemon is already listening on {path}")
+        if os.path.exists(path):
+            os.unlink(path)  # stale socket of a daemon that died
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(16)
+        server.settimeout(0.5)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                with conn:
+                    conn.settimeout(None)
+                    try:
+                        message = _recv(conn)
+                        response = self.handle(message or {})
+                    except Exception as exc:  # keep serving after a broken request
+                        response = {"error": f"{type(exc).__name__}: {exc}", "exit": 2}
+                    try:
+                        _send(conn, response)
+                    except OSError:
+                        pass
+        finally:
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+            self._stop.set()
+            if self.watcher is not None:
+                self.watcher.close()
+
+
+def wait_for(path: str, timeout: float = 10.0) -> bool:
+    """Poll until a daemon answers on ``path`` (for scripts starting one in the background)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if request(path, "status", timeout=1) is not None:
+            return True
+        time.sleep(0.05)
+    return False
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""Coverage of the lines a change touches (diff coverage).
+
+The changed line ranges of ``git diff --unified=0`` are intersected with the
+executed/missing lines and branch arcs of ``coverage.json``. Both sides are
+held as :class:`IntervalSet` (sorted disjoint ranges in one flat array), and
+only files present in the diff are expanded, so a report covering tens of
+thousands of files costs one pass over it. The result,
+``reports/diff_coverage.json``, is checked by ``dod_gate`` against
+``coverage.diff_thresholds`` in ``ci_checks.yaml``; the report records the
+commit (and base) it was computed for, so a stale one does not count.
+"""
+from __future__ import annotations
+import argparse
+import os
+import re
+import subprocess
+import sys
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import coverage_summary
+import reports_fs
+import tracing
+from common import fail, ok, write_json
+
+_HUNK = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class IntervalSet:
+    """Sorted, disjoint, inclusive line ranges stored flat: ``[s0, e0, s1, e1, ...]``."""
+
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds: Iterable[int] = ()) -> None:
+        self.bounds = array("L", bounds)
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[Tuple[int, int]]) -> "IntervalSet":
+        bounds: List[int] = []
+        for start, end in sorted(ranges):
+            if bounds and start <= bounds[-1] + 1:
+                bounds[-1] = max(bounds[-1], end)
+            else:
+                bounds.extend((start, end))
+        return cls(bounds)
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[int]) -> "IntervalSet":
+        return cls.from_ranges((line, line) for line in lines)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        bounds = self.bounds
+        return ((bounds[i], bounds[i + 1]) for i in range(0, len(bounds), 2))
+
+    def __len__(self) -> int:
+        """Number of lines covered by the ranges."""
+        return sum(end - start + 1 for start, end in self)
+
+    def __bool__(self) -> bool:
+        return bool(self.bounds)
+
+    def __contains__(self, line: int) -> bool:
+        index = bisect_right(self.bounds, line)
+        return index % 2 == 1 or (index > 0 and self.bounds[index - 1] == line)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, IntervalSet) and self.bounds == other.bounds
+
+    def __or__(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet.from_ranges([*self, *other])
+
+    def __and__(self, other: "IntervalSet") -> "IntervalSet":
+        out: List[int] = []
+        mine, theirs = list(self), list(other)
+        i = j = 0
+        while i < len(mine) and j < len(theirs):
+            start = max(mine[i][0], theirs[j][0])
+            end = min(mine[i][1], theirs[j][1])
+            if start <= end:
+                out.extend((start, end))
+            if mine[i][1] < theirs[j][1]:
+                i += 1
+            else:
+                j += 1
+        return IntervalSet(out)
+
+    def __sub__(self, other: "IntervalSet") -> "IntervalSet":
+        out: List[int] = []
+        theirs = list(other)
+        j = 0
+        for start, end in self:
+            while j < len(theirs) and theirs[j][1] < start:
+                j += 1
+            cursor, k = start, j
+            while k < len(theirs) and theirs[k][0] <= end:
+                if theirs[k][0] > cursor:
+                    out.extend((cursor, theirs[k][0] - 1))
+                cursor = max(cursor, theirs[k][1] + 1)
+                k += 1
+            if cursor <= end:
+                out.extend((cursor, end))
+        return IntervalSet(out)
+
+    def ranges(self) -> List[List[int]]:
+        return [[start, end] for start, end in self]
+
+
+_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, '"': 34, "\\": 92}
+
+
+def _unquote(path: str) -> str:
+    """A path as git prints it: C-quoted (octal UTF-8 bytes) when it has unusual characters."""
+    if not (len(path) > 1 and path[0] == path[-1] == '"'):
+        return path
+    out = bytearray()
+    text, i = path[1:-1], 0
+    while i < len(text):
+        char = text[i]
+        if char != "\\" or i + 1 == len(text):
+            out += char.encode("utf-8")
+            i += 1
+        elif text[i + 1] in "01234567":
+            out.append(int(text[i + 1:i + 4], 8))
+            i += 4
+        else:
+            out.append(_ESCAPES.get(text[i + 1], ord(text[i + 1])))
+            i += 2
+    return out.decode("utf-8", "surrogateescape")
+
+
+def parse_unified_diff(lines: Iterable[str]) -> Dict[str, IntervalSet]:
+    """Added/modified line ranges per new path from ``git diff --unified=0`` output.
+
+    Paths are expected with git's default ``b/`` prefix (see
+    :func:`git_changed_lines`); quoted paths are decoded.
+    """
+    ranges: Dict[str, List[Tuple[int, int]]] = {}
+    current: Optional[List[Tuple[int, int]]] = None
+    old = new = 0  # hunk lines still to come; "+++ x" among them is content, not a header
+    for line in lines:
+        marker = line[:1]
+        if (old > 0 or new > 0) and marker in (" ", "+", "-", "\\"):
+            if marker != "\\":  # "\ No newline at end of file"
+                old -= marker != "+"
+                new -= marker != "-"
+            continue
+        if line.startswith("+++ "):
+            # git appends a tab to names containing spaces.
+            target = _unquote(line[4:].rstrip("\n").rstrip("\t"))
+            current = None if target == "/dev/null" else ranges.setdefault(target[2:] if target.startswith("b/") else target, [])
+            continue
+        match = _HUNK.match(line)
+        if match:
+            old, start, new = int(match.group(1) or 1), int(match.group(2)), int(match.group(3) or 1)
+            if new and current is not None:
+                current.append((start, start + new - 1))
+    return {path: IntervalSet.from_ranges(spans) for path, spans in ranges.items() if spans}
+
+
+def git_merge_base(base: str, cwd: str = ".") -> str:
+    """The commit where ``HEAD`` forked from ``base``."""
+    return subprocess.run(
+        ["git", "merge-base", base, "HEAD"], cwd=cwd, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+
+
+def git_changed_lines(base: str, cwd: str = ".") -> Dict[str, IntervalSet]:
+    """Lines changed in the working tree since it forked from ``base``, untracked files included.
+
+    The diff starts at the merge base (like ``git diff base...``), so commits
+    that landed on ``base`` afterwards do not count as changes.
+    """
+    # Fixed a/ b/ prefixes whatever diff.noprefix / diff.mnemonicPrefix say.
+    diff = subprocess.run(
+        [
+            "git", "-c", "core.quotePath=false", "diff", "--unified=0", "--no-color", "--no-ext-diff", "-M", "--relative",
+            "--src-prefix=a/", "--dst-prefix=b/", git_merge_base(base, cwd), "--",
+        ],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    ).stdout
+    changed = parse_unified_diff(diff.splitlines())
+    untracked = subprocess.run(
+        ["git", "ls-files", "-z", "--others", "--exclude-standard"],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    ).stdout
+    for path in filter(None, untracked.split("\0")):
+        try:
+            with open(os.path.join(cwd, path), "rb") as handle:
+                count = sum(1 for _ in handle)
+        except OSError:
+            continue
+        if count:
+            changed[path] = IntervalSet([1, count])
+    return changed
+
+
+def git_revision(ref: str = "HEAD", cwd: str = ".") -> Optional[str]:
+    """The commit sha ``ref`` names, or ``None`` outside a git checkout."""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"], cwd=cwd, capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def iter_coverage_files(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """``(file, entry)`` pairs of a coverage.py JSON report, streamed one entry at a time."""
+    with reports_fs.open_binary(path) as handle:
+        for key, value in coverage_summary.iter_members(handle):
+            if len(key) == 2:
+                yield key[1], value
+
+
+def _norm(path: str, root: str) -> str:
+    if os.path.isabs(path):
+        path = os.path.relpath(path, root)
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _percent(covered: int, total: int) -> Optional[float]:
+    return round(100.0 * covered / total, 2) if total else None
+
+
+def diff_coverage(coverage_path: str, changed: Dict[str, IntervalSet], root: str = ".") -> Dict[str, Any]:
+    """Changed-line and changed-branch coverage of ``changed`` according to ``coverage_path``.
+
+    Branch arcs count when their source line changed. Changed files the
+    report does not know are listed under ``unmeasured``.
+    """
+    wanted = {_norm(path, root): lines for path, lines in changed.items()}
+    files: Dict[str, Dict[str, Any]] = {}
+    for name, entry in iter_coverage_files(coverage_path):
+        path = _norm(name, root)
+        lines = wanted.get(path)
+        if lines is None:
+            continue
+        executed = IntervalSet.from_lines(entry.get("executed_lines") or [])
+        coverable = executed | IntervalSet.from_lines(entry.get("missing_lines") or [])
+        touched = lines & coverable
+        covered = lines & executed
+        hit = sum(1 for arc in entry.get("executed_branches") or [] if arc[0] in lines)
+        miss = sum(1 for arc in entry.get("missing_branches") or [] if arc[0] in lines)
+        files[path] = {
+            "changed": len(lines),
+            "coverable": len(touched),
+            "covered": len(covered),
+            "missing": (touched - covered).ranges(),
+            "branches": hit + miss,
+            "covered_branches": hit,
+        }
+    totals = {key: sum(item[key] for item in files.values()) for key in ("changed", "coverable", "covered", "branches", "covered_branches")}
+    return {
+        "line": _percent(totals["covered"], totals["coverable"]),
+        "branch": _percent(totals["covered_branches"], totals["branches"]),
+        "changed_lines": sum(len(lines) for lines in wanted.values()),
+        "coverable_lines": totals["coverable"],
+        "covered_lines": totals["covered"],
+        "branches": totals["branches"],
+        "covered_branches": totals["covered_branches"],
+        "files": dict(sorted(files.items())),
+        "unmeasured": sorted(set(wanted) - set(files)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Coverage of the lines changed since a git ref")
+    parser.add_argument("--coverage", default="reports/coverage.json", help="coverage.py JSON report")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--base", help="Git ref to diff the working tree against (e.g. origin/main)")
+    source.add_argument("--diff-file", help="Output of git diff --unified=0 ('-' = stdin)")
+    parser.add_argument("--root", default=".", help="Repository root the report's paths are relative to")
+    parser.add_argument("--out", default="reports/diff_coverage.json")
+    args = parser.parse_args()
+
+    with tracing.span("diff_coverage", **{"adrflow.out": args.out}):
+        if args.diff_file == "-":
+            changed = parse_unified_diff(sys.stdin)
+        elif args.diff_file:
+            changed = parse_unified_diff(Path(args.diff_file).read_text(encoding="utf-8").splitlines())
+        else:
+            try:
+                changed = git_changed_lines(args.base, args.root)
+            except subprocess.CalledProcessError as exc:
+                fail(f"git diff against {args.base} failed: {exc.stderr.strip()}")
+        if not reports_fs.is_file(args.coverage):
+            fail(f"{args.coverage} not found")
+        # dod_gate checks these against the tree (and coverage.diff_base) it evaluates.
+        report = {
+            "head": git_revision("HEAD", args.root),
+            "base": args.base,
+            "base_sha": git_revision(args.base, args.root) if args.base else None,
+            "merge_base": git_merge_base(args.base, args.root) if args.base else None,
+            **diff_coverage(args.coverage, changed, args.root),
+        }
+        write_json(args.out, report)
+    ok(f"Diff coverage: line {report['line']}, branch {report['branch']} ({report['coverable_lines']} changed coverable lines)")
+
+
+if __name__ == "__main__":
+    main()
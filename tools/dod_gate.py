@@ -5,17 +5,22 @@ from __future__ import annotations
 
 import argparse
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import yaml
 
-from common import fail, ok, read_json, write_json
+import coverage_summary
+import reports_fs
+import tracing
+from common import fail, ok, write_json
+from metrics import timed, write_timings
 
 
 def _load_yaml(path: Path) -> Dict[str, Any]:
     if not path.exists():
         return {}
-    return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    with tracing.span("artifact.read", **{"adrflow.artifact": str(path)}):
+        return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
 
 
 def _flatten_required_artifacts(raw: Any) -> List[str]:
@@ -35,14 +40,64 @@ def _collect_artifacts(entries: Iterable[str]) -> Dict[str, Any]:
     missing: List[str] = []
     present: List[str] = []
     for entry in entries:
-        candidate = Path(entry)
-        if candidate.exists():
-            present.append(str(candidate))
+        candidate = str(Path(entry))
+        if reports_fs.exists(candidate):
+            present.append(candidate)
         else:
-            missing.append(str(candidate))
+            missing.append(candidate)
     return {"ok": not missing, "present": present, "missing": missing}
 
 
+REPORT_FILES = (
+    "adr_trace.json",
+    "adr_log_check.json",
+    "coverage.json",
+    "diff_coverage.json",
+    "security.json",
+    "performance.json",
+    "mutation.json",
+)
+
+
+LOCAL_HEAD = "HEAD"
+
+
+def _diff_provenance(data: Dict[str, Any], head: Optional[str], base: Optional[str]) -> List[str]:
+    """Misses for a ``diff_coverage.json`` computed for another commit or base."""
+    miss: List[str] = []
+    recorded = data.get("head")
+    if head == LOCAL_HEAD:
+        from diff_coverage import git_revision
+
+        head = git_revision()
+    if not recorded:
+        miss.append("diff_coverage.json does not record the commit it was computed for")
+    elif head and recorded != head:
+        miss.append(f"diff_coverage.json is for commit {recorded[:12]}, not {head[:12]}")
+    if base and data.get("base") != base:
+        miss.append(f"diff_coverage.json diffs against {data.get('base')}, not {base}")
+    return miss
+
+
+def _rebased(path: Any, rebase: Optional[Tuple[str, str]]) -> str:
+    """``path`` under ``rebase[1]`` if it lies in the reports tree ``rebase[0]``."""
+    if not rebase:
+        return str(path)
+    return reports_fs.rebase(path, *rebase) or str(path)
+
+
+def referenced_paths(
+    dod_path: str, checks_path: str, reports_dir: str = "reports", rebase: Optional[Tuple[str, str]] = None
+) -> List[str]:
+    """Every file ``evaluate_dod`` may read: the reports, required artifacts and e2e evidence."""
+    dod = _load_yaml(Path(dod_path))
+    checks = _load_yaml(Path(checks_path))
+    paths = [reports_fs.join(reports_dir, name) for name in REPORT_FILES]
+    paths.extend(_rebased(entry, rebase) for entry in _flatten_required_artifacts(checks.get("required_artifacts")))
+    paths.extend(_rebased(entry, rebase) for entry in dod.get("evidence", {}).get("e2e", []))
+    return list(dict.fromkeys(paths))
+
+
 def _thresholds(section: Dict[str, Any]) -> Dict[str, Any]:
     if not section:
         return {}
@@ -53,39 +108,81 @@ def _thresholds(section: Dict[str, Any]) -> Dict[str, Any]:
     return section
 
 
-def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports") -> Dict[str, Any]:
-    """Calculate a structured DoD verdict."""
-
-    reports_root = Path(reports_dir)
-    dod = _load_yaml(Path(dod_path))
-    checks = _load_yaml(Path(checks_path))
+def evaluate_dod(
+    dod_path: str,
+    checks_path: str,
+    reports_dir: str = "reports",
+    reports: Optional[Dict[str, Any]] = None,
+    timings: Optional[Dict[str, float]] = None,
+    embed_raw: Optional[bool] = None,
+    head: Optional[str] = LOCAL_HEAD,
+    rebase: Optional[Tuple[str, str]] = None,
+) -> Dict[str, Any]:
+    """Calculate a structured DoD verdict.
+
+    ``reports`` maps report file names (``"adr_trace.json"``, ...) to payloads
+    already held in memory; those are used instead of re-reading the file
+    from ``reports_dir``. ``timings["load_sources"]`` accumulates the time
+    spent loading the DoD, checks and reports.
+
+    Coverage is summarised from ``coverage.json`` without loading it whole;
+    the verdict references the report by path and sha256. ``embed_raw``
+    (default: ``coverage.embed_raw`` in the checks) also copies it in.
+
+    ``diff_coverage.json`` counts only if it was computed at ``head``: a
+    commit sha, ``LOCAL_HEAD`` for the local checkout, or ``None`` when the
+    tree it describes is not at hand (a CI run evaluated elsewhere).
+
+    ``rebase`` = ``(origin, root)`` moves required artifacts and e2e evidence
+    listed under the reports tree ``origin`` to ``root``, where a fetched
+    run's reports live.
+    """
+
+    preloaded = reports or {}
+
+    def _report(name: str) -> Any:
+        if name in preloaded:
+            return preloaded[name]
+        path = reports_fs.join(reports_dir, name)
+        with timed(timings, "load_sources"), tracing.span("artifact.read", **{"adrflow.artifact": path}):
+            return reports_fs.read_json(path, {})
+
+    with timed(timings, "load_sources"):
+        dod = _load_yaml(Path(dod_path))
+        checks = _load_yaml(Path(checks_path))
 
     summary_miss: List[str] = []
 
-    adr_trace_report = read_json(reports_root / "adr_trace.json", {})
+    adr_trace_report = _report("adr_trace.json")
     adr_trace_ok = bool(adr_trace_report.get("pass"))
     adr_trace_miss = adr_trace_report.get("miss", []) if adr_trace_report else ["adr_trace.json missing"]
     if not adr_trace_ok:
         summary_miss.extend([f"adr-trace: {m}" for m in adr_trace_miss])
 
-    log_report = read_json(reports_root / "adr_log_check.json", {})
+    log_report = _report("adr_log_check.json")
     log_ok = bool(log_report.get("pass"))
     log_miss = log_report.get("miss", []) if log_report else ["adr_log_check.json missing"]
     if not log_ok:
         summary_miss.extend([f"log-vs-adr: {m}" for m in log_miss])
 
-    coverage_data = read_json(reports_root / "coverage.json", {}) or {}
-    coverage_actual = {
-        "line": coverage_data.get("line"),
-        "branch": coverage_data.get("branch"),
-    }
-    totals = coverage_data.get("totals", {}) if isinstance(coverage_data, dict) else {}
-    if coverage_actual["line"] is None:
-        coverage_actual["line"] = totals.get("percent_covered")
-    if coverage_actual["branch"] is None:
-        coverage_actual["branch"] = totals.get("percent_covered_branch")
-    if coverage_actual["branch"] is None and coverage_data.get("meta", {}).get("branch_coverage") is False:
-        coverage_actual["branch"] = coverage_actual["line"]
+    coverage_section = checks.get("coverage") or {}
+    packages = coverage_section.get("packages") if isinstance(coverage_section, dict) else None
+    packages = 1 if packages is True else packages
+    coverage_path = reports_fs.join(reports_dir, "coverage.json")
+    if "coverage.json" in preloaded:
+        coverage_data = coverage_summary.from_report(preloaded["coverage.json"], packages)
+    else:
+        with timed(timings, "load_sources"), tracing.span("artifact.read", **{"adrflow.artifact": coverage_path}):
+            coverage_data = coverage_summary.summarize(coverage_path, packages)
+    coverage_data = coverage_data or {}
+    coverage_actual: Dict[str, Any] = {"line": coverage_data.get("line"), "branch": coverage_data.get("branch")}
+    for key in ("source", "packages"):
+        if key in coverage_data:
+            coverage_actual[key] = coverage_data[key]
+    if embed_raw is None:
+        embed_raw = bool(isinstance(coverage_section, dict) and coverage_section.get("embed_raw"))
+    if embed_raw:
+        coverage_actual["raw"] = _report("coverage.json")
     coverage_thresholds = _thresholds(checks.get("coverage", {}))
     coverage_miss: List[str] = []
     coverage_ok = True
@@ -109,7 +206,26 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
     if not coverage_ok:
         summary_miss.extend([f"coverage: {m}" for m in coverage_miss])
 
-    security_data = read_json(reports_root / "security.json", {}) or {}
+    # Changed-line coverage (tools/diff_coverage.py) against coverage.diff_thresholds.
+    diff_thresholds = coverage_section.get("diff_thresholds") if isinstance(coverage_section, dict) else None
+    diff_thresholds = diff_thresholds or {}
+    diff_data = _report("diff_coverage.json") or {}
+    diff_miss: List[str] = []
+    if diff_thresholds and not diff_data:
+        diff_miss.append("diff_coverage.json missing")
+    elif diff_thresholds:
+        diff_miss.extend(_diff_provenance(diff_data, head, coverage_section.get("diff_base")))
+    if diff_thresholds and not diff_miss:
+        for key, label in (("line", "changed-line"), ("branch", "changed-branch")):
+            required, current = diff_thresholds.get(key), diff_data.get(key)
+            # No coverable changed lines (or branches) leaves nothing to miss.
+            if required is not None and current is not None and current < required:
+                diff_miss.append(f"{label} coverage {current} < {required}")
+    diff_ok = not diff_miss
+    if not diff_ok:
+        summary_miss.extend([f"diff-coverage: {m}" for m in diff_miss])
+
+    security_data = _report("security.json") or {}
     security_thresholds = _thresholds(checks.get("security", {}))
     security_ok = True
     security_miss: List[str] = []
@@ -130,7 +246,7 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
         summary_miss.extend([f"security: {m}" for m in security_miss])
 
     performance_thresholds = _thresholds(checks.get("performance", {}))
-    performance_data = read_json(reports_root / "performance.json", {}) or {}
+    performance_data = _report("performance.json") or {}
     performance_miss: List[str] = []
     performance_ok = True
     if performance_thresholds:
@@ -154,7 +270,7 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
         summary_miss.extend([f"performance: {m}" for m in performance_miss])
 
     mutation_threshold = checks.get("mutation", {}).get("score")
-    mutation_data = read_json(reports_root / "mutation.json", {}) or {}
+    mutation_data = _report("mutation.json") or {}
     mutation_ok = True
     mutation_miss: List[str] = []
     if mutation_threshold is not None and mutation_threshold > 0:
@@ -167,7 +283,7 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
     if not mutation_ok:
         summary_miss.extend([f"mutation: {m}" for m in mutation_miss])
 
-    required_artifacts = _flatten_required_artifacts(checks.get("required_artifacts"))
+    required_artifacts = [_rebased(entry, rebase) for entry in _flatten_required_artifacts(checks.get("required_artifacts"))]
     artifacts_state = _collect_artifacts(required_artifacts)
     if not artifacts_state["ok"]:
         summary_miss.extend([f"artifact missing: {item}" for item in artifacts_state["missing"]])
@@ -176,10 +292,11 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
     e2e_reports: Dict[str, Any] = {}
     e2e_ok = True
     for entry in e2e_entries:
-        entry_path = Path(entry)
-        data = read_json(entry_path, {})
+        entry_path = Path(_rebased(entry, rebase))
+        with tracing.span("artifact.read", **{"adrflow.artifact": str(entry_path)}):
+            data = reports_fs.read_json(entry_path, {})
         step_ok = bool(data.get("ok")) or bool(data.get("pass"))
-        if not entry_path.exists():
+        if not reports_fs.exists(entry_path):
             step_ok = False
             data = {}
         e2e_reports[str(entry_path)] = {"ok": step_ok, "data": data}
@@ -190,20 +307,29 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
     result = {
         "adr_trace": {
             "ok": adr_trace_ok,
-            "report": str((reports_root / "adr_trace.json").resolve()),
+            "report": reports_fs.absolute(reports_fs.join(reports_dir, "adr_trace.json")),
             "miss": adr_trace_miss,
         },
         "logs": {
             "ok": log_ok,
-            "report": str((reports_root / "adr_log_check.json").resolve()),
+            "report": reports_fs.absolute(reports_fs.join(reports_dir, "adr_log_check.json")),
             "miss": log_miss,
         },
         "coverage": {
             "ok": coverage_ok,
-            "actual": {"line": coverage_actual.get("line"), "branch": coverage_actual.get("branch"), "raw": coverage_data},
+            "actual": coverage_actual,
             "thresholds": coverage_thresholds,
             "miss": coverage_miss,
         },
+        "diff_coverage": {
+            "ok": diff_ok,
+            "actual": {
+                key: diff_data.get(key)
+                for key in ("head", "base", "line", "branch", "changed_lines", "coverable_lines", "covered_lines", "branches", "covered_branches")
+            },
+            "thresholds": diff_thresholds,
+            "miss": diff_miss,
+        },
         "security": {
             "ok": security_ok,
             "actual": security_data,
@@ -230,16 +356,48 @@ def evaluate_dod(dod_path: str, checks_path: str, reports_dir: str = "reports")
     return result
 
 
+def run_dod(
+    dod_path: str,
+    checks_path: str,
+    out: str = "reports/dod_gate.json",
+    reports_dir: str = "reports",
+    reports: Optional[Dict[str, Any]] = None,
+    timings: Optional[Dict[str, float]] = None,
+    embed_raw: Optional[bool] = None,
+    head: Optional[str] = LOCAL_HEAD,
+) -> Dict[str, Any]:
+    """Evaluate the DoD, write the verdict to ``out`` and return it."""
+    with timed(timings, "evaluate"), tracing.span("dod.evaluate"):
+        payload = evaluate_dod(
+            dod_path, checks_path, reports_dir=reports_dir, reports=reports, timings=timings, embed_raw=embed_raw, head=head
+        )
+    if timings is not None:
+        # Report evaluation net of the source loading it contains.
+        timings["evaluate"] = round(timings["evaluate"] - timings.get("load_sources", 0.0), 3)
+    with timed(timings, "report"):
+        write_json(out, payload)
+    return payload
+
+
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--dod", required=True)
     parser.add_argument("--checks", required=True)
     parser.add_argument("--out", default="reports/dod_gate.json")
-    parser.add_argument("--reports", default="reports")
+    parser.add_argument("--reports", default="reports", help="Reports directory or archive.zip[!dir]")
+    parser.add_argument("--timings", help="Write per-phase timings (ms) as JSON to this file")
+    parser.add_argument(
+        "--embed-raw",
+        action="store_true",
+        default=None,
+        help="Copy coverage.json into the verdict instead of referencing it by path and sha256",
+    )
     args = parser.parse_args()
 
-    payload = evaluate_dod(args.dod, args.checks, reports_dir=args.reports)
-    write_json(args.out, payload)
+    timings: Optional[Dict[str, float]] = {} if args.timings else None
+    with tracing.span("dod_gate", **{"adrflow.out": args.out}):
+        payload = run_dod(args.dod, args.checks, args.out, reports_dir=args.reports, timings=timings, embed_raw=args.embed_raw)
+    write_timings(args.timings, timings)
 
     if payload["summary"]["ok"]:
         ok("DoD Gate PASS")
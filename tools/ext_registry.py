@@ -1,31 +1,90 @@
-"""Registry helpers for adapters, gates and LLM judges with plugin discovery."""
+"""Registry helpers for adapters, gates and LLM judges with plugin discovery.
+
+Discovery imports every plugin module once and records which registry keys
+each module registered in a manifest (``plugins.manifest``, by default
+``<reports>/.cache/plugins.json``). While the plugin folders and the
+installed distributions are unchanged, later runs read the manifest instead
+and register the keys lazily: the owning module is imported on the first
+``get`` of one of its keys. Plugins therefore should only register things at
+import time.
+"""
 from __future__ import annotations
+import hashlib
 import importlib
+import json
 import pkgutil
 import os
 import sys
-from typing import Any, Dict, Iterable
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+MANIFEST_VERSION = 1
+
+_import_lock = threading.RLock()
+_loading: List[str] = []  # plugin modules being imported, innermost last
+
+
+@contextmanager
+def _importing(module_name: str) -> Iterator[None]:
+    _loading.append(module_name)
+    try:
+        yield
+    finally:
+        _loading.pop()
 
 
 class Registry:
-    """Simple case-insensitive registry with last-wins semantics."""
+    """Simple case-insensitive registry with last-wins semantics.
+
+    Keys may also be registered lazily as the name of the module that
+    registers them on import; such a key shadows eager registrations from
+    other modules, as the plugin would have when imported after them.
+    """
 
     def __init__(self, name: str):
         self.name = name
         self._items: Dict[str, Any] = {}
+        self._lazy: Dict[str, str] = {}
+        self.owners: Dict[str, str] = {}
 
     def register(self, key: str, obj: Any) -> None:
         k = key.lower()
+        owner = _loading[-1] if _loading else None
+        lazy = self._lazy.get(k)
+        if lazy is not None:
+            if lazy != owner:
+                return
+            del self._lazy[k]
         self._items[k] = obj
+        if owner is not None:
+            self.owners[k] = owner
+        else:
+            self.owners.pop(k, None)
+
+    def register_lazy(self, key: str, module_name: str) -> None:
+        k = key.lower()
+        self._items.pop(k, None)
+        self._lazy[k] = module_name
+        self.owners[k] = module_name
 
     def get(self, key: str) -> Any:
-        return self._items[key.lower()]
+        k = key.lower()
+        if k in self._lazy:
+            with _import_lock:
+                module_name = self._lazy.get(k)
+                if module_name is not None:
+                    with _importing(module_name):
+                        importlib.import_module(module_name)
+                    self._lazy.pop(k, None)  # the module did not register it after all
+        return self._items[k]
 
     def has(self, key: str) -> bool:
-        return key.lower() in self._items
+        k = key.lower()
+        return k in self._items or k in self._lazy
 
     def keys(self) -> list[str]:
-        return list(self._items.keys())
+        return list(self._items.keys()) + [k for k in self._lazy if k not in self._items]
 
 
 adapters = Registry("adapters")
@@ -39,6 +98,9 @@ def _iter_modules(folder: str) -> Iterable[str]:
         yield module.name
 
 
+REGISTRIES = {"adapters": adapters, "gates": gates, "judges": judges}
+
+
 def load_local_plugins(sources: Iterable[str]) -> None:
     cwd = os.getcwd()
     for source in sources:
@@ -50,7 +112,8 @@ def load_local_plugins(sources: Iterable[str]) -> None:
         if cwd not in sys.path:
             sys.path.insert(0, cwd)
         for module_name in _iter_modules(folder):
-            importlib.import_module(module_name)
+            with _importing(module_name):
+                importlib.import_module(module_name)
 
 
 def load_entrypoint_plugins(group: str) -> None:
@@ -61,17 +124,102 @@ def load_entrypoint_plugins(group: str) -> None:
     entries = importlib_metadata.entry_points()
     selected = entries.get(group, []) if hasattr(entries, "get") else [ep for ep in entries if ep.group == group]
     for entry_point in selected:
-        entry_point.load()
+        with _importing(entry_point.value.split(":", 1)[0].strip()):
+            entry_point.load()
 
 
-def discover_plugins(cfg: Dict[str, Any]) -> None:
+def manifest_path(cfg: Dict[str, Any]) -> str:
     plugins_cfg = cfg.get("plugins", {}) or {}
-    sources = plugins_cfg.get("discovery", [])
-    if not sources:
-        return
+    if plugins_cfg.get("manifest"):
+        return str(plugins_cfg["manifest"])
+    reports_dir = cfg.get("paths", {}).get("reports", "reports/")
+    return os.path.join(reports_dir, ".cache", "plugins.json")
+
+
+def _stamp(sources: List[str]) -> str:
+    """Cheap fingerprint of everything discovery depends on.
+
+    Covers the mtimes of the ``local:`` folders and their modules, and of
+    every ``sys.path`` directory (installing or removing a distribution
+    touches its site-packages directory), so no plugin is imported to check.
+    """
+    parts: List[Any] = [sys.version, sources]
+    for source in sources:
+        if not source.startswith("local:"):
+            continue
+        for dirpath, dirnames, filenames in os.walk(source.split(":", 1)[1]):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            parts.append((dirpath, os.stat(dirpath).st_mtime_ns))
+            for name in sorted(filenames):
+                if name.endswith(".py"):
+                    path = os.path.join(dirpath, name)
+                    parts.append((path, os.stat(path).st_mtime_ns))
+    if any(source.startswith("entrypoint:") for source in sources):
+        for entry in sys.path:
+            try:
+                parts.append((entry, os.stat(entry or ".").st_mtime_ns))
+            except OSError:
+                continue
+    return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION else None
+
+
+def _write_manifest(path: str, data: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a read-only checkout just keeps discovering eagerly
+
+
+def _import_plugins(sources: List[str]) -> None:
+    # Builtins first, so the manifest only attributes keys to plugin modules.
+    importlib.import_module("adapters")
+    importlib.import_module("gates")
     local_sources = [s for s in sources if s.startswith("local:")]
     if local_sources:
         load_local_plugins(local_sources)
     for source in sources:
         if source.startswith("entrypoint:"):
             load_entrypoint_plugins(source.split(":", 1)[1])
+
+
+def discover_plugins(cfg: Dict[str, Any], use_manifest: bool = True) -> None:
+    plugins_cfg = cfg.get("plugins", {}) or {}
+    sources = list(plugins_cfg.get("discovery", []))
+    if not sources:
+        return
+    if not use_manifest:
+        _import_plugins(sources)
+        return
+    path = manifest_path(cfg)
+    stamp = _stamp(sources)
+    manifest = _read_manifest(path)
+    if manifest is not None and manifest.get("stamp") == stamp:
+        cwd = os.getcwd()
+        if cwd not in sys.path:
+            sys.path.insert(0, cwd)
+        for name, entries in manifest.get("registries", {}).items():
+            registry = REGISTRIES.get(name)
+            for key, module_name in (entries or {}).items() if registry else ():
+                registry.register_lazy(key, module_name)
+        return
+    _import_plugins(sources)
+    registries = {
+        name: {key: owner for key, owner in registry.owners.items() if registry.has(key)}
+        for name, registry in REGISTRIES.items()
+    }
+    _write_manifest(path, {"version": MANIFEST_VERSION, "stamp": stamp, "registries": registries})
@@ -0,0 +1,160 @@
+"""Pruning directory walker with gitignore-style excludes."""
+from __future__ import annotations
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_EXCLUDES = [".git/", "node_modules/", ".venv/", "reports/", "**/docs/adr/"]
+
+
+def _translate(pattern: str) -> str:
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """Ordered gitignore-style rules; the last matching rule wins."""
+
+    def __init__(self) -> None:
+        self._rules: List[Tuple[str, "re.Pattern[str]", bool, bool]] = []
+
+    def add(self, pattern: str, base: str = "") -> None:
+        pattern = pattern.rstrip("\n").rstrip()
+        if not pattern or pattern.startswith("#"):
+            return
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        body = _translate(pattern)
+        regex = re.compile(("^" if anchored else "^(?:.*/)?") + body + "$")
+        self._rules.append((base, regex, negate, dir_only))
+
+    def extend(self, patterns: Iterable[str], base: str = "") -> None:
+        for pattern in patterns:
+            self.add(pattern, base)
+
+    def load(self, gitignore_path: str, base: str = "") -> None:
+        try:
+            with open(gitignore_path, encoding="utf-8", errors="ignore") as handle:
+                self.extend(handle, base)
+        except OSError:
+            pass
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        result = False
+        for base, regex, negate, dir_only in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                candidate = rel_path[len(base) + 1:]
+            else:
+                candidate = rel_path
+            if regex.match(candidate):
+                result = not negate
+        return result
+
+
+def build_rules(excludes: Optional[Iterable[str]] = None) -> IgnoreRules:
+    rules = IgnoreRules()
+    rules.extend(DEFAULT_EXCLUDES if excludes is None else excludes)
+    return rules
+
+
+def walk_files(
+    root: str,
+    excludes: Optional[Iterable[str]] = None,
+    gitignore: bool = True,
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """Yield ``(rel_path, entry)`` for regular files under ``root`` in sorted order.
+
+    Excluded directories are pruned before descending, so ``.git`` or
+    ``node_modules`` cost one ``stat`` rather than a full traversal.
+    """
+    rules = build_rules(excludes)
+    stack: List[str] = [""]
+    while stack:
+        rel_dir = stack.pop()
+        abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+        if gitignore:
+            rules.load(os.path.join(abs_dir, ".gitignore"), rel_dir)
+        try:
+            with os.scandir(abs_dir) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs: List[str] = []
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if rules.ignored(rel, is_dir):
+                continue
+            if is_dir:
+                subdirs.append(rel)
+            elif entry.is_file(follow_symlinks=False):
+                yield rel, entry
+        stack.extend(reversed(subdirs))
+
+
+def is_excluded(
+    root: str,
+    rel_path: str,
+    excludes: Optional[Iterable[str]] = None,
+    gitignore: bool = True,
+) -> bool:
+    """Answer the same question as :func:`walk_files` for a single path."""
+    rules = build_rules(excludes)
+    parts = rel_path.split("/")
+    for depth in range(len(parts)):
+        rel_dir = "/".join(parts[:depth])
+        if gitignore:
+            abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+            rules.load(os.path.join(abs_dir, ".gitignore"), rel_dir)
+        rel = "/".join(parts[: depth + 1])
+        if rules.ignored(rel, depth < len(parts) - 1):
+            return True
+    return False
@@ -0,0 +1,206 @@
+"""Filesystem change notification: inotify through ctypes, polling elsewhere.
+
+:class:`Watcher` reports paths (relative to its root, ``/``-separated) that
+were created, modified or removed. A reported directory stands for
+everything below it, and ``"."`` (kernel queue overflow) for the whole tree.
+Excluded directories are never watched.
+"""
+from __future__ import annotations
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fswalk import build_rules
+
+WATCH_EXCLUDES = [".git/", "node_modules/", ".venv/", "__pycache__/", ".pytest_cache/", ".mypy_cache/", ".ruff_cache/"]
+EVERYTHING = "."
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+def repo_excludes(reports_dir: str) -> list:
+    """:data:`WATCH_EXCLUDES` plus the caches and profiles adrflow writes under ``reports_dir``."""
+    reports_dir = os.path.normpath(reports_dir).replace(os.sep, "/")
+    return WATCH_EXCLUDES + [f"/{reports_dir}/.cache/", f"/{reports_dir}/profile/"]
+
+
+def _libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+class Watcher:
+    """Wait for changes under ``root``.
+
+    Uses inotify when the platform has it (and the watch limit allows),
+    otherwise compares ``stat`` snapshots every ``poll_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        root: str = ".",
+        excludes: Optional[Iterable[str]] = None,
+        poll_interval: float = 0.5,
+        polling: bool = False,
+    ) -> None:
+        self.root = root
+        self.poll_interval = poll_interval
+        self._rules = build_rules(WATCH_EXCLUDES if excludes is None else excludes)
+        self._fd = -1
+        self._dirs: Dict[int, str] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        libc = None if polling else _libc()
+        if libc is not None:
+            try:
+                self._start_inotify(libc)
+            except OSError:
+                self._stop_inotify()
+        self.backend = "inotify" if self._fd >= 0 else "polling"
+        if self.backend == "polling":
+            self._snapshot = self._scan()
+
+    # -- shared ------------------------------------------------------------
+
+    def _iter_dirs(self, rel_dir: str) -> Iterable[str]:
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            yield current
+            try:
+                with os.scandir(os.path.join(self.root, current) if current else self.root) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                rel = f"{current}/{entry.name}" if current else entry.name
+                if entry.is_dir(follow_symlinks=False) and not self._rules.ignored(rel, True):
+                    stack.append(rel)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot: Dict[str, Tuple[int, int]] = {}
+        for rel_dir in self._iter_dirs(""):
+            try:
+                with os.scandir(os.path.join(self.root, rel_dir) if rel_dir else self.root) as it:
+                    for entry in it:
+                        rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        if entry.is_file(follow_symlinks=False) and not self._rules.ignored(rel, False):
+                            st = entry.stat(follow_symlinks=False)
+                            snapshot[rel] = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                continue
+        return snapshot
+
+    def poll(self, timeout: Optional[float] = None) -> Set[str]:
+        """Block up to ``timeout`` seconds (forever for ``None``) and return the changed paths."""
+        if self.backend == "inotify":
+            return self._poll_inotify(timeout)
+        return self._poll_snapshot(timeout)
+
+    def close(self) -> None:
+        self._stop_inotify()
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- polling -----------------------------------------------------------
+
+    def _poll_snapshot(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = {path for path in current.keys() | self._snapshot.keys() if current.get(path) != self._snapshot.get(path)}
+            self._snapshot = current
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            wait = self.poll_interval if deadline is None else min(self.poll_interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(wait)
+
+    # -- inotify -----------------------------------------------------------
+
+    def _start_inotify(self, libc) -> None:
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for rel_dir in self._iter_dirs(""):
+            self._add_watch(rel_dir)
+
+    def _stop_inotify(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._dirs.clear()
+
+    def _add_watch(self, rel_dir: str) -> None:
+        path = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):  # vanished meanwhile
+                return
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = rel_dir
+
+    def _poll_inotify(self, timeout: Optional[float]) -> Set[str]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed: Set[str] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                raw = data[offset + _EVENT.size: offset + _EVENT.size + length]
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changed.add(EVERYTHING)
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                rel_dir = self._dirs.get(wd)
+                if rel_dir is None:
+                    continue
+                name = os.fsdecode(raw.rstrip(b"\0"))
+                rel = f"{rel_dir}/{name}" if rel_dir else name
+                is_dir = bool(mask & IN_ISDIR)
+                if self._rules.ignored(rel, is_dir):
+                    continue
+                if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files may land in the new directory before it is watched,
+                    # so it is reported as a whole.
+                    try:
+                        for sub in self._iter_dirs(rel):
+                            self._add_watch(sub)
+                    except OSError:
+                        changed.add(EVERYTHING)
+                changed.add(rel)
+        return changed
@@ -1,11 +1,17 @@
 """Base gate definitions."""
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
 import json
 import os
 import pathlib
-import subprocess
+import shlex
+
+from metrics import current_profile_path, run_measured
+
+# ``inprocess`` calls the tools as functions; ``subprocess`` runs each tool in
+# its own interpreter for isolation.
+EXECUTION_MODES = ("inprocess", "subprocess")
 
 
 @dataclass
@@ -13,18 +19,63 @@ class GateResult:
     ok: bool
     miss: List[str]
     artifact: Optional[str] = None
+    # Sub-phase wall times in milliseconds, reported under verify.json metrics.
+    phases: Dict[str, float] = field(default_factory=dict)
 
 
 class Gate:
     key: str = "base"
     title: str = "Base Gate"
+    # Keys of gates that must finish first (in addition to input/output overlap).
+    depends_on: Sequence[str] = ()
+    # Opt in to the verify result cache; the fingerprint then covers
+    # ``inputs``, the ``config_sections`` of .adrflow.yaml and
+    # ``fingerprint_extra``, so they must capture everything the gate reads.
+    cacheable: bool = False
+    config_sections: Sequence[str] = ()
 
     def run(self, cfg: Dict[str, Any]) -> GateResult:  # pragma: no cover - interface
         raise NotImplementedError
 
+    def run_inprocess(self, cfg: Dict[str, Any], reports: Dict[str, Any]) -> GateResult:
+        """Run inside the ``adrflow`` process instead of spawning a tool.
+
+        ``reports`` maps normalised report paths (as listed in ``outputs``) to
+        payloads of gates that already finished; store your own there so
+        dependents can skip re-reading the file. Defaults to ``run``.
+        """
+        return self.run(cfg)
+
+    def execute(self, cfg: Dict[str, Any], reports: Dict[str, Any], execution: str = "inprocess") -> GateResult:
+        if execution == "subprocess":
+            return self.run(cfg)
+        return self.run_inprocess(cfg, reports)
+
+    def inputs(self, cfg: Dict[str, Any]) -> List[str]:
+        """Files this gate reads; a gate producing one of them runs first."""
+        return []
+
+    def outputs(self, cfg: Dict[str, Any]) -> List[str]:
+        """Files this gate writes."""
+        return []
+
+    def input_excludes(self, cfg: Dict[str, Any]) -> Optional[List[str]]:
+        """Exclude patterns for directories in ``inputs`` (``None`` = fswalk defaults)."""
+        return None
+
+    def input_gitignore(self, cfg: Dict[str, Any]) -> bool:
+        return True
+
+    def fingerprint_extra(self, cfg: Dict[str, Any]) -> Any:
+        """Anything else the result depends on (environment, versions), JSON-serialisable."""
+        return None
+
     def run_cmd(self, cmd: str, cwd: Optional[str] = None) -> int:
+        profile = current_profile_path()
+        if profile and cmd.startswith("python "):
+            cmd = f"python -m cProfile -o {shlex.quote(profile)} {cmd[len('python '):]}"
         print(f"[gate:{self.key}] $ {cmd}")
-        return subprocess.call(cmd, shell=True, cwd=cwd or os.getcwd())
+        return run_measured(cmd, shell=True, cwd=cwd or os.getcwd())
 
     def read_json(self, path: str) -> Dict[str, Any]:
         p = pathlib.Path(path)
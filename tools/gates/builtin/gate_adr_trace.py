@@ -1,19 +1,80 @@
 """Builtin gate wrapper for ADR trace."""
 from ..registry import register_gate
 from ..base import Gate, GateResult
+import os
 import pathlib
 
+from metrics import timings_sidecar
+import shlex
+
 
 @register_gate
 class AdrTraceGate(Gate):
     key = "adr-trace"
     title = "ADR Trace"
+    cacheable = True
+    config_sections = ("paths", "trace", "service")
 
-    def run(self, cfg):
-        reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
-        out_path = reports_dir / "adr_trace.json"
-        rc = self.run_cmd(f"python tools/adr_trace.py --src . --adr docs/adr --out {out_path}")
-        data = self.read_json(str(out_path))
+    def inputs(self, cfg):
+        return [cfg.get("paths", {}).get("adr_dir", "docs/adr"), (cfg.get("service") or {}).get("root", ".")]
+
+    def outputs(self, cfg):
+        return [str(pathlib.Path(cfg.get("paths", {}).get("reports", "reports/")) / "adr_trace.json")]
+
+    def input_excludes(self, cfg):
+        return (cfg.get("trace", {}) or {}).get("exclude") or None
+
+    def input_gitignore(self, cfg):
+        return (cfg.get("trace", {}) or {}).get("gitignore") is not False
+
+    def options(self, cfg):
+        """Keyword arguments for ``adr_trace.run_trace`` taken from ``cfg``."""
+        trace_cfg = cfg.get("trace", {}) or {}
+        service = cfg.get("service") or {}
+        opts = {
+            "src": service.get("root", "."),
+            "adr": cfg.get("paths", {}).get("adr_dir", "docs/adr"),
+            "out": self.outputs(cfg)[0],
+            "excludes": trace_cfg.get("exclude") or None,
+            "gitignore": trace_cfg.get("gitignore") is not False,
+        }
+        if trace_cfg.get("max_file_bytes") is not None:
+            opts["max_bytes"] = int(trace_cfg["max_file_bytes"])
+        if trace_cfg.get("jobs") is not None:
+            opts["jobs"] = int(trace_cfg["jobs"])
+        if service.get("name"):
+            opts["service"] = service["name"]
+        return opts
+
+    def _result(self, data, rc, out_path, phases):
         ok = (rc == 0) and bool(data.get("pass"))
         miss = data.get("miss", []) if data else ["adr_trace.json missing or invalid"]
-        return GateResult(ok=ok, miss=miss, artifact=str(out_path))
+        return GateResult(ok=ok, miss=miss, artifact=out_path, phases=phases)
+
+    def run(self, cfg):
+        opts = self.options(cfg)
+        extra = []
+        for pattern in opts["excludes"] or []:
+            extra.append(f"--exclude {shlex.quote(pattern)}")
+        if not opts["gitignore"]:
+            extra.append("--no-gitignore")
+        if "max_bytes" in opts:
+            extra.append(f"--max-file-bytes {opts['max_bytes']}")
+        if "jobs" in opts:
+            extra.append(f"--jobs {opts['jobs']}")
+        if "service" in opts:
+            extra.append(f"--service {shlex.quote(opts['service'])}")
+        cmd = f"python tools/adr_trace.py --src {shlex.quote(opts['src'])} --adr {shlex.quote(opts['adr'])} --out {opts['out']}"
+        phases = {}
+        with timings_sidecar(phases) as sidecar:
+            rc = self.run_cmd(" ".join([cmd, *extra, f"--timings {sidecar}"]))
+        return self._result(self.read_json(opts["out"]), rc, opts["out"], phases)
+
+    def run_inprocess(self, cfg, reports):
+        from adr_trace import run_trace
+
+        opts = self.options(cfg)
+        phases = {}
+        data = run_trace(**opts, timings=phases)
+        reports[os.path.normpath(opts["out"])] = data
+        return self._result(data, 0, opts["out"], phases)
@@ -1,23 +1,83 @@
 """Builtin gate wrapper for DoD aggregation."""
 from ..registry import register_gate
 from ..base import Gate, GateResult
+import os
 import pathlib
 
+from metrics import timings_sidecar
+
 
 @register_gate
 class DoDGate(Gate):
     key = "dod-gate"
     title = "DoD Gate"
+    cacheable = True
+    config_sections = ("paths",)
+
+    def inputs(self, cfg):
+        from dod_gate import REPORT_FILES, _flatten_required_artifacts, _load_yaml
 
-    def run(self, cfg):
         reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
         dod_path = cfg.get("paths", {}).get("dod_file", "docs/dod/DoD.yaml")
-        out_path = reports_dir / "dod_gate.json"
-        rc = self.run_cmd(
-            f"python tools/dod_gate.py --dod {dod_path} --checks governance/ci_checks.yaml --out {out_path}"
-        )
-        data = self.read_json(str(out_path))
+        # Artifacts whose presence the verdict checks are inputs too.
+        dod = _load_yaml(pathlib.Path(dod_path))
+        checks = _load_yaml(pathlib.Path("governance/ci_checks.yaml"))
+        return [
+            dod_path,
+            "governance/ci_checks.yaml",
+            *(str(reports_dir / name) for name in REPORT_FILES),
+            *_flatten_required_artifacts(checks.get("required_artifacts")),
+            *(str(entry) for entry in (dod.get("evidence", {}) or {}).get("e2e", []) or []),
+        ]
+
+    def fingerprint_extra(self, cfg):
+        from diff_coverage import git_revision
+        from dod_gate import _load_yaml
+
+        # diff_coverage.json is checked against the commit and base it was computed for.
+        coverage = _load_yaml(pathlib.Path("governance/ci_checks.yaml")).get("coverage", {}) or {}
+        return {"head": git_revision("HEAD"), "diff_base": coverage.get("diff_base")}
+
+    def outputs(self, cfg):
+        return [str(pathlib.Path(cfg.get("paths", {}).get("reports", "reports/")) / "dod_gate.json")]
+
+    def _result(self, data, rc, out_path, phases):
         summary = data.get("summary", {}) if data else {}
         ok = (rc == 0) and bool(summary.get("ok"))
         miss = summary.get("miss", []) if summary else ["dod_gate.json missing or invalid"]
-        return GateResult(ok=ok, miss=miss, artifact=str(out_path))
+        return GateResult(ok=ok, miss=miss, artifact=out_path, phases=phases)
+
+    def run(self, cfg):
+        reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
+        dod_path = cfg.get("paths", {}).get("dod_file", "docs/dod/DoD.yaml")
+        out_path = str(reports_dir / "dod_gate.json")
+        phases = {}
+        with timings_sidecar(phases) as sidecar:
+            rc = self.run_cmd(
+                f"python tools/dod_gate.py --dod {dod_path} --checks governance/ci_checks.yaml --out {out_path}"
+                f" --reports {reports_dir} --timings {sidecar}"
+            )
+        return self._result(self.read_json(out_path), rc, out_path, phases)
+
+    def run_inprocess(self, cfg, reports):
+        from dod_gate import REPORT_FILES, run_dod
+
+        reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
+        out_path = str(reports_dir / "dod_gate.json")
+        phases = {}
+        # Reports produced earlier in this run are handed over in memory.
+        preloaded = {
+            name: reports[key]
+            for name in REPORT_FILES
+            if (key := os.path.normpath(str(reports_dir / name))) in reports
+        }
+        data = run_dod(
+            cfg.get("paths", {}).get("dod_file", "docs/dod/DoD.yaml"),
+            "governance/ci_checks.yaml",
+            out_path,
+            reports_dir=str(reports_dir),
+            reports=preloaded,
+            timings=phases,
+        )
+        reports[os.path.normpath(out_path)] = data
+        return self._result(data, 0, out_path, phases)
@@ -1,20 +1,78 @@
 """Builtin gate wrapper for log analysis."""
 from ..registry import register_gate
 from ..base import Gate, GateResult
+import os
 import pathlib
 
+from metrics import timings_sidecar
+import shlex
+
+
+def logger_adapter(cfg):
+    from adapters import get_adapter, has_adapter
+
+    key = str(cfg.get("adapters", {}).get("logger", "auto") or "auto")
+    key = key.split(":", 1)[-1]
+    if key == "auto" or not has_adapter("logger", key):
+        key = "jsonl"
+    return get_adapter("logger", key)
+
 
 @register_gate
 class LogVsAdrGate(Gate):
     key = "log-vs-adr"
     title = "Logs vs ADR"
+    cacheable = True
+    config_sections = ("paths", "adapters", "logs", "llm_judge", "service")
 
-    def run(self, cfg):
-        reports_dir = pathlib.Path(cfg.get("paths", {}).get("reports", "reports/"))
-        logs_path = reports_dir / "debug.log.jsonl"
-        out_path = reports_dir / "adr_log_check.json"
-        rc = self.run_cmd(f"python tools/log_analyzer.py --adr docs/adr --logs {logs_path} --out {out_path}")
-        data = self.read_json(str(out_path))
+    def inputs(self, cfg):
+        return [cfg.get("paths", {}).get("adr_dir", "docs/adr"), *logger_adapter(cfg).patterns(cfg)]
+
+    def outputs(self, cfg):
+        return [str(pathlib.Path(cfg.get("paths", {}).get("reports", "reports/")) / "adr_log_check.json")]
+
+    def fingerprint_extra(self, cfg):
+        return {"LLM_JUDGE": os.getenv("LLM_JUDGE")}
+
+    def options(self, cfg):
+        """Keyword arguments for ``log_analyzer.run_log_check`` taken from ``cfg``."""
+        adapter = logger_adapter(cfg)
+        # Pass concrete shards when any exist, otherwise the configured
+        # patterns so the "not found" message names what was expected.
+        logs = [str(path) for path in adapter.paths(cfg)] or adapter.patterns(cfg)
+        opts = {
+            "adr": cfg.get("paths", {}).get("adr_dir", "docs/adr"),
+            "logs": logs,
+            "out": self.outputs(cfg)[0],
+            "jobs": int((cfg.get("logs", {}) or {}).get("jobs", 1)),
+        }
+        service = (cfg.get("service") or {}).get("name")
+        if service:
+            opts["service"] = service
+        return opts
+
+    def _result(self, data, rc, out_path, phases):
         ok = (rc == 0) and bool(data.get("pass"))
         miss = data.get("miss", []) if data else ["adr_log_check.json missing or invalid"]
-        return GateResult(ok=ok, miss=miss, artifact=str(out_path))
+        return GateResult(ok=ok, miss=miss, artifact=out_path, phases=phases)
+
+    def run(self, cfg):
+        opts = self.options(cfg)
+        phases = {}
+        with timings_sidecar(phases) as sidecar:
+            rc = self.run_cmd(
+                f"python tools/log_analyzer.py --adr {shlex.quote(opts['adr'])}"
+                f" --logs {' '.join(shlex.quote(p) for p in opts['logs'])}"
+                f" --jobs {opts['jobs']} --out {opts['out']} --timings {sidecar}"
+                + (f" --service {shlex.quote(opts['service'])}" if "service" in opts else "")
+            )
+        return self._result(self.read_json(opts["out"]), rc, opts["out"], phases)
+
+    def run_inprocess(self, cfg, reports):
+        from log_analyzer import run_log_check
+
+        opts = self.options(cfg)
+        phases = {}
+        data = run_log_check(**opts, cfg=cfg, timings=phases)
+        reports[os.path.normpath(opts["out"])] = data
+        return self._result(data, 0, opts["out"], phases)
@@ -0,0 +1,229 @@
+"""Content-fingerprinted cache of gate results for ``adrflow verify``.
+
+A gate's fingerprint covers the files behind ``Gate.inputs`` (directories
+are walked with ``Gate.input_excludes``), the config sections it names in
+``Gate.config_sections``, ``Gate.fingerprint_extra`` and the adrflow tool
+sources. A hit replays the stored ``GateResult`` entry and restores the
+gate's ``outputs`` from the copies saved alongside it.
+
+Entries live in ``<reports>/.cache/gates/`` as one JSON file each; hits touch
+the file's mtime and the oldest entries are evicted once the directory
+outgrows ``max_bytes``. File hashes are memoised by ``(size, mtime_ns)`` so
+an unchanged tree costs a ``stat`` per file.
+"""
+from __future__ import annotations
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pathlib
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import reports_fs
+from fswalk import DEFAULT_EXCLUDES, walk_files
+
+from .base import Gate
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+TOOLS_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+
+def default_cache_dir(cfg: Dict[str, Any]) -> str:
+    reports_dir = cfg.get("paths", {}).get("reports", "reports/")
+    return str(pathlib.Path(reports_dir) / ".cache" / "gates")
+
+
+class GateCache:
+    """LRU store of gate results keyed by input fingerprints."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES, reports_dir: Optional[str] = None) -> None:
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+        self.reports_dir = os.path.normpath(reports_dir) if reports_dir else None
+        self._memo_path = self.root / "hashes.json"
+        self._lock = threading.Lock()
+        self._memo: Dict[str, List[Any]] = {}
+        self._seen: Dict[str, List[Any]] = {}
+        self._tools_digest: Optional[str] = None
+        try:
+            self._memo = json.loads(self._memo_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._memo = {}
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> Optional["GateCache"]:
+        """Build the cache described by ``gates.cache``; ``None`` when disabled."""
+        section = cfg.get("gates", {}).get("cache", {})
+        if section is False or (isinstance(section, dict) and section.get("enabled") is False):
+            return None
+        section = section if isinstance(section, dict) else {}
+        return cls(
+            section.get("dir") or default_cache_dir(cfg),
+            max_bytes=int(section.get("max_bytes", DEFAULT_MAX_BYTES)),
+            reports_dir=cfg.get("paths", {}).get("reports", "reports/"),
+        )
+
+    # -- hashing -----------------------------------------------------------
+
+    def _file_hash(self, path: str, st: os.stat_result) -> str:
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self._lock:
+            cached = self._memo.get(path)
+        if cached and cached[:2] == stamp:
+            digest = cached[2]
+        else:
+            sha = hashlib.sha1()
+            with open(path, "rb") as handle:
+                for chunk in iter(lambda: handle.read(1 << 20), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+        with self._lock:
+            self._seen[path] = [*stamp, digest]
+        return digest
+
+    def _hash_path(self, path: str, excludes: Optional[List[str]], gitignore: bool) -> List[Tuple[str, Optional[str]]]:
+        if os.path.isdir(path):
+            excludes = list(excludes) if excludes is not None else None
+            out = []
+            for rel, entry in walk_files(path, excludes=self._with_reports(path, excludes), gitignore=gitignore):
+                full = os.path.normpath(os.path.join(path, rel))
+                try:
+                    out.append((full, self._file_hash(full, entry.stat())))
+                except OSError:
+                    continue
+            return out
+        try:
+            st = os.stat(path)
+        except OSError:
+            matches = sorted(glob.glob(path, recursive=True)) if glob.has_magic(path) else []
+            if not matches:
+                return [(os.path.normpath(path), None)]
+            out = []
+            for match in matches:
+                out.extend(self._hash_path(match, excludes, gitignore))
+            return out
+        return [(os.path.normpath(path), self._file_hash(path, st))]
+
+    def _with_reports(self, root: str, excludes: Optional[List[str]]) -> Optional[List[str]]:
+        # Reports and this cache change on every run; hashing them would
+        # make every fingerprint a miss.
+        if not self.reports_dir:
+            return excludes
+        rel = os.path.relpath(self.reports_dir, root)
+        if rel.startswith(".."):
+            return excludes
+        if excludes is None:
+            excludes = list(DEFAULT_EXCLUDES)
+        return [*excludes, "/" + rel.replace(os.sep, "/") + "/"]
+
+    def _tools(self) -> str:
+        if self._tools_digest is None:
+            files = self._hash_path(str(TOOLS_DIR), ["__pycache__/"], gitignore=False)
+            self._tools_digest = hashlib.sha1(json.dumps(files).encode()).hexdigest()
+        return self._tools_digest
+
+    def fingerprint(self, gate: Gate, cfg: Dict[str, Any]) -> str:
+        excludes = gate.input_excludes(cfg)
+        gitignore = gate.input_gitignore(cfg)
+        files: List[Tuple[str, Optional[str]]] = []
+        for path in gate.inputs(cfg):
+            files.extend(self._hash_path(str(path), excludes, gitignore))
+        try:
+            gate_source = inspect.getsourcefile(type(gate)) or ""
+        except TypeError:
+            gate_source = ""
+        payload = {
+            "version": CACHE_VERSION,
+            "key": gate.key,
+            "gate": f"{type(gate).__module__}.{type(gate).__qualname__}",
+            "gate_source": self._hash_path(gate_source, None, False) if gate_source else None,
+            "tools": self._tools(),
+            "python": sys.version_info[:2],
+            "config": {section: cfg.get(section) for section in sorted(gate.config_sections)},
+            "extra": gate.fingerprint_extra(cfg),
+            "inputs": sorted(set(files), key=lambda item: (item[0], item[1] or "")),
+            # Reports served from artifact archives are not on disk to hash.
+            "mounts": reports_fs.signature(),
+        }
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+    # -- entries -----------------------------------------------------------
+
+    def _entry_path(self, gate: Gate, fingerprint: str) -> pathlib.Path:
+        safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in gate.key)
+        return self.root / f"{safe}-{fingerprint}.json"
+
+    def load(self, gate: Gate, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Return the cached verify entry and restore outputs, or ``None``."""
+        path = self._entry_path(gate, fingerprint)
+        try:
+            stored = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        for out_path, text in stored.get("outputs", {}).items():
+            target = pathlib.Path(out_path)
+            try:
+                if target.read_text(encoding="utf-8", errors="surrogateescape") == text:
+                    continue
+            except OSError:
+                pass
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text, encoding="utf-8", errors="surrogateescape")
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return stored["result"]
+
+    def store(self, gate: Gate, cfg: Dict[str, Any], fingerprint: str, result: Dict[str, Any]) -> None:
+        outputs: Dict[str, str] = {}
+        for out_path in gate.outputs(cfg):
+            try:
+                outputs[str(out_path)] = pathlib.Path(out_path).read_text(encoding="utf-8", errors="surrogateescape")
+            except OSError:
+                return  # a declared output is missing: nothing to restore from
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(gate, fingerprint)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"result": result, "outputs": outputs}, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits ``max_bytes``."""
+        with self._lock:
+            try:
+                entries = [(p.stat(), p) for p in self.root.glob("*-*.json")]
+            except OSError:
+                return
+            total = sum(st.st_size for st, _ in entries)
+            for st, path in sorted(entries, key=lambda item: item[0].st_mtime_ns):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= st.st_size
+
+    def flush(self) -> None:
+        """Persist the hash memo; only files hashed in this run are kept."""
+        with self._lock:
+            if not self._seen or self._seen == self._memo:
+                return
+            memo = dict(self._seen)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._memo_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(memo, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self._memo_path)
+        self._memo = memo
+
+
+def cacheable(gate: Gate, cfg: Dict[str, Any]) -> bool:
+    """Only gates that opt in and declare inputs can be replayed safely."""
+    return bool(gate.cacheable) and bool(gate.inputs(cfg))
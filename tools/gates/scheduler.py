@@ -0,0 +1,272 @@
+"""Dependency-aware, concurrent gate execution for ``adrflow verify``."""
+from __future__ import annotations
+import cProfile
+import fnmatch
+import glob
+import os
+import pathlib
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import tracing
+from fswalk import is_excluded
+from metrics import measure
+
+from .base import EXECUTION_MODES, Gate, GateResult
+from .cache import GateCache, cacheable
+from .registry import get_gate
+
+
+def _norm(path: str) -> str:
+    return os.path.normpath(str(path))
+
+
+def build_dag(keys: List[str], cfg: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """Map each gate key to the keys it waits for.
+
+    Edges come from ``Gate.depends_on`` and from a gate's ``inputs`` naming a
+    file another scheduled gate lists in ``outputs``. Raises ``ValueError``
+    on cycles.
+    """
+    gates = {key: get_gate(key) for key in keys}
+    producers: Dict[str, str] = {}
+    for key, gate in gates.items():
+        for path in gate.outputs(cfg):
+            producers[_norm(path)] = key
+    deps: Dict[str, Set[str]] = {}
+    for key, gate in gates.items():
+        wanted = {dep for dep in gate.depends_on if dep in gates}
+        wanted |= {producers[_norm(p)] for p in gate.inputs(cfg) if _norm(p) in producers}
+        wanted.discard(key)
+        deps[key] = wanted
+
+    visiting: Set[str] = set()
+    done: Set[str] = set()
+
+    def visit(key: str, trail: List[str]) -> None:
+        if key in done:
+            return
+        if key in visiting:
+            raise ValueError("gate dependency cycle: " + " -> ".join(trail + [key]))
+        visiting.add(key)
+        for dep in sorted(deps[key]):
+            visit(dep, trail + [key])
+        visiting.discard(key)
+        done.add(key)
+
+    for key in keys:
+        visit(key, [])
+    return deps
+
+
+def _touches(gate: Gate, cfg: Dict[str, Any], inputs: List[str], changed: str) -> bool:
+    """Whether the changed path (a file, or a directory standing for its subtree) is among ``inputs``."""
+    for path in inputs:
+        path = _norm(path)
+        if changed in (".", path) or path.startswith(changed + os.sep):
+            return True  # the whole tree, the input itself, or a directory holding it
+        if path == ".":
+            rel = changed
+        elif changed.startswith(path + os.sep):
+            rel = changed[len(path) + 1:]
+        else:
+            if glob.has_magic(path) and fnmatch.fnmatch(changed, path):
+                return True
+            continue
+        # Inside an input directory: honour the excludes its fingerprint uses.
+        if not is_excluded(path, rel, gate.input_excludes(cfg), gate.input_gitignore(cfg)):
+            return True
+    return False
+
+
+def affected_gates(cfg: Dict[str, Any], keys: List[str], changed: Iterable[str]) -> List[str]:
+    """Gates among ``keys`` that must re-run after ``changed`` paths changed.
+
+    A gate is affected when a changed path is one of its ``inputs`` (or lies
+    in an input directory, outside its excludes), when it declares no inputs
+    at all, or when a gate it depends on is affected. Changes to files the
+    gates write themselves are ignored. Returned in ``keys`` order.
+    """
+    deps = build_dag(keys, cfg)
+    gates = {key: get_gate(key) for key in keys}
+    own = {_norm(path) for gate in gates.values() for path in gate.outputs(cfg)}
+    changed = {_norm(path) for path in changed} - own
+    if not changed:
+        return []
+    hit: Set[str] = set()
+    for key, gate in gates.items():
+        inputs = gate.inputs(cfg)
+        if not inputs or any(_touches(gate, cfg, inputs, path) for path in changed):
+            hit.add(key)
+    grew = True
+    while grew:
+        dependents = {key for key in keys if key not in hit and deps[key] & hit}
+        grew = bool(dependents)
+        hit |= dependents
+    return [key for key in keys if key in hit]
+
+
+def _entry(gate_result: GateResult) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"ok": bool(gate_result.ok), "miss": list(gate_result.miss)}
+    if getattr(gate_result, "artifact", None):
+        entry["artifact"] = gate_result.artifact
+    return entry
+
+
+def _execute(
+    gate: Gate,
+    cfg: Dict[str, Any],
+    reports: Dict[str, Any],
+    execution: str,
+    cache: Optional[GateCache],
+    phases: Dict[str, float],
+) -> Dict[str, Any]:
+    fingerprint = cache.fingerprint(gate, cfg) if cache is not None and cacheable(gate, cfg) else None
+    if fingerprint is not None:
+        hit = cache.load(gate, fingerprint)
+        if hit is not None:
+            return {**hit, "cached": True}
+    result = gate.execute(cfg, reports, execution)
+    phases.update(getattr(result, "phases", None) or {})
+    entry = _entry(result)
+    if fingerprint is not None:
+        cache.store(gate, cfg, fingerprint, entry)
+    return entry
+
+
+def _run_one(
+    gate: Gate,
+    cfg: Dict[str, Any],
+    reports: Dict[str, Any],
+    execution: str,
+    cache: Optional[GateCache] = None,
+    profile_dir: Optional[str] = None,
+    parent: Optional[tracing.Span] = None,
+) -> Dict[str, Any]:
+    with tracing.attach(parent), tracing.span(f"gate {gate.key}", **{"adrflow.gate": gate.key, "adrflow.execution": execution}) as span:
+        entry = _measured(gate, cfg, reports, execution, cache, profile_dir)
+        span.set_attribute("adrflow.ok", bool(entry["ok"]))
+        span.set_attribute("adrflow.cached", bool(entry.get("cached")))
+    return entry
+
+
+def _measured(
+    gate: Gate,
+    cfg: Dict[str, Any],
+    reports: Dict[str, Any],
+    execution: str,
+    cache: Optional[GateCache],
+    profile_dir: Optional[str],
+) -> Dict[str, Any]:
+    profile_path = str(pathlib.Path(profile_dir) / f"{gate.key}.pstats") if profile_dir else None
+    # In-process gates are profiled in this thread; subprocess gates pass the
+    # path on to ``Gate.run_cmd``, which wraps the tool in ``-m cProfile``.
+    profiler = cProfile.Profile() if profile_path and execution == "inprocess" else None
+    phases: Dict[str, float] = {}
+    with measure(profile_path if profiler is None else None) as usage:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            entry = _execute(gate, cfg, reports, execution, cache, phases)
+        except Exception as exc:  # a crashing gate must not take the pool down
+            entry = {"ok": False, "miss": [f"gate raised {type(exc).__name__}: {exc}"]}
+            tracing.current().error = entry["miss"][0]
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(profile_path)
+    entry["metrics"] = {**usage, **({"phases": phases} if phases else {})}
+    return entry
+
+
+def run_gates(
+    cfg: Dict[str, Any],
+    keys: List[str],
+    jobs: int = 1,
+    fail_fast: bool = False,
+    execution: str = "inprocess",
+    cache: Optional[GateCache] = None,
+    profile_dir: Optional[str] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Run ``keys`` respecting dependencies, up to ``jobs`` at a time.
+
+    Results are returned in ``keys`` order whatever the completion order.
+    With ``fail_fast`` gates that have not started yet are cancelled once
+    any gate fails, since the summary can no longer pass. ``execution``
+    picks ``Gate.run_inprocess`` (reports are shared in memory) or the
+    subprocess-backed ``Gate.run``. With a ``cache`` cacheable gates whose
+    fingerprint is unchanged are replayed and marked ``"cached": True``.
+    Every entry carries ``metrics`` (wall/CPU time, peak RSS, tool phases);
+    ``profile_dir`` additionally receives a ``<gate>.pstats`` per gate.
+    """
+    if execution not in EXECUTION_MODES:
+        raise ValueError(f"unknown gate execution mode {execution!r} (expected one of {', '.join(EXECUTION_MODES)})")
+    keys = list(dict.fromkeys(keys))
+    deps = build_dag(keys, cfg)
+    reports: Dict[str, Any] = {}
+    if profile_dir:
+        pathlib.Path(profile_dir).mkdir(parents=True, exist_ok=True)
+    results: Dict[str, Dict[str, Any]] = {}
+    parent = tracing.current()
+    pending = list(keys)
+    running: Dict[Future, str] = {}
+    failed_by = None
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            if failed_by is None:
+                for key in list(pending):
+                    if len(running) >= max(1, jobs):
+                        break
+                    if deps[key] <= set(results):
+                        pending.remove(key)
+                        running[pool.submit(_run_one, get_gate(key), cfg, reports, execution, cache, profile_dir, parent)] = key
+            elif pending:
+                for key in pending:
+                    results[key] = {"ok": False, "miss": [f"cancelled (fail-fast after {failed_by} failed)"], "cancelled": True}
+                pending = []
+            if not running:
+                if pending:  # unreachable with an acyclic graph
+                    raise RuntimeError(f"gates could not be scheduled: {pending}")
+                break
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                results[key] = future.result()
+                if fail_fast and not results[key]["ok"] and failed_by is None:
+                    failed_by = key
+
+    if cache is not None:
+        cache.flush()
+
+    return {key: results[key] for key in keys}
+
+
+def verify_gates(
+    cfg: Dict[str, Any],
+    keys: Optional[List[str]] = None,
+    jobs: Optional[int] = None,
+    fail_fast: bool = False,
+    execution: Optional[str] = None,
+    use_cache: bool = True,
+    profile: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """``adrflow verify`` for one config: ``run_gates`` with the ``gates`` section defaults, plus a summary."""
+    gates_cfg = cfg.get("gates", {}) or {}
+    if keys is None:
+        keys = list(gates_cfg.get("include", []))
+    if jobs is None:
+        jobs = gates_cfg.get("jobs") or os.cpu_count() or 1
+    if execution is None:
+        execution = gates_cfg.get("execution") or "inprocess"
+    result = run_gates(
+        cfg,
+        keys,
+        jobs=min(jobs, max(1, len(keys))),
+        fail_fast=fail_fast,
+        execution=execution,
+        cache=GateCache.from_config(cfg) if use_cache else None,
+        profile_dir=str(pathlib.Path(cfg.get("paths", {}).get("reports", "reports")) / "profile") if profile else None,
+    )
+    result["summary"] = {"ok": all(item["ok"] for item in result.values())}
+    return result
@@ -1,70 +1,623 @@
 #!/usr/bin/env python
 import argparse
+import bz2
+import glob
+import gzip
+import hashlib
+import io
 import json
+import lzma
+import multiprocessing
+import os
 import pathlib
-from typing import Any, Dict, List
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-from common import fail, load_yaml_front_matter, ok, write_json
+from adr_catalog import default_cache_path, load_adr_specs  # noqa: F401  (re-exported)
+from common import fail, ok, read_json, write_json
+import reports_fs
+import sharding
+import tracing
+from metrics import timed, write_timings
 
 
-def load_adr_specs(adr_dir: str) -> Dict[str, Dict[str, Any]]:
-    specs: Dict[str, Dict[str, Any]] = {}
-    for path in pathlib.Path(adr_dir).glob("ADR-*.md"):
-        front_matter = load_yaml_front_matter(str(path))
-        if front_matter:
-            specs[front_matter["adr_id"]] = front_matter
-    return specs
+def _select_backend(name: Optional[str] = None) -> Tuple[str, Callable[[Any], Any]]:
+    """Pick the JSON decoder: orjson, then simdjson, then the stdlib."""
+    wanted = (name or os.getenv("ADRFLOW_JSON_BACKEND") or "auto").lower()
+    if wanted in ("auto", "orjson"):
+        try:
+            import orjson
+
+            return "orjson", orjson.loads
+        except ImportError:
+            pass
+    if wanted in ("auto", "simdjson"):
+        try:
+            import simdjson
 
+            return "simdjson", simdjson.loads
+        except ImportError:
+            pass
+    return "json", json.loads
 
-def iter_jsonl(path: str):
-    file_path = pathlib.Path(path)
-    if not file_path.exists():
-        return
-    for line in file_path.read_text(encoding="utf-8", errors="ignore").splitlines():
-        line = line.strip()
-        if not line:
-            continue
+
+JSON_BACKEND, _fast_loads = _select_backend()
+READ_BUFFER = 1 << 20
+_INVALID = object()
+
+
+def _loads(line: bytes) -> Any:
+    try:
+        return _fast_loads(line)
+    except ValueError:
+        pass
+    # Undecodable bytes are dropped, as the text-mode reader used to do.
+    try:
+        return json.loads(line.decode("utf-8", errors="ignore"))
+    except ValueError:
+        return _INVALID
+
+
+def open_log(path: str) -> BinaryIO:
+    """Open a plain or compressed (.gz, .zst, .bz2, .xz) log as a binary stream.
+
+    ``path`` may be an archive member (see ``reports_fs``); it is then
+    decompressed from the zip as it is read.
+    """
+    suffix = pathlib.Path(path).suffix.lower()
+    if suffix in (".zst", ".zstd"):
         try:
-            yield json.loads(line)
-        except json.JSONDecodeError:
-            continue
+            import zstandard
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError(f"zstandard is required to read {path}") from exc
+        raw = reports_fs.open_binary(path)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True), READ_BUFFER)
+    if reports_fs.locate(path) is None:
+        if suffix == ".gz":
+            return io.BufferedReader(gzip.open(path, "rb"), READ_BUFFER)
+        if suffix == ".bz2":
+            return io.BufferedReader(bz2.open(path, "rb"), READ_BUFFER)
+        if suffix == ".xz":
+            return io.BufferedReader(lzma.open(path, "rb"), READ_BUFFER)
+        return open(path, "rb", buffering=READ_BUFFER)
+    member = reports_fs.open_binary(path)
+    if suffix == ".gz":
+        return io.BufferedReader(gzip.GzipFile(fileobj=member), READ_BUFFER)
+    if suffix == ".bz2":
+        return io.BufferedReader(bz2.BZ2File(member), READ_BUFFER)
+    if suffix == ".xz":
+        return io.BufferedReader(lzma.LZMAFile(member), READ_BUFFER)
+    return io.BufferedReader(member, READ_BUFFER)  # type: ignore[arg-type]
 
 
-def check_logs_against_adr(adr: Dict[str, Any], logs_path: str) -> Dict[str, Any]:
-    missing: List[str] = []
-    samples: List[Dict[str, Any]] = []
-    log_requirements = (adr.get("observability_signals") or {}).get("logs") or []
-    entries = list(iter_jsonl(logs_path) or [])
-    if not entries and log_requirements:
-        return {"pass": False, "miss": [f"logs file not found or empty: {logs_path}"], "sample": []}
-
-    for requirement in log_requirements:
-        want_level = requirement.get("level")
-        want_event = requirement.get("event")
-        need_fields = set(requirement.get("must_have_fields") or [])
-        matched = False
-        for entry in entries:
-            if want_level and entry.get("level") != want_level:
+def expand_log_paths(patterns: Union[str, Iterable[str]]) -> List[str]:
+    """Expand log globs (rotated/compressed shards) into a stable, de-duplicated list.
+
+    Globs also match members of mounted artifact archives (``reports_fs``).
+    """
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = reports_fs.glob(pattern) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if match not in paths:
+                paths.append(match)
+    return paths
+
+
+def iter_jsonl(path: str, prefilter: Optional[Callable[[bytes], bool]] = None):
+    """Stream JSON objects from a (possibly compressed) JSONL file with constant memory.
+
+    ``prefilter`` sees each raw non-empty line and can veto it before it is
+    decoded, which is far cheaper than ``json.loads`` for irrelevant lines.
+    """
+    if not reports_fs.exists(path):
+        return
+    with open_log(str(path)) as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            if prefilter is not None and not prefilter(line):
                 continue
-            if want_event and entry.get("event") != want_event:
+            entry = _loads(line)
+            if entry is not _INVALID:
+                yield entry
+
+
+def typed(value: Any) -> Any:
+    """``value`` as a lookup key that keeps ``True`` and ``1`` apart (``None`` stays ``None``)."""
+    return None if value is None else (type(value).__name__, value)
+
+
+def _requirement_key(requirement: Dict[str, Any]) -> Tuple[Any, Any]:
+    return (typed(requirement.get("level") or None), typed(requirement.get("event") or None))
+
+
+class LogMatcher:
+    """Match log entries against every ADR's log requirements in one pass.
+
+    Requirements are indexed by ``(level, event)`` with ``None`` as a wildcard,
+    so each entry is only checked against requirements it could satisfy, and
+    a requirement is retired as soon as its first matching entry is seen.
+    """
+
+    def __init__(self, specs: Dict[str, Dict[str, Any]]):
+        self.requirements: Dict[str, List[Dict[str, Any]]] = {}
+        self.order: List[Tuple[str, int]] = []
+        self.matches: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        # Position (in the list being read) of the log shard each match came from.
+        self.source = 0
+        self.origin: Dict[Tuple[str, int], int] = {}
+        self.entries = 0
+        self._index: Dict[Tuple[Any, Any], List[Tuple[str, int, frozenset]]] = {}
+        for adr_id, spec in specs.items():
+            reqs = (spec.get("observability_signals") or {}).get("logs") or []
+            self.requirements[adr_id] = reqs
+            for pos, requirement in enumerate(reqs):
+                self.order.append((adr_id, pos))
+                fields = frozenset(requirement.get("must_have_fields") or [])
+                self._index.setdefault(_requirement_key(requirement), []).append((adr_id, pos, fields))
+        self.pending = sum(len(bucket) for bucket in self._index.values())
+        self.skipped = 0
+        self._needles: Optional[List[bytes]] = None
+        self._refresh_needles()
+
+    @property
+    def done(self) -> bool:
+        return self.pending == 0
+
+    def _refresh_needles(self) -> None:
+        events = set()
+        for _, event in self._index:
+            if event is None:
+                self._needles = None
+                return
+            events.add(event[1])
+        needles = set()
+        for event in events:
+            needles.add(json.dumps(event).encode("utf-8"))
+            needles.add(json.dumps(event, ensure_ascii=False).encode("utf-8"))
+        self._needles = sorted(needles)
+
+    def may_match(self, line: bytes) -> bool:
+        """Byte-level prefilter: False if no pending requirement's event occurs in ``line``.
+
+        A line with a backslash may spell the event with other escapes
+        (``\\/``, ``\\u002e``), so it is always parsed.
+        """
+        if self._needles is None or b"\\" in line or any(needle in line for needle in self._needles):
+            return True
+        self.skipped += 1
+        return False
+
+    def _buckets(self, entry: Dict[str, Any]):
+        level, event = typed(entry.get("level")), typed(entry.get("event"))
+        keys = [(level, event), (level, None), (None, event), (None, None)]
+        for pos, key in enumerate(keys):
+            if key in keys[:pos]:
                 continue
-            if not need_fields.issubset(entry.keys()):
+            try:
+                bucket = self._index.get(key)
+            except TypeError:  # unhashable level/event values never match
                 continue
-            matched = True
-            samples.append(entry)
+            if bucket:
+                yield key, bucket
+
+    def feed(self, entry: Any) -> bool:
+        """Consume one log entry; returns True once every requirement is met."""
+        self.entries += 1
+        if not isinstance(entry, dict):
+            return self.done
+        for key, bucket in list(self._buckets(entry)):
+            remaining = []
+            for adr_id, pos, fields in bucket:
+                if fields.issubset(entry.keys()):
+                    self.matches[(adr_id, pos)] = entry
+                    self.origin[(adr_id, pos)] = self.source
+                    self.pending -= 1
+                else:
+                    remaining.append((adr_id, pos, fields))
+            if remaining:
+                self._index[key] = remaining
+            else:
+                del self._index[key]
+                self._refresh_needles()
+        return self.done
+
+    def retire(self, retired: Iterable[Tuple[str, int]]) -> None:
+        """Drop requirements satisfied elsewhere (e.g. by an earlier log shard)."""
+        retired = set(retired)
+        for key in list(self._index):
+            remaining = [item for item in self._index[key] if (item[0], item[1]) not in retired]
+            self.pending -= len(self._index[key]) - len(remaining)
+            if remaining:
+                self._index[key] = remaining
+            else:
+                del self._index[key]
+        self._refresh_needles()
+
+    def result(self, adr_id: str, logs_path: str) -> Dict[str, Any]:
+        log_requirements = self.requirements.get(adr_id, [])
+        if not self.entries and log_requirements:
+            return {"pass": False, "miss": [f"logs file not found or empty: {logs_path}"], "sample": []}
+        missing: List[str] = []
+        samples: List[Dict[str, Any]] = []
+        for pos, requirement in enumerate(log_requirements):
+            entry = self.matches.get((adr_id, pos))
+            if entry is None:
+                need_fields = set(requirement.get("must_have_fields") or [])
+                missing.append(f"no log event {requirement.get('event')} with fields {sorted(need_fields)}")
+            else:
+                samples.append(entry)
+        return {"pass": not missing, "miss": missing, "sample": samples[:3]}
+
+
+SHARED_POLL_ENTRIES = 1024
+_shared_best = None
+
+
+def _init_shard_worker(best) -> None:
+    global _shared_best
+    _shared_best = best
+
+
+def _match_shard(shard: int, path: str, specs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Worker: first matches in one shard, giving up on requirements an earlier shard met."""
+    matcher = LogMatcher(specs)
+    slots = {req: slot for slot, req in enumerate(matcher.order)}
+    best = _shared_best
+
+    def settled_earlier():
+        return [req for slot, req in enumerate(matcher.order) if best[slot] < shard]
+
+    matcher.retire(settled_earlier())
+    seen = len(matcher.matches)
+    for entry in iter_jsonl(path, prefilter=matcher.may_match):
+        done = matcher.feed(entry)
+        if len(matcher.matches) != seen:
+            seen = len(matcher.matches)
+            with best.get_lock():
+                for req in matcher.matches:
+                    slot = slots[req]
+                    best[slot] = min(best[slot], shard)
+        if done:
+            break
+        if matcher.entries % SHARED_POLL_ENTRIES == 0:
+            matcher.retire(settled_earlier())
+            if matcher.done:
+                break
+    return {"matches": list(matcher.matches.items()), "entries": matcher.entries, "skipped": matcher.skipped}
+
+
+def _check_sharded(matcher: "LogMatcher", paths: List[str], specs: Dict[str, Dict[str, Any]], jobs: int) -> None:
+    best = multiprocessing.Array("i", [len(paths)] * max(1, len(matcher.order)))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_shard_worker, initargs=(best,)) as pool:
+        partials = list(pool.map(_match_shard, range(len(paths)), paths, [specs] * len(paths)))
+    # Earlier shards win, exactly as a sequential read of the shards would.
+    for source, partial in enumerate(partials):
+        matcher.entries += partial["entries"]
+        matcher.skipped += partial["skipped"]
+        for req, entry in partial["matches"]:
+            if tuple(req) not in matcher.matches:
+                matcher.matches[tuple(req)] = entry
+                matcher.origin[tuple(req)] = source
+
+
+def _no_clock() -> float:
+    return 0.0
+
+
+def _read_in_order(matcher: "LogMatcher", paths: List[str], timings: Optional[Dict[str, float]] = None) -> None:
+    """Feed the shards at ``paths`` to ``matcher`` in order until every requirement is met.
+
+    Each match records its shard's position in ``paths``. ``timings``
+    receives milliseconds spent reading/decoding (``parse``) and matching
+    (``match``); without it the clock is not read.
+    """
+    clock = time.perf_counter if timings is not None else _no_clock
+    parse = match = 0.0
+    for source, path in enumerate(paths):
+        matcher.source = source
+        entries = iter(iter_jsonl(path, prefilter=matcher.may_match) or [])
+        with tracing.span("artifact.read", **{"adrflow.artifact": path}) as span:
+            while True:
+                started = clock()
+                entry = next(entries, _INVALID)
+                parsed = clock()
+                parse += parsed - started
+                if entry is _INVALID:
+                    break
+                done = matcher.feed(entry)
+                match += clock() - parsed
+                if done:
+                    break
+            span.set_attribute("adrflow.entries", matcher.entries)
+        if matcher.done:
+            break
+    if timings is not None:
+        timings["parse"] = round(timings.get("parse", 0.0) + parse * 1000, 3)
+        timings["match"] = round(timings.get("match", 0.0) + match * 1000, 3)
+
+
+def check_logs_against_specs(
+    specs: Dict[str, Dict[str, Any]],
+    logs_path: Union[str, List[str]],
+    jobs: int = 1,
+    timings: Optional[Dict[str, float]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Check all ADR specs with a single streaming read of the log shards.
+
+    ``logs_path`` is a path, glob or list of them; shards are read in sorted
+    order. With ``jobs`` > 1 shards are processed by worker processes that
+    share which requirements are already met, so everyone stops early.
+    ``timings`` receives milliseconds spent reading/decoding (``parse``) and
+    matching (``match``); sharded runs only report ``sharded``.
+    """
+    label = logs_path if isinstance(logs_path, str) else ", ".join(logs_path)
+    paths = expand_log_paths(logs_path)
+    matcher = LogMatcher(specs)
+    if not matcher.done:
+        workers = min(jobs or os.cpu_count() or 1, len(paths))
+        if workers > 1:
+            with timed(timings, "sharded"):
+                _check_sharded(matcher, paths, specs, workers)
+        else:
+            _read_in_order(matcher, paths, timings)
+        if not matcher.entries and matcher.skipped:
+            # Everything was filtered out; the log only counts as empty if
+            # none of those lines was valid JSON either.
+            matcher.entries = next((1 for path in paths for _ in iter_jsonl(path)), 0)
+    return {adr_id: matcher.result(adr_id, label) for adr_id in specs}
+
+
+def check_logs_shard(
+    specs: Dict[str, Dict[str, Any]],
+    logs_path: Union[str, List[str]],
+    shard: sharding.Shard,
+    jobs: int = 1,
+) -> Dict[str, Any]:
+    """Partial report of one shard: first matches in the log shards it owns.
+
+    Every match records the position of its log shard in the full sorted
+    list, so :func:`merge_partials` can pick the match a sequential read of
+    all shards would have found first.
+    """
+    label = logs_path if isinstance(logs_path, str) else ", ".join(logs_path)
+    paths = expand_log_paths(logs_path)
+    owned = [pos for pos, path in enumerate(paths) if sharding.owns(path, shard)]
+    owned_paths = [paths[pos] for pos in owned]
+    matcher = LogMatcher(specs)
+    if not matcher.done and owned_paths:
+        workers = min(jobs or os.cpu_count() or 1, len(owned_paths))
+        if workers > 1:
+            _check_sharded(matcher, owned_paths, specs, workers)
+        else:
+            _read_in_order(matcher, owned_paths)
+        if not matcher.entries and matcher.skipped:
+            matcher.entries = next((1 for path in owned_paths for _ in iter_jsonl(path)), 0)
+    return {
+        "partial": sharding.header("log_analyzer", shard),
+        "label": label,
+        "paths": len(paths),
+        "requirements": matcher.requirements,
+        "matches": [[adr_id, pos, owned[matcher.origin[(adr_id, pos)]], entry] for (adr_id, pos), entry in matcher.matches.items()],
+        "entries": matcher.entries,
+    }
+
+
+def merge_partials(partials: List[Dict[str, Any]], cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The summary of a single-node run, rebuilt from the partial reports of every shard."""
+    first = partials[0]
+    for partial in partials[1:]:
+        for key in ("label", "paths", "requirements"):
+            if partial[key] != first[key]:
+                raise ValueError(f"log_analyzer shards disagree on {key} (different --logs, --adr or --service?)")
+    specs = {adr_id: {"observability_signals": {"logs": reqs}} for adr_id, reqs in first["requirements"].items()}
+    matcher = LogMatcher(specs)
+    best: Dict[Tuple[str, int], Tuple[int, Dict[str, Any]]] = {}
+    for partial in partials:
+        matcher.entries += partial["entries"]
+        for adr_id, pos, source, entry in partial["matches"]:
+            if (adr_id, pos) not in best or source < best[(adr_id, pos)][0]:
+                best[(adr_id, pos)] = (source, entry)
+    matcher.matches = {req: entry for req, (_, entry) in best.items()}
+    results = {adr_id: matcher.result(adr_id, first["label"]) for adr_id in specs}
+    return maybe_llm_judge(summarize(results), cfg)
+
+
+COMPRESSED_SUFFIXES = (".gz", ".zst", ".zstd", ".bz2", ".xz")
+# 2: ``entries`` also counts valid lines the byte prefilter skipped.
+# 3: matches and entry counts are kept per file, with the file's identity.
+CHECKPOINT_VERSION = 3
+HEAD_BYTES = 4096
+
+
+def _specs_digest(matcher: "LogMatcher") -> str:
+    payload = json.dumps(matcher.requirements, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _head_digest(path: str, offset: int) -> Optional[str]:
+    try:
+        with open(path, "rb") as handle:
+            return hashlib.sha1(handle.read(min(offset, HEAD_BYTES))).hexdigest()
+    except OSError:
+        return None
+
+
+def _archive_identity(st: os.stat_result) -> List[int]:
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _same_file(path: str, state: Dict[str, Any]) -> bool:
+    """Whether ``path`` is still the file ``state`` was read from (not replaced or truncated).
+
+    Device, inode and size are compared first; the digest of the first bytes
+    read catches a new file that reuses the old inode.
+    """
+    if not state:
+        return True  # nothing read from it yet
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    if "identity" in state:
+        return state["identity"] == _archive_identity(st)
+    offset = state.get("offset", 0)
+    if [state.get("dev"), state.get("inode")] != [st.st_dev, st.st_ino] or st.st_size < offset:
+        return False
+    return state.get("head") == _head_digest(path, offset)
+
+
+def _restore(matcher: "LogMatcher", files: Dict[str, Any], matches: List[List[Any]]) -> Dict[str, Any]:
+    """Re-apply ``matches`` whose file is unchanged; returns the file states still valid."""
+    valid = {path: state for path, state in files.items() if _same_file(path, state)}
+    restored = {}
+    known = set(matcher.order)
+    for adr_id, pos, entry, path in matches:
+        if path in valid and (adr_id, pos) in known:
+            restored[(adr_id, pos)] = entry
+            matcher.origin[(adr_id, pos)] = path
+    matcher.matches.update(restored)
+    matcher.retire(restored)
+    matcher.entries = sum(state.get("entries", 0) for state in valid.values())
+    return valid
+
+
+def _matches(matcher: "LogMatcher") -> List[List[Any]]:
+    return [[adr_id, pos, entry, matcher.origin.get((adr_id, pos))] for (adr_id, pos), entry in matcher.matches.items()]
+
+
+def _load_checkpoint(path: Optional[str], matcher: "LogMatcher") -> Dict[str, Any]:
+    state = (read_json(path, {}) or {}) if path else {}
+    if state.get("version") != CHECKPOINT_VERSION or state.get("specs") != _specs_digest(matcher):
+        return {}
+    return _restore(matcher, state.get("files", {}), state.get("matches", []))
+
+
+def _save_checkpoint(path: Optional[str], matcher: "LogMatcher", files: Dict[str, Any]) -> None:
+    if not path:
+        return
+    write_json(path, {
+        "version": CHECKPOINT_VERSION,
+        "specs": _specs_digest(matcher),
+        "files": files,
+        "matches": _matches(matcher),
+    })
+
+
+def _tail(path: str, state: Dict[str, Any], matcher: "LogMatcher") -> bool:
+    """Feed complete lines appended since the saved offset; True if anything was read.
+
+    ``state`` must describe this very file (see :func:`_same_file`) or be empty.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    matcher.source = path
+    before = matcher.entries
+    if path.endswith(COMPRESSED_SUFFIXES):
+        # Rotated archives are immutable: read once, remember their identity.
+        if "identity" in state:
+            return False
+        skipped = matcher.skipped
+        for entry in iter_jsonl(path, prefilter=matcher.may_match):
+            if matcher.feed(entry):
+                break
+        if not matcher.entries and matcher.skipped > skipped:
+            matcher.entries = next((1 for _ in iter_jsonl(path)), 0)
+        state.update(identity=_archive_identity(st), entries=matcher.entries - before)
+        return True
+    offset = state.get("offset", 0)
+    if st.st_size == offset:
+        state.update(dev=st.st_dev, inode=st.st_ino, offset=offset, head=_head_digest(path, offset))
+        return False
+    consumed = offset
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        pending = b""
+        while not matcher.done:
+            block = handle.read(READ_BUFFER)
+            if not block:
+                break
+            data = pending + block
+            end = data.rfind(b"\n") + 1  # a partial last line waits for the next poll
+            for line in data[:end].split(b"\n"):
+                line = line.strip()
+                if not line:
+                    continue
+                if not matcher.may_match(line):
+                    # As in check_logs_against_specs: filtered-out valid entries still make the log non-empty.
+                    if not matcher.entries and _loads(line) is not _INVALID:
+                        matcher.entries += 1
+                    continue
+                entry = _loads(line)
+                if entry is not _INVALID and matcher.feed(entry):
+                    break
+            consumed += end
+            pending = data[end:]
+    state.update(
+        dev=st.st_dev,
+        inode=st.st_ino,
+        offset=consumed,
+        head=_head_digest(path, consumed),
+        entries=state.get("entries", 0) + matcher.entries - before,
+    )
+    return consumed > offset
+
+
+def follow_logs(
+    specs: Dict[str, Dict[str, Any]],
+    logs_path: Union[str, List[str]],
+    checkpoint: Optional[str] = None,
+    deadline: Optional[float] = None,
+    poll_interval: float = 1.0,
+    on_progress: Optional[Callable[[Dict[str, Dict[str, Any]]], None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Tail log shards until every requirement is met or ``deadline`` seconds pass.
+
+    Byte offsets and matches are checkpointed after every poll that read
+    something, so a restarted follower resumes instead of rescanning. Each
+    match remembers the file it came from: when that file is replaced,
+    truncated or gone, its matches are dropped and it is read afresh.
+    """
+    label = logs_path if isinstance(logs_path, str) else ", ".join(logs_path)
+    matcher = LogMatcher(specs)
+    files = _load_checkpoint(checkpoint, matcher)
+    stop_at = None if deadline is None else time.monotonic() + deadline
+    while True:
+        progressed = False
+        if any(not _same_file(path, state) for path, state in files.items()):
+            saved, matcher = _matches(matcher), LogMatcher(specs)
+            files = _restore(matcher, files, saved)
+            progressed = True
+        for path in expand_log_paths(logs_path):
+            if matcher.done:
+                break
+            progressed |= _tail(path, files.setdefault(path, {}), matcher)
+        if progressed:
+            _save_checkpoint(checkpoint, matcher, files)
+            if on_progress is not None:
+                on_progress({adr_id: matcher.result(adr_id, label) for adr_id in specs})
+        if matcher.done or (stop_at is not None and time.monotonic() >= stop_at):
             break
-        if not matched:
-            missing.append(f"no log event {want_event} with fields {sorted(need_fields)}")
-    return {"pass": not missing, "miss": missing, "sample": samples[:3]}
+        time.sleep(poll_interval)
+    return {adr_id: matcher.result(adr_id, label) for adr_id in specs}
 
 
-def maybe_llm_judge(payload: Dict[str, Any]) -> Dict[str, Any]:
-    import os
+def check_logs_against_adr(adr: Dict[str, Any], logs_path: str) -> Dict[str, Any]:
+    return check_logs_against_specs({adr.get("adr_id", ""): adr}, logs_path)[adr.get("adr_id", "")]
+
+
+def maybe_llm_judge(payload: Dict[str, Any], cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     import yaml
 
-    cfg = None
     cfg_path = pathlib.Path('.adrflow.yaml')
-    if cfg_path.exists():
+    if cfg is None and cfg_path.exists():
         try:
             cfg = yaml.safe_load(cfg_path.read_text(encoding='utf-8'))
         except yaml.YAMLError:
@@ -77,25 +630,117 @@ def maybe_llm_judge(payload: Dict[str, Any]) -> Dict[str, Any]:
     return judge('logs-vs-adr', payload, cfg)
 
 
+def summarize(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    total: Dict[str, Any] = {"items": [], "pass": True, "miss": []}
+    for adr_id, result in results.items():
+        total["items"].append({"adr_id": adr_id, **result})
+        if not result["pass"]:
+            total["pass"] = False
+            total["miss"].extend([f"{adr_id}: {msg}" for msg in result["miss"]])
+    return total
+
+
+def run_log_check(
+    adr: str = "docs/adr",
+    logs: Union[str, List[str]] = "reports/debug.log.jsonl",
+    out: str = "reports/adr_log_check.json",
+    jobs: int = 1,
+    follow: bool = False,
+    deadline: Optional[float] = None,
+    poll_interval: float = 1.0,
+    checkpoint: Optional[str] = None,
+    columnar_cache: Optional[str] = None,
+    cfg: Optional[Dict[str, Any]] = None,
+    timings: Optional[Dict[str, float]] = None,
+    service: Optional[str] = None,
+    shard: Optional[sharding.Shard] = None,
+) -> Dict[str, Any]:
+    """Check the logs against every ADR, write the summary to ``out`` and return it.
+
+    ``cfg`` is the already-parsed ``.adrflow.yaml``; when omitted the LLM judge
+    reads it from disk as before. ``timings`` receives per-phase milliseconds.
+    ``service`` limits the ADRs to those applying to it. With ``shard`` only
+    that shard's log files are read and ``out`` receives a partial report
+    for :func:`merge_partials`.
+    """
+    if shard is not None and (follow or columnar_cache):
+        raise ValueError("--shard cannot be combined with --follow/--columnar-cache")
+    with timed(timings, "adr_specs"):
+        specs = load_adr_specs(adr, cache_path=default_cache_path(str(pathlib.Path(out).parent)), service=service)
+    if isinstance(logs, list) and len(logs) == 1:
+        logs = logs[0]
+    if shard is not None:
+        partial = check_logs_shard(specs, logs, shard, jobs=jobs)
+        with timed(timings, "report"):
+            write_json(out, partial)
+        return partial
+    if follow:
+        checkpoint = checkpoint or str(pathlib.Path(out).parent / ".cache" / "adr_log_follow.json")
+        results = follow_logs(
+            specs,
+            logs,
+            checkpoint=checkpoint,
+            deadline=deadline,
+            poll_interval=poll_interval,
+            on_progress=lambda partial: write_json(out, summarize(partial)),
+        )
+    elif columnar_cache:
+        from log_columns import check_logs_columnar
+
+        with timed(timings, "columnar"):
+            results = check_logs_columnar(specs, logs, columnar_cache)
+    else:
+        results = check_logs_against_specs(specs, logs, jobs=jobs, timings=timings)
+
+    with timed(timings, "report"):
+        total = maybe_llm_judge(summarize(results), cfg)
+        write_json(out, total)
+    return total
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--adr", default="docs/adr")
-    parser.add_argument("--logs", default="reports/debug.log.jsonl")
+    parser.add_argument(
+        "--logs",
+        nargs="+",
+        default=["reports/debug.log.jsonl"],
+        help="Log files or globs; .gz/.zst/.bz2/.xz shards are decompressed on the fly",
+    )
     parser.add_argument("--out", default="reports/adr_log_check.json")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for multi-shard logs (0 = one per CPU)")
+    parser.add_argument("--follow", action="store_true", help="Tail the logs until all requirements pass or --deadline expires")
+    parser.add_argument("--deadline", type=float, help="Seconds to wait in --follow mode (default: no limit)")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--checkpoint", help="Offset checkpoint for --follow (default: <out dir>/.cache/adr_log_follow.json)")
+    parser.add_argument("--columnar-cache", metavar="DIR", help="Evaluate on a columnar cache of the logs (built on first use)")
+    parser.add_argument("--service", help="Only ADRs that apply to this service (front matter service/services)")
+    parser.add_argument("--shard", type=sharding.shard_arg, metavar="I/N", help="Read only this shard's log files and write a partial report (see merge_reports.py)")
+    parser.add_argument("--timings", help="Write per-phase timings (ms) as JSON to this file")
     args = parser.parse_args()
+    if args.shard and (args.follow or args.columnar_cache):
+        parser.error("--shard cannot be combined with --follow/--columnar-cache")
 
-    specs = load_adr_specs(args.adr)
-    total = {"items": [], "pass": True, "miss": []}
-    for adr_id, spec in specs.items():
-        result = check_logs_against_adr(spec, args.logs)
-        total["items"].append({"adr_id": adr_id, **result})
-        if not result["pass"]:
-            total["pass"] = False
-            total["miss"].extend([f"{adr_id}: {msg}" for msg in result["miss"]])
-
-    total = maybe_llm_judge(total)
-    write_json(args.out, total)
-    if total["pass"]:
+    timings: Optional[Dict[str, float]] = {} if args.timings else None
+    with tracing.span("log_analyzer", **{"adrflow.logs": args.logs, "adrflow.out": args.out}):
+        total = run_log_check(
+            args.adr,
+            args.logs,
+            args.out,
+            jobs=args.jobs,
+            follow=args.follow,
+            deadline=args.deadline,
+            poll_interval=args.poll_interval,
+            checkpoint=args.checkpoint,
+            columnar_cache=args.columnar_cache,
+            timings=timings,
+            service=args.service,
+            shard=args.shard,
+        )
+    write_timings(args.timings, timings)
+    if args.shard:
+        ok(f"Log vs ADR shard {sharding.label(args.shard)} written to {args.out}")
+    elif total["pass"]:
         ok("Log vs ADR PASS")
     else:
         fail("Log vs ADR FAIL:\n- " + "\n- ".join(total["miss"]))
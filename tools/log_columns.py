@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+"""Columnar on-disk cache for JSONL debug logs.
+
+A log is parsed once into dictionary-encoded columns (``level``, ``event``),
+hashed columns for high-cardinality fields (``trace_id``: 64-bit hashes, see
+:func:`value_hash`, so the dictionary in ``meta.json`` stays small), numeric
+columns (``latency_ms``) and per-row presence bitmaps for every top-level
+field. Requirement checks then become bitwise ANDs over
+the bitmaps instead of per-entry dict lookups. Caches are keyed by file
+identity (path, inode, size, mtime; CRC and size for a member of an
+artifact archive), so a rewritten log is re-encoded. Hits touch the cache's
+``meta.json`` and the least recently used caches are evicted once the
+directory outgrows ``max_bytes``, so rotated logs do not pile up.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import pathlib
+import shutil
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import reports_fs
+from common import read_json, write_json
+from log_analyzer import _INVALID, LogMatcher, _loads, expand_log_paths, open_log, typed
+
+try:  # optional: zero-copy numeric columns
+    import numpy
+except ImportError:  # pragma: no cover - optional dependency
+    numpy = None
+
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DICT_COLUMNS = ("level", "event")
+HASH_COLUMNS = ("trace_id",)
+FILTER_COLUMNS = ("level", "event")
+NUMERIC_COLUMNS = ("latency_ms",)
+OBJECT_BITMAP = "__object__"
+
+
+def _set_bit(bits: bytearray, row: int) -> None:
+    index = row >> 3
+    if index >= len(bits):
+        bits.extend(bytes(index + 1 - len(bits)))
+    bits[index] |= 1 << (row & 7)
+
+
+def value_hash(value: Any) -> int:
+    """64-bit hash of a JSON value as stored in hash columns (0 = missing or null)."""
+    if value is None:
+        return 0
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _identity(path: str) -> str:
+    raw = f"{reports_fs.identity(path)}:{CACHE_VERSION}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class LogColumns:
+    """Column store for one log file."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.rows = 0
+        self.offsets = array("Q")
+        self.values: Dict[str, List[Any]] = {col: [] for col in DICT_COLUMNS}
+        self.codes: Dict[str, array] = {col: array("i") for col in DICT_COLUMNS}
+        self.hashes: Dict[str, array] = {col: array("Q") for col in HASH_COLUMNS}
+        self.numeric: Dict[str, array] = {col: array("d") for col in NUMERIC_COLUMNS}
+        self.value_bitmaps: Dict[str, Dict[int, int]] = {col: {} for col in FILTER_COLUMNS}
+        self.field_bitmaps: Dict[str, int] = {}
+        self._lookup: Dict[str, Dict[Any, int]] = {col: {} for col in DICT_COLUMNS}
+
+    # -- building -----------------------------------------------------------
+    def _code(self, col: str, value: Any) -> int:
+        lookup, key = self._lookup[col], typed(value)
+        try:
+            code = lookup.get(key)
+        except TypeError:  # unhashable values never equal a requirement
+            return -1
+        if code is None:
+            code = lookup[key] = len(self.values[col])
+            self.values[col].append(value)
+        return code
+
+    @classmethod
+    def build(cls, path: str) -> "LogColumns":
+        self = cls(path)
+        # Bits are set in place: memory grows by a bit per row and key, not a posting.
+        bitmaps: Dict[Tuple[str, Any], bytearray] = {}
+        offset = 0
+        with open_log(path) as handle:
+            for raw in handle:
+                start, offset = offset, offset + len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                entry = _loads(line)
+                if entry is _INVALID:
+                    continue
+                row = self.rows
+                self.rows += 1
+                self.offsets.append(start)
+                obj = entry if isinstance(entry, dict) else {}
+                if isinstance(entry, dict):
+                    _set_bit(bitmaps.setdefault(("field", OBJECT_BITMAP), bytearray()), row)
+                for key in obj:
+                    _set_bit(bitmaps.setdefault(("field", key), bytearray()), row)
+                for col in DICT_COLUMNS:
+                    code = self._code(col, obj.get(col))
+                    self.codes[col].append(code)
+                    if col in FILTER_COLUMNS and code >= 0:
+                        _set_bit(bitmaps.setdefault((col, code), bytearray()), row)
+                for col in HASH_COLUMNS:
+                    self.hashes[col].append(value_hash(obj.get(col)))
+                for col in NUMERIC_COLUMNS:
+                    value = obj.get(col)
+                    ok_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                    self.numeric[col].append(float(value) if ok_number else math.nan)
+        for (kind, key), bits in bitmaps.items():
+            bitmap = int.from_bytes(bits, "little")
+            if kind == "field":
+                self.field_bitmaps[key] = bitmap
+            else:
+                self.value_bitmaps[kind][key] = bitmap
+        return self
+
+    # -- persistence --------------------------------------------------------
+    def save(self, directory: pathlib.Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        blobs: List[bytes] = []
+        layout: Dict[str, List[int]] = {}
+        position = 0
+
+        def put(name: str, data: bytes) -> None:
+            nonlocal position
+            layout[name] = [position, len(data)]
+            blobs.append(data)
+            position += len(data)
+
+        nbytes = (self.rows + 7) // 8
+        put("offsets", self.offsets.tobytes())
+        for col in DICT_COLUMNS:
+            put(f"codes:{col}", self.codes[col].tobytes())
+        for col in HASH_COLUMNS:
+            put(f"hash:{col}", self.hashes[col].tobytes())
+        for col in NUMERIC_COLUMNS:
+            put(f"numeric:{col}", self.numeric[col].tobytes())
+        for col in FILTER_COLUMNS:
+            for code, bitmap in self.value_bitmaps[col].items():
+                put(f"value:{col}:{code}", bitmap.to_bytes(nbytes, "little"))
+        for field, bitmap in self.field_bitmaps.items():
+            put(f"field:{field}", bitmap.to_bytes(nbytes, "little"))
+        (directory / "columns.bin").write_bytes(b"".join(blobs))
+        write_json(str(directory / "meta.json"), {
+            "version": CACHE_VERSION,
+            "source": self.source,
+            "rows": self.rows,
+            "values": self.values,
+            "layout": layout,
+        })
+
+    @classmethod
+    def load(cls, directory: pathlib.Path) -> Optional["LogColumns"]:
+        meta = read_json(str(directory / "meta.json"), None)
+        blob_path = directory / "columns.bin"
+        if not meta or meta.get("version") != CACHE_VERSION or not blob_path.exists():
+            return None
+        blob = memoryview(blob_path.read_bytes())
+        self = cls(meta["source"])
+        self.rows = meta["rows"]
+        self.values = meta["values"]
+        for col in DICT_COLUMNS:
+            for code, value in enumerate(self.values[col]):
+                try:
+                    self._lookup[col].setdefault(typed(value), code)
+                except TypeError:
+                    continue
+
+        def get(name: str) -> memoryview:
+            start, size = meta["layout"][name]
+            return blob[start:start + size]
+
+        self.offsets.frombytes(get("offsets"))
+        for col in DICT_COLUMNS:
+            self.codes[col].frombytes(get(f"codes:{col}"))
+        for col in HASH_COLUMNS:
+            self.hashes[col].frombytes(get(f"hash:{col}"))
+        for col in NUMERIC_COLUMNS:
+            self.numeric[col].frombytes(get(f"numeric:{col}"))
+        for name in meta["layout"]:
+            kind, _, rest = name.partition(":")
+            if kind == "value":
+                col, _, code = rest.rpartition(":")
+                self.value_bitmaps[col][int(code)] = int.from_bytes(get(name), "little")
+            elif kind == "field":
+                self.field_bitmaps[rest] = int.from_bytes(get(name), "little")
+        return self
+
+    # -- queries ------------------------------------------------------------
+    def mask(self, level: Any = None, event: Any = None, fields: Iterable[str] = ()) -> int:
+        """Bitmap of rows that are objects with ``level``/``event`` (None = any) and all ``fields``."""
+        result = self.field_bitmaps.get(OBJECT_BITMAP, 0)
+        for col, wanted in (("level", level), ("event", event)):
+            if wanted is None or not result:
+                continue
+            try:
+                code = self._lookup[col].get(typed(wanted))
+            except TypeError:
+                code = None
+            result &= self.value_bitmaps[col].get(code, 0) if code is not None else 0
+        for field in fields:
+            if not result:
+                break
+            result &= self.field_bitmaps.get(field, 0)
+        return result
+
+    @staticmethod
+    def first(mask: int) -> Optional[int]:
+        return (mask & -mask).bit_length() - 1 if mask else None
+
+    @staticmethod
+    def iter_rows(mask: int):
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def entry(self, row: int) -> Dict[str, Any]:
+        """Re-read the original entry for ``row`` from the source log."""
+        return self.entries([row])[row]
+
+    def entries(self, rows: Iterable[int]) -> Dict[int, Any]:
+        """Original entries for ``rows``, read through one handle in file order.
+
+        Forward seeks only: a compressed shard is decompressed once, not once
+        per row.
+        """
+        found: Dict[int, Any] = {}
+        with open_log(self.source) as handle:
+            for row in sorted(set(rows)):
+                handle.seek(self.offsets[row])
+                found[row] = _loads(handle.readline().strip())
+        return found
+
+    def column(self, name: str):
+        """A numeric column (NaN = missing), dictionary codes or value hashes, as NumPy when available."""
+        for store in (self.numeric, self.codes, self.hashes):
+            if name in store:
+                data = store[name]
+                break
+        else:
+            raise KeyError(name)
+        if numpy is not None:
+            return numpy.frombuffer(data, dtype={"d": "f8", "i": "i4", "Q": "u8"}[data.typecode])
+        return data
+
+
+def _size(directory: pathlib.Path) -> int:
+    total = 0
+    for item in directory.iterdir():
+        try:
+            total += item.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def evict(cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES, keep: Optional[pathlib.Path] = None) -> None:
+    """Drop least recently used log caches until ``cache_dir`` fits ``max_bytes``."""
+    entries = []
+    try:
+        for directory in pathlib.Path(cache_dir).iterdir():
+            if directory == keep or not directory.is_dir():
+                continue
+            try:
+                used = (directory / "meta.json").stat().st_mtime_ns
+            except OSError:
+                used = 0  # half-written or foreign: oldest
+            entries.append((used, _size(directory), directory))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries) + (_size(keep) if keep is not None and keep.is_dir() else 0)
+    for _, size, directory in sorted(entries, key=lambda item: item[0]):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+
+
+def load_columns(path: str, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> LogColumns:
+    """Columns for ``path``, built and cached on first use."""
+    directory = pathlib.Path(cache_dir) / _identity(path)
+    columns = LogColumns.load(directory)
+    if columns is not None:
+        try:
+            os.utime(directory / "meta.json")
+        except OSError:
+            pass
+        return columns
+    columns = LogColumns.build(path)
+    columns.save(directory)
+    evict(cache_dir, max_bytes, keep=directory)
+    return columns
+
+
+def check_logs_columnar(
+    specs: Dict[str, Dict[str, Any]],
+    logs_path: Union[str, List[str]],
+    cache_dir: str,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> Dict[str, Dict[str, Any]]:
+    """Same result as ``check_logs_against_specs``, evaluated on cached columns."""
+    label = logs_path if isinstance(logs_path, str) else ", ".join(logs_path)
+    matcher = LogMatcher(specs)
+    for path in expand_log_paths(logs_path):
+        if matcher.done:
+            break
+        if not reports_fs.exists(path):
+            continue
+        columns = load_columns(path, cache_dir, max_bytes)
+        matcher.entries += columns.rows
+        satisfied = []
+        rows: Dict[Tuple[str, int], int] = {}
+        for adr_id, pos in matcher.order:
+            if (adr_id, pos) in matcher.matches:
+                continue
+            requirement = matcher.requirements[adr_id][pos]
+            row = columns.first(columns.mask(
+                requirement.get("level") or None,
+                requirement.get("event") or None,
+                requirement.get("must_have_fields") or [],
+            ))
+            if row is not None:
+                rows[(adr_id, pos)] = row
+                satisfied.append((adr_id, pos))
+        samples = columns.entries(rows.values()) if rows else {}
+        for key, row in rows.items():
+            matcher.matches[key] = samples[row]
+        matcher.retire(satisfied)
+    return {adr_id: matcher.result(adr_id, label) for adr_id in specs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the columnar cache for JSONL logs")
+    parser.add_argument("--logs", nargs="+", default=["reports/debug.log.jsonl"])
+    parser.add_argument("--cache-dir", default="reports/.cache/logcols")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="Evict least recently used caches beyond this size")
+    args = parser.parse_args()
+    summary = {}
+    for path in expand_log_paths(args.logs):
+        columns = load_columns(path, args.cache_dir, args.max_bytes)
+        summary[path] = {
+            "rows": columns.rows,
+            "fields": sorted(k for k in columns.field_bitmaps if k != OBJECT_BITMAP),
+            "distinct": {col: len(columns.values[col]) for col in DICT_COLUMNS},
+        }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
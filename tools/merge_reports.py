@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Combine the partial reports of ``--shard i/N`` runs into the canonical reports.
+
+Each CI node runs ``adr_trace.py`` / ``log_analyzer.py`` with ``--shard i/N``
+and uploads its partial report; this step (also ``adrflow merge``) checks
+that every shard of each tool is present exactly once and writes
+``adr_trace.json`` / ``adr_log_check.json`` byte-identical to a single-node
+run, so ``dod-gate`` runs on them unchanged.
+"""
+from __future__ import annotations
+import argparse
+import json
+import pathlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import adr_trace
+import log_analyzer
+import sharding
+import tracing
+from common import fail, read_json, write_json
+
+# tool -> (canonical report name, merge function)
+MERGERS: Dict[str, Tuple[str, Callable[..., Dict[str, Any]]]] = {
+    "adr_trace": ("adr_trace.json", lambda partials, cfg: adr_trace.merge_partials(partials)),
+    "log_analyzer": ("adr_log_check.json", log_analyzer.merge_partials),
+}
+
+
+def group_partials(paths: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Read partial reports and group them by tool in shard order.
+
+    Raises ``ValueError`` for files that are not partial reports, unknown
+    tools, shard counts that disagree, and duplicated or missing shards.
+    """
+    found: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    counts: Dict[str, int] = {}
+    for path in paths:
+        with tracing.span("artifact.read", **{"adrflow.artifact": str(path)}):
+            data = read_json(path, None)
+        head = data.get("partial") if isinstance(data, dict) else None
+        if not isinstance(head, dict):
+            raise ValueError(f"{path}: not a partial report (run the tool with --shard i/N)")
+        if head.get("version") != sharding.PARTIAL_VERSION:
+            raise ValueError(f"{path}: unsupported partial report version {head.get('version')!r}")
+        tool = head.get("tool")
+        if tool not in MERGERS:
+            raise ValueError(f"{path}: unknown tool {tool!r}")
+        index, count = sharding.parse_shard(head.get("shard", ""))
+        if counts.setdefault(tool, count) != count:
+            raise ValueError(f"{path}: {tool} shard {index}/{count} does not match the other {tool} shards (N={counts[tool]})")
+        if index in found.setdefault(tool, {}):
+            raise ValueError(f"{path}: duplicate {tool} shard {index}/{count}")
+        found[tool][index] = data
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for tool, shards in found.items():
+        missing = [f"{index}/{counts[tool]}" for index in range(1, counts[tool] + 1) if index not in shards]
+        if missing:
+            raise ValueError(f"{tool}: missing shards {', '.join(missing)}")
+        grouped[tool] = [shards[index] for index in sorted(shards)]
+    return grouped
+
+
+def merge_reports(paths: Iterable[str], reports_dir: str = "reports", cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+    """Merge ``paths`` into ``reports_dir``; returns ``{tool: {out, shards, pass}}``."""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for tool, partials in group_partials(paths).items():
+        name, merge = MERGERS[tool]
+        out = str(pathlib.Path(reports_dir) / name)
+        with tracing.span(f"merge {tool}", **{"adrflow.shards": len(partials)}):
+            report = merge(partials, cfg)
+            write_json(out, report)
+        summary[tool] = {"out": out, "shards": len(partials), "pass": bool(report.get("pass"))}
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge --shard partial reports into adr_trace.json / adr_log_check.json")
+    parser.add_argument("partials", nargs="+", help="Partial reports written by adr_trace.py/log_analyzer.py --shard")
+    parser.add_argument("--reports", default="reports", help="Where to write the merged reports")
+    args = parser.parse_args()
+
+    with tracing.span("merge_reports", **{"adrflow.partials": len(args.partials)}):
+        try:
+            summary = merge_reports(args.partials, args.reports)
+        except ValueError as exc:
+            fail(str(exc))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
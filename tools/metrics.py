@@ -0,0 +1,110 @@
+"""Wall/CPU/RSS measurement and phase timings shared by the tools and gates."""
+from __future__ import annotations
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import tracing
+
+_local = threading.local()
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], name: str) -> Iterator[None]:
+    """Add the block's wall time in milliseconds to ``timings[name]``; no-op for ``None``."""
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(timings.get(name, 0.0) + (time.perf_counter() - started) * 1000, 3)
+
+
+def write_timings(path: Optional[str], timings: Dict[str, float]) -> None:
+    if path:
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(timings, handle, sort_keys=True)
+
+
+@contextmanager
+def timings_sidecar(timings: Dict[str, float]) -> Iterator[str]:
+    """Yield a temp path for a tool's ``--timings`` and merge what it wrote into ``timings``."""
+    fd, path = tempfile.mkstemp(prefix="adrflow-timings-", suffix=".json")
+    os.close(fd)
+    try:
+        yield path
+        try:
+            with open(path, encoding="utf-8") as handle:
+                timings.update(json.load(handle))
+        except (OSError, ValueError):
+            pass
+    finally:
+        os.unlink(path)
+
+
+def current_profile_path() -> Optional[str]:
+    """cProfile output requested for the gate running in this thread, if any."""
+    return getattr(_local, "profile", None)
+
+
+def run_measured(cmd: Union[str, List[str]], **popen_kwargs: Any) -> int:
+    """``subprocess.call`` that charges the child's rusage to the current measurement.
+
+    The child inherits the current trace context unless ``env`` is given.
+    """
+    popen_kwargs.setdefault("env", tracing.child_env())
+    proc = subprocess.Popen(cmd, **popen_kwargs)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["child_cpu"] += usage.ru_utime + usage.ru_stime
+        record["child_rss_kb"] = max(record["child_rss_kb"], usage.ru_maxrss)
+    return proc.returncode
+
+
+def _children() -> Tuple[float, int]:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+
+@contextmanager
+def measure(profile_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Measure the block running in this thread.
+
+    Yields a dict that is filled on exit with ``wall_ms``, ``cpu_ms`` and
+    ``max_rss_kb``. CPU is this thread's time plus children started through
+    :func:`run_measured` (or, failing that, children reaped meanwhile, which
+    is approximate when several gates overlap). RSS is the child's peak for
+    subprocess work, otherwise the process high-water mark.
+    """
+    record: Dict[str, Any] = {"child_cpu": 0.0, "child_rss_kb": 0}
+    previous = (getattr(_local, "record", None), getattr(_local, "profile", None))
+    _local.record, _local.profile = record, profile_path
+    children_before = _children()
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    out: Dict[str, Any] = {}
+    try:
+        yield out
+    finally:
+        cpu = time.thread_time() - cpu
+        wall = time.perf_counter() - wall
+        _local.record, _local.profile = previous
+        child_cpu, child_rss = record["child_cpu"], record["child_rss_kb"]
+        if not child_cpu:
+            children_after = _children()
+            child_cpu = children_after[0] - children_before[0]
+        out.update(
+            wall_ms=round(wall * 1000, 3),
+            cpu_ms=round((cpu + child_cpu) * 1000, 3),
+            max_rss_kb=child_rss or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        )
@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+"""Derive performance.json from JSONL debug logs with bounded memory.
+
+Latency quantiles come from a mergeable log-bucket sketch (DDSketch-style,
+1% relative accuracy by default), so memory depends on the latency range,
+not on the number of log lines. Error rate and throughput are tracked per
+time window and per ``event`` / ``provider``. Both are capped as well: past
+``max_windows`` windows the window size doubles (adjacent windows merge),
+and past ``max_groups`` distinct values per field the rest share the
+``OTHER_GROUP`` bucket, so the state stays bounded however long the logs
+span and however many distinct values they carry. Shards can be processed in
+parallel or on separate CI nodes (``--emit-sketch``) and merged later
+(``--merge``); the output keeps the ``p95_ms`` / ``error_rate_pct`` /
+``throughput_rps`` keys that ``dod_gate.evaluate_dod`` reads.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from common import ok, read_json, write_json
+from log_analyzer import expand_log_paths, iter_jsonl
+
+STATE_VERSION = 1
+MAX_WINDOWS = 1440
+MAX_GROUPS = 1000
+OTHER_GROUP = "__other__"
+ERROR_LEVELS = ("ERROR", "CRITICAL", "FATAL")
+ERROR_OUTCOMES = ("error", "failure", "failed")
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch with logarithmic buckets; mergeable."""
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self) -> None:
+        # Fold the lowest buckets together; high quantiles keep their accuracy.
+        ordered = sorted(self.buckets)
+        overflow = ordered[: len(ordered) - self.max_buckets + 1]
+        folded = sum(self.buckets.pop(index) for index in overflow)
+        target = ordered[len(overflow)]
+        self.buckets[target] = self.buckets.get(target, 0) + folded
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zeros": self.zeros,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data.get("relative_accuracy", 0.01), data.get("max_buckets", 2048))
+        sketch.buckets = {int(k): v for k, v in (data.get("buckets") or {}).items()}
+        sketch.zeros = data.get("zeros", 0)
+        sketch.count = data.get("count", 0)
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class Stats:
+    """Request count, errors, observed time span and latency sketch for one slice."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self.errors = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.latency = QuantileSketch(relative_accuracy)
+
+    def add(self, ts: Optional[float], latency: Optional[float], error: bool) -> None:
+        self.count += 1
+        self.errors += int(error)
+        if ts is not None:
+            self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        if latency is not None:
+            self.latency.add(latency)
+
+    def merge(self, other: "Stats") -> None:
+        self.count += other.count
+        self.errors += other.errors
+        for ts in (other.first_ts, other.last_ts):
+            if ts is not None:
+                self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+                self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        self.latency.merge(other.latency)
+
+    def summary(self, span: Optional[float] = None) -> Dict[str, Any]:
+        if span is None:
+            span = (self.last_ts - self.first_ts) if self.first_ts is not None else 0.0
+        # A burst inside one second still counts as one second of traffic.
+        span = max(span, 1.0)
+
+        def q(value: float) -> Optional[float]:
+            result = self.latency.quantile(value)
+            return round(result, 3) if result is not None else None
+
+        return {
+            "count": self.count,
+            "p50_ms": q(0.50),
+            "p95_ms": q(0.95),
+            "p99_ms": q(0.99),
+            "error_rate_pct": round(100.0 * self.errors / self.count, 4) if self.count else None,
+            "throughput_rps": round(self.count / span, 4) if self.count else None,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "first_ts": self.first_ts,
+            "last_ts": self.last_ts,
+            "latency": self.latency.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Stats":
+        stats = cls()
+        stats.count = data.get("count", 0)
+        stats.errors = data.get("errors", 0)
+        stats.first_ts = data.get("first_ts")
+        stats.last_ts = data.get("last_ts")
+        stats.latency = QuantileSketch.from_dict(data.get("latency") or {})
+        return stats
+
+
+def parse_ts(value: Any) -> Optional[float]:
+    """Epoch seconds from ISO-8601 strings or epoch seconds/milliseconds."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class PerfAggregator:
+    def __init__(
+        self,
+        window_s: int = 60,
+        latency_field: str = "latency_ms",
+        ts_field: str = "ts",
+        group_by: tuple = ("event", "provider"),
+        relative_accuracy: float = 0.01,
+        max_windows: int = MAX_WINDOWS,
+        max_groups: int = MAX_GROUPS,
+    ):
+        self.window_s = window_s
+        self.latency_field = latency_field
+        self.ts_field = ts_field
+        self.group_by = tuple(group_by)
+        self.relative_accuracy = relative_accuracy
+        self.max_windows = max(1, max_windows)
+        self.max_groups = max(1, max_groups)
+        self.total = Stats(relative_accuracy)
+        self.groups: Dict[str, Dict[str, Stats]] = {name: {} for name in self.group_by}
+        self.windows: Dict[int, Stats] = {}
+
+    def _stats(self, bucket: Dict[Any, Stats], key: Any) -> Stats:
+        stats = bucket.get(key)
+        if stats is None:
+            stats = bucket[key] = Stats(self.relative_accuracy)
+        return stats
+
+    def _group(self, bucket: Dict[str, Stats], key: str) -> Stats:
+        if key not in bucket and len(bucket) - (OTHER_GROUP in bucket) >= self.max_groups:
+            key = OTHER_GROUP
+        return self._stats(bucket, key)
+
+    def _fold_groups(self, bucket: Dict[str, Stats]) -> None:
+        """Fold the rarest values into ``OTHER_GROUP`` until ``max_groups`` remain."""
+        named = sorted((key for key in bucket if key != OTHER_GROUP), key=lambda key: (-bucket[key].count, key))
+        for key in named[self.max_groups:]:
+            self._stats(bucket, OTHER_GROUP).merge(bucket.pop(key))
+
+    def _coarsen(self, window_s: int) -> None:
+        """Re-bucket the windows at ``window_s``, a power-of-two multiple of the current size."""
+        windows, self.windows, self.window_s = self.windows, {}, window_s
+        for start in sorted(windows):
+            self._stats(self.windows, int(start // window_s * window_s)).merge(windows[start])
+
+    def _fit_windows(self) -> None:
+        while len(self.windows) > self.max_windows:
+            self._coarsen(self.window_s * 2)
+
+    def add(self, entry: Any) -> None:
+        if not isinstance(entry, dict):
+            return
+        ts = parse_ts(entry.get(self.ts_field))
+        latency = entry.get(self.latency_field)
+        if isinstance(latency, bool) or not isinstance(latency, (int, float)):
+            latency = None
+        level = str(entry.get("level") or "").upper()
+        outcome = str(entry.get("outcome") or "").lower()
+        error = level in ERROR_LEVELS or outcome in ERROR_OUTCOMES
+        self.total.add(ts, latency, error)
+        for name in self.group_by:
+            value = entry.get(name)
+            if value is not None and not isinstance(value, (dict, list)):
+                self._group(self.groups[name], str(value)).add(ts, latency, error)
+        if ts is not None and self.window_s:
+            start = int(ts // self.window_s * self.window_s)
+            self._stats(self.windows, start).add(ts, latency, error)
+            if len(self.windows) > self.max_windows:
+                self._fit_windows()
+
+    def merge(self, other: "PerfAggregator") -> None:
+        self.total.merge(other.total)
+        for name, bucket in other.groups.items():
+            mine = self.groups.setdefault(name, {})
+            for key, stats in bucket.items():
+                self._stats(mine, key).merge(stats)
+            self._fold_groups(mine)
+        if other.windows:
+            coarse, fine = sorted((self.window_s, other.window_s))
+            ratio = coarse // fine if fine else 0
+            if not self.windows:
+                self.window_s = other.window_s
+            elif coarse != fine and (not ratio or coarse % fine or ratio & (ratio - 1)):
+                raise ValueError(f"cannot merge {other.window_s} s windows into {self.window_s} s windows")
+            elif self.window_s < other.window_s:
+                self._coarsen(other.window_s)
+            step = self.window_s
+            for start, stats in other.windows.items():
+                self._stats(self.windows, int(start // step * step)).merge(stats)
+            self._fit_windows()
+
+    def report(self) -> Dict[str, Any]:
+        payload = self.total.summary()
+        payload["window_s"] = self.window_s
+        for name, bucket in self.groups.items():
+            payload[f"by_{name}"] = {key: bucket[key].summary() for key in sorted(bucket)}
+        payload["windows"] = [
+            {"start": start, **self.windows[start].summary(span=self.window_s)} for start in sorted(self.windows)
+        ]
+        return payload
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "window_s": self.window_s,
+            "latency_field": self.latency_field,
+            "ts_field": self.ts_field,
+            "relative_accuracy": self.relative_accuracy,
+            "max_windows": self.max_windows,
+            "max_groups": self.max_groups,
+            "total": self.total.to_dict(),
+            "groups": {name: {k: s.to_dict() for k, s in bucket.items()} for name, bucket in self.groups.items()},
+            "windows": {str(start): s.to_dict() for start, s in self.windows.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PerfAggregator":
+        if data.get("version") != STATE_VERSION:
+            raise ValueError("unsupported sketch state version")
+        agg = cls(
+            window_s=data["window_s"],
+            latency_field=data["latency_field"],
+            ts_field=data["ts_field"],
+            group_by=tuple(data.get("groups", {})),
+            relative_accuracy=data["relative_accuracy"],
+            max_windows=data.get("max_windows", MAX_WINDOWS),
+            max_groups=data.get("max_groups", MAX_GROUPS),
+        )
+        agg.total = Stats.from_dict(data["total"])
+        agg.groups = {
+            name: {k: Stats.from_dict(s) for k, s in bucket.items()} for name, bucket in data.get("groups", {}).items()
+        }
+        agg.windows = {int(start): Stats.from_dict(s) for start, s in data.get("windows", {}).items()}
+        return agg
+
+
+def aggregate_file(path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    agg = PerfAggregator(**options)
+    for entry in iter_jsonl(path):
+        agg.add(entry)
+    return agg.to_dict()
+
+
+def aggregate_logs(patterns: List[str], jobs: int = 1, **options: Any) -> PerfAggregator:
+    """Aggregate every shard (in parallel with ``jobs`` > 1) into one merged state."""
+    paths = expand_log_paths(patterns)
+    result = PerfAggregator(**options)
+    workers = min(jobs or 1, len(paths))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            states = list(pool.map(aggregate_file, paths, [options] * len(paths)))
+    else:
+        states = [aggregate_file(path, options) for path in paths]
+    for state in states:
+        result.merge(PerfAggregator.from_dict(state))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute performance.json from JSONL logs")
+    parser.add_argument("--logs", nargs="+", default=["reports/debug.log.jsonl"])
+    parser.add_argument("--out", default="reports/performance.json")
+    parser.add_argument("--window", type=int, default=60, help="Window size in seconds (0 = no windows)")
+    parser.add_argument("--latency-field", default="latency_ms")
+    parser.add_argument("--ts-field", default="ts")
+    parser.add_argument("--group-by", default="event,provider")
+    parser.add_argument("--accuracy", type=float, default=0.01, help="Relative accuracy of latency quantiles")
+    parser.add_argument("--max-windows", type=int, default=MAX_WINDOWS, help="Windows kept; beyond this the window size doubles")
+    parser.add_argument("--max-groups", type=int, default=MAX_GROUPS, help=f"Distinct values per --group-by field; the rest go to {OTHER_GROUP}")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes, one shard each")
+    parser.add_argument("--emit-sketch", help="Also write the mergeable sketch state here")
+    parser.add_argument("--merge", nargs="+", help="Merge sketch states from other shards/nodes instead of reading logs")
+    args = parser.parse_args()
+
+    options = {
+        "window_s": args.window,
+        "latency_field": args.latency_field,
+        "ts_field": args.ts_field,
+        "group_by": tuple(name for name in args.group_by.split(",") if name),
+        "relative_accuracy": args.accuracy,
+        "max_windows": args.max_windows,
+        "max_groups": args.max_groups,
+    }
+    if args.merge:
+        agg = PerfAggregator(**options)
+        for path in args.merge:
+            agg.merge(PerfAggregator.from_dict(read_json(path, {})))
+    else:
+        agg = aggregate_logs(args.logs, jobs=args.jobs, **options)
+
+    if args.emit_sketch:
+        write_json(args.emit_sketch, agg.to_dict())
+    report = agg.report()
+    write_json(args.out, report)
+    ok(f"performance: p95_ms={report['p95_ms']} error_rate_pct={report['error_rate_pct']} throughput_rps={report['throughput_rps']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Read-only view of report files that may live inside zip archives.
+
+A report path is either a plain path or ``archive.zip!member`` (a member of a
+zip, read in place). A directory can also be *mounted* from an archive with
+:func:`mount` (``mount("reports", "artifacts/12.zip")``): a path under it
+that does not exist on disk is looked up in the archive instead. Real files
+always win, so reports written locally (a ``verify`` rerun, a materialised
+member) shadow the archived ones, and without mounts every function behaves
+like its ``os``/``glob`` counterpart. A run evaluated from its artifacts
+alone is therefore mounted on a directory of its own (``ci_intake``), where
+no stale local report can shadow them.
+
+Members are streamed from the zip when opened; nothing is extracted unless
+:func:`materialize` is asked to. Mounts live in ``ADRFLOW_REPORTS_MOUNTS``
+so tools started as subprocesses (``verify`` reruns, log workers) see the
+same view.
+"""
+from __future__ import annotations
+import contextlib
+import fnmatch
+import glob as _glob
+import json
+import os
+import pathlib
+import shutil
+import threading
+import zipfile
+from typing import IO, Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+ENV_MOUNTS = "ADRFLOW_REPORTS_MOUNTS"
+SEP = "!"
+
+
+class Mount(NamedTuple):
+    directory: str  # absolute
+    archive: str  # absolute
+    prefix: str  # member prefix, "" or ending in "/"
+
+
+class _Archive(NamedTuple):
+    stamp: Tuple[int, int, int]  # pid, size, mtime_ns
+    bundle: zipfile.ZipFile
+    files: FrozenSet[str]
+    dirs: FrozenSet[str]
+
+
+_lock = threading.Lock()
+_archives: Dict[str, _Archive] = {}
+_parsed: Tuple[str, List[Mount]] = ("", [])
+
+
+# -- mounts ------------------------------------------------------------------
+
+
+def _split(path: str) -> Optional[Tuple[str, str]]:
+    """``"a.zip!dir/m.json"`` -> ``("a.zip", "dir/m.json")`` when ``a.zip`` is a file."""
+    start = 0
+    while True:
+        index = path.find(SEP, start)
+        if index < 0:
+            return None
+        if os.path.isfile(path[:index]):
+            return path[:index], path[index + 1:].replace(os.sep, "/").lstrip("/")
+        start = index + 1
+
+
+def _prefix(member: str) -> str:
+    member = member.strip("/")
+    return member + "/" if member else ""
+
+
+def mounts() -> List[Mount]:
+    global _parsed
+    raw = os.environ.get(ENV_MOUNTS, "")
+    if _parsed[0] != raw:
+        _parsed = (raw, [Mount(*item) for item in (json.loads(raw) if raw else [])])
+    return _parsed[1]
+
+
+def _store(items: List[Mount]) -> None:
+    if items:
+        os.environ[ENV_MOUNTS] = json.dumps([list(item) for item in items])
+    else:
+        os.environ.pop(ENV_MOUNTS, None)
+
+
+def mount(directory: str, source: str) -> Mount:
+    """Serve ``directory`` from ``source`` (``archive.zip`` or ``archive.zip!prefix``).
+
+    Several archives may be mounted on one directory; the first holding a
+    member wins. Raises ``ValueError`` if ``source`` is not a zip archive.
+    """
+    archive, member = _split(str(source)) or (str(source), "")
+    if not zipfile.is_zipfile(archive):
+        raise ValueError(f"{source}: not a zip archive")
+    entry = Mount(os.path.abspath(directory), os.path.abspath(archive), _prefix(member))
+    with _lock:
+        items = mounts()
+        if entry not in items:
+            _store([*items, entry])
+    return entry
+
+
+def unmount(directory: Optional[str] = None) -> None:
+    """Drop the mounts on and below ``directory`` (default: all of them)."""
+    target = os.path.abspath(directory) if directory is not None else None
+    with _lock:
+        _store([
+            item for item in mounts()
+            if target is not None and item.directory != target and not item.directory.startswith(target + os.sep)
+        ])
+
+
+@contextlib.contextmanager
+def mounted(directory: str, source: str) -> Iterator[Mount]:
+    previous = os.environ.get(ENV_MOUNTS)
+    try:
+        yield mount(directory, source)
+    finally:
+        if previous is None:
+            os.environ.pop(ENV_MOUNTS, None)
+        else:
+            os.environ[ENV_MOUNTS] = previous
+
+
+def signature() -> List[List[Any]]:
+    """Mounts with their archives' size and mtime, for cache fingerprints."""
+    out: List[List[Any]] = []
+    for item in mounts():
+        try:
+            st = os.stat(item.archive)
+        except OSError:
+            out.append([*item, None, None])
+            continue
+        out.append([*item, st.st_size, st.st_mtime_ns])
+    return out
+
+
+# -- archives ----------------------------------------------------------------
+
+
+def _open_archive(archive: str) -> _Archive:
+    st = os.stat(archive)
+    stamp = (os.getpid(), st.st_size, st.st_mtime_ns)
+    with _lock:
+        cached = _archives.get(archive)
+        if cached is not None and cached.stamp == stamp:
+            return cached
+        bundle = zipfile.ZipFile(archive)
+        files = frozenset(name for name in bundle.namelist() if not name.endswith("/"))
+        dirs = {name.rstrip("/") for name in bundle.namelist() if name.endswith("/")}
+        for name in files:
+            parts = name.split("/")[:-1]
+            dirs.update("/".join(parts[: n + 1]) for n in range(len(parts)))
+        entry = _Archive(stamp, bundle, files, frozenset(dirs))
+        _archives[archive] = entry
+    if cached is not None and cached.stamp[0] == stamp[0]:
+        cached.bundle.close()
+    return entry
+
+
+def _mounted(path: str) -> Optional[Tuple[str, str]]:
+    """The mounted ``(archive, member)`` behind ``path``, whether or not it exists on disk."""
+    full = os.path.abspath(path)
+    for item in mounts():
+        if full != item.directory and not full.startswith(item.directory + os.sep):
+            continue
+        rel = os.path.relpath(full, item.directory).replace(os.sep, "/")
+        member = item.prefix + ("" if rel == "." else rel)
+        try:
+            bundle = _open_archive(item.archive)
+        except (OSError, zipfile.BadZipFile):
+            continue
+        if member in bundle.files or member.rstrip("/") in bundle.dirs or not member:
+            return item.archive, member
+    return None
+
+
+def locate(path: Any) -> Optional[Tuple[str, str]]:
+    """``(archive, member)`` serving ``path``, or ``None`` if it is a real path (or absent)."""
+    path = os.fspath(path)
+    explicit = _split(path)
+    if explicit is not None:
+        return explicit
+    if not mounts() or os.path.lexists(path):
+        return None
+    return _mounted(path)
+
+
+def _member_kind(path: Any) -> Optional[str]:
+    found = locate(path)
+    if found is None:
+        return None
+    archive, member = found
+    try:
+        bundle = _open_archive(archive)
+    except (OSError, zipfile.BadZipFile):
+        return None
+    if member in bundle.files:
+        return "file"
+    if not member or member.rstrip("/") in bundle.dirs:
+        return "dir"
+    return None
+
+
+# -- os.path / open counterparts -----------------------------------------------
+
+
+def exists(path: Any) -> bool:
+    return os.path.exists(path) or _member_kind(path) is not None
+
+
+def is_file(path: Any) -> bool:
+    return os.path.isfile(path) or _member_kind(path) == "file"
+
+
+def is_dir(path: Any) -> bool:
+    return os.path.isdir(path) or _member_kind(path) == "dir"
+
+
+def open_binary(path: Any, buffering: int = -1) -> IO[bytes]:
+    """A binary stream over ``path``; archive members decompress as they are read."""
+    if _member_kind(path) == "file":
+        archive, member = locate(path)  # type: ignore[misc]
+        return _open_archive(archive).bundle.open(member)
+    return open(path, "rb", buffering=buffering)
+
+
+def read_bytes(path: Any) -> bytes:
+    with open_binary(path) as handle:
+        return handle.read()
+
+
+def read_text(path: Any, encoding: str = "utf-8") -> str:
+    return read_bytes(path).decode(encoding)
+
+
+def read_json(path: Any, default: Any = None) -> Any:
+    """Like ``common.read_json``: ``default`` when the file does not exist."""
+    if not is_file(path):
+        return default
+    return json.loads(read_text(path))
+
+
+def identity(path: Any) -> str:
+    """Stable identity of a file's current contents, for derived-data caches."""
+    found = locate(path) if _member_kind(path) == "file" else None
+    if found is None:
+        st = os.stat(path)
+        return f"{os.path.abspath(path)}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+    archive, member = found
+    info = _open_archive(archive).bundle.getinfo(member)
+    return f"{os.path.abspath(archive)}{SEP}{member}:{info.CRC}:{info.file_size}"
+
+
+def join(base: Any, *names: str) -> str:
+    """``os.path.join`` that descends into ``archive.zip`` / ``archive.zip!dir`` bases."""
+    base = os.fspath(base)
+    explicit = _split(base)
+    if explicit is None and os.path.isfile(base) and zipfile.is_zipfile(base):
+        explicit = (base, "")
+    if explicit is None:
+        return os.path.join(base, *names)
+    archive, member = explicit
+    return archive + SEP + "/".join(part.strip("/") for part in (member, *names) if part.strip("/"))
+
+
+def rebase(path: Any, origin: Any, root: Any) -> Optional[str]:
+    """``path`` moved from under directory ``origin`` to under ``root`` (``None`` if outside it)."""
+    try:
+        relative = os.path.relpath(os.path.abspath(os.fspath(path)), os.path.abspath(os.fspath(origin)))
+    except ValueError:  # another drive on Windows
+        return None
+    parts = pathlib.PurePath(relative).parts
+    if parts and parts[0] == os.pardir:
+        return None
+    return os.fspath(root) if relative == os.curdir else join(root, *parts)
+
+
+def absolute(path: Any) -> str:
+    explicit = _split(os.fspath(path))
+    if explicit is not None:
+        return os.path.abspath(explicit[0]) + SEP + explicit[1]
+    return str(pathlib.Path(path).resolve())
+
+
+def _matches(pattern: str, name: str) -> bool:
+    parts, names = pattern.split("/"), name.split("/")
+    return len(parts) == len(names) and all(fnmatch.fnmatchcase(n, p) for p, n in zip(parts, names))
+
+
+def glob(pattern: str) -> List[str]:
+    """``glob.glob`` over real files plus matching archive members, sorted."""
+    found: Dict[str, str] = {os.path.normpath(match): match for match in _glob.glob(pattern)}
+    explicit = _split(pattern)
+    if explicit is not None:
+        archive, member = explicit
+        with contextlib.suppress(OSError, zipfile.BadZipFile):
+            for name in _open_archive(archive).files:
+                if _matches(member, name):
+                    found.setdefault(archive + SEP + name, archive + SEP + name)
+        return sorted(found.values())
+    full = os.path.abspath(pattern)
+    for item in mounts():
+        if not full.startswith(item.directory + os.sep):
+            continue
+        rel = os.path.relpath(full, item.directory).replace(os.sep, "/")
+        try:
+            files = _open_archive(item.archive).files
+        except (OSError, zipfile.BadZipFile):
+            continue
+        for name in files:
+            if name.startswith(item.prefix) and _matches(rel, name[len(item.prefix):]):
+                virtual = os.path.join(item.directory, *name[len(item.prefix):].split("/"))
+                shown = virtual if os.path.isabs(pattern) else os.path.relpath(virtual)
+                found.setdefault(os.path.normpath(shown), shown)
+    return sorted(found.values())
+
+
+def materialize(paths: List[str]) -> List[str]:
+    """Extract the mounted members behind ``paths`` to their real location.
+
+    A file already on disk is overwritten: it may be left over from an
+    earlier run and would otherwise shadow the member just fetched. Paths
+    not served by a mount are left alone; returns the paths written.
+    """
+    written: List[str] = []
+    for path in paths:
+        found = None if _split(str(path)) is not None else _mounted(os.fspath(path))
+        if found is None or found[1] not in _open_archive(found[0]).files:
+            continue
+        target = pathlib.Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with _open_archive(found[0]).bundle.open(found[1]) as source, open(target, "wb") as handle:
+            shutil.copyfileobj(source, handle)
+        written.append(str(path))
+    return written
@@ -0,0 +1,185 @@
+"""Per-service verification for monorepos (``repo.type: mono``).
+
+``repo.services`` lists the services, either by name or as a mapping::
+
+    repo:
+      type: mono
+      services:
+        api: {root: services/api, reports: reports/api/, mode: enforce}
+        web: {}
+
+Each service is verified against its own source ``root`` (default
+``services/<name>`` or ``<name>`` when such a directory exists, else the
+repository), the ADRs that apply to it (front matter ``service:`` /
+``services:``; untagged ADRs apply to every service) and its own
+``reports`` directory (default ``<paths.reports>/<name>/``). The mode comes
+from ``enforcement_matrix`` (see ``adrflow adopt --service``) or the
+service's ``mode``; a ``report-only`` service is reported but does not fail
+the summary.
+"""
+from __future__ import annotations
+import copy
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+import tracing
+
+NON_BLOCKING = "report-only"
+
+
+def services(cfg: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Configured services as ``{name: spec}``, in config order."""
+    configured = (cfg.get("repo", {}) or {}).get("services") or {}
+    if isinstance(configured, dict):
+        return {str(name): dict(spec or {}) for name, spec in configured.items()}
+    return {str(name): {} for name in configured}
+
+
+def enabled(cfg: Dict[str, Any]) -> bool:
+    """Whether ``verify`` runs per service: a monorepo with services configured."""
+    return (cfg.get("repo", {}) or {}).get("type") == "mono" and bool(services(cfg))
+
+
+def _default_root(name: str) -> str:
+    for candidate in (os.path.join("services", name), name):
+        if os.path.isdir(candidate):
+            return candidate
+    return "."
+
+
+def mode(cfg: Dict[str, Any], name: str) -> Optional[str]:
+    matrix = cfg.get("enforcement_matrix", {}) or {}
+    return matrix.get(name) or services(cfg).get(name, {}).get("mode")
+
+
+def service_cfg(cfg: Dict[str, Any], name: str) -> Dict[str, Any]:
+    """``cfg`` as seen by the gates of service ``name``.
+
+    Raises ``ValueError`` for a service that is not configured.
+    """
+    specs = services(cfg)
+    if name not in specs:
+        raise ValueError(f"unknown service {name!r} (configured: {', '.join(specs) or 'none'})")
+    spec = specs[name]
+    derived = copy.deepcopy(cfg)
+    paths = derived.setdefault("paths", {})
+    reports_dir = pathlib.Path(paths.get("reports", "reports/"))
+    origin = paths.pop("reports_origin", None)
+    if origin is None:
+        paths["reports"] = str(spec.get("reports") or reports_dir / name)
+    else:
+        paths["reports"] = _rebased(spec.get("reports"), name, pathlib.Path(origin), reports_dir)
+    for key in ("adr_dir", "dod_file", "logs"):
+        if spec.get(key):
+            paths[key] = spec[key]
+    derived["service"] = {"name": name, "root": str(spec.get("root") or _default_root(name)), "mode": mode(cfg, name)}
+    return derived
+
+
+def reroot(cfg: Dict[str, Any], root: str) -> Dict[str, Any]:
+    """``cfg`` with the reports tree, service directories included, moved under ``root``.
+
+    Used for a run's downloaded artifacts: each service's reports directory
+    keeps its place relative to ``paths.reports`` (see :func:`service_cfg`).
+    """
+    derived = copy.deepcopy(cfg)
+    paths = derived.setdefault("paths", {})
+    paths["reports_origin"] = str(paths.get("reports", "reports/"))
+    paths["reports"] = str(root)
+    return derived
+
+
+def _rebased(spec_reports: Optional[str], name: str, origin: pathlib.Path, root: pathlib.Path) -> str:
+    """A service's reports directory under a rerooted tree.
+
+    A directory inside the original reports tree keeps its relative place;
+    one outside it maps to ``<root>/<name>``. When the run carries no such
+    directory (a run uploading only that service's reports), ``root`` itself
+    is used.
+    """
+    # Deferred: ``reports_fs`` is only needed for rerooted (batch) configs.
+    import reports_fs
+
+    target = pathlib.Path(spec_reports) if spec_reports else origin / name
+    rebased = reports_fs.rebase(target, origin, root) or str(root / name)
+    return rebased if rebased == str(root) or reports_fs.is_dir(rebased) else str(root)
+
+
+def select(cfg: Dict[str, Any], names: Optional[Iterable[str]] = None) -> List[str]:
+    """``names`` validated against the config (all services when omitted)."""
+    configured = list(services(cfg))
+    if names is None:
+        return configured
+    names = list(dict.fromkeys(names))
+    unknown = [name for name in names if name not in configured]
+    if unknown:
+        raise ValueError(f"unknown service {unknown[0]!r} (configured: {', '.join(configured) or 'none'})")
+    return names
+
+
+def _verify_one(cfg: Dict[str, Any], name: str, options: Dict[str, Any], traceparent: Optional[str] = None) -> Dict[str, Any]:
+    # Deferred: keep ``ci_intake`` (which only needs the config helpers) light.
+    from ext_registry import discover_plugins
+    from gates.scheduler import verify_gates  # type: ignore
+    from llm_judge import register_builtin
+
+    if traceparent:
+        os.environ[tracing.ENV_PARENT] = traceparent
+    register_builtin()
+    discover_plugins(cfg)  # a no-op in forked workers, the manifest in spawned ones
+    derived = service_cfg(cfg, name)
+    with tracing.span(f"service {name}", **{"adrflow.service": name}) as span:
+        result = verify_gates(derived, **options)
+        span.set_attribute("adrflow.ok", bool(result["summary"]["ok"]))
+    return result
+
+
+def section(cfg: Dict[str, Any], name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``verify.json`` entry of one service."""
+    derived = service_cfg(cfg, name)
+    service_mode = derived["service"]["mode"]
+    gates = {key: value for key, value in result.items() if key != "summary"}
+    return {
+        "ok": bool(result["summary"]["ok"]),
+        "mode": service_mode,
+        "blocking": service_mode != NON_BLOCKING,
+        "root": derived["service"]["root"],
+        "reports": derived["paths"]["reports"],
+        "miss": [f"{key}: {miss}" for key, entry in gates.items() if not entry.get("ok") for miss in entry.get("miss", [])],
+        "gates": gates,
+    }
+
+
+def summarize(sections: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "ok": all(item["ok"] or not item["blocking"] for item in sections.values()),
+        "services": {name: item["ok"] for name, item in sections.items()},
+    }
+
+
+def verify_services(cfg: Dict[str, Any], names: Optional[Iterable[str]] = None, **options: Any) -> Dict[str, Any]:
+    """Verify each service in its own worker process and merge the results.
+
+    Up to ``repo.jobs`` (default: one per CPU) services run at once; a single
+    service runs in this process. ``options`` go to
+    :func:`gates.scheduler.verify_gates` for every service. Returns
+    ``{<service>: section, ..., "summary": {...}}``.
+    """
+    names = select(cfg, names)
+    parent = tracing.current()
+    traceparent = parent.traceparent if parent is not None and tracing.enabled() else None
+    results: Dict[str, Dict[str, Any]] = {}
+    workers = min(len(names), int((cfg.get("repo", {}) or {}).get("jobs") or os.cpu_count() or 1))
+    if workers <= 1:
+        for name in names:
+            results[name] = _verify_one(cfg, name, options)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(_verify_one, cfg, name, options, traceparent) for name in names}
+            for name, future in futures.items():
+                results[name] = future.result()
+    payload: Dict[str, Any] = {name: section(cfg, name, results[name]) for name in names}
+    payload["summary"] = summarize(payload)
+    return payload
@@ -0,0 +1,57 @@
+"""Deterministic partitioning of verification work across CI nodes.
+
+``--shard i/N`` (1-based) assigns every file or log shard to exactly one of
+``N`` nodes by a hash of its normalised path, so the split is stable across
+runs, machines and file-system listing order. Each node writes a *partial*
+report; ``tools/merge_reports.py`` (``adrflow merge``) combines the partials
+into the report a single node would have written.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import os
+from typing import Any, Dict, Tuple
+
+PARTIAL_VERSION = 1
+
+Shard = Tuple[int, int]
+
+
+def parse_shard(value: str) -> Shard:
+    """``"2/4"`` -> ``(2, 4)``; raises ``ValueError`` unless ``1 <= i <= N``."""
+    try:
+        index, count = (int(part) for part in str(value).split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {value!r} out of range (1 <= i <= N)")
+    return index, count
+
+
+def shard_arg(value: str) -> Shard:
+    """``argparse`` type for ``--shard``."""
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+def shard_of(key: str, count: int) -> int:
+    """The 1-based shard owning ``key`` (a path; separators and ``./`` are normalised)."""
+    norm = os.path.normpath(str(key)).replace(os.sep, "/")
+    digest = hashlib.sha1(norm.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def owns(key: str, shard: Shard) -> bool:
+    index, count = shard
+    return count == 1 or shard_of(key, count) == index
+
+
+def label(shard: Shard) -> str:
+    return f"{shard[0]}/{shard[1]}"
+
+
+def header(tool: str, shard: Shard) -> Dict[str, Any]:
+    """The ``partial`` block identifying a shard's report."""
+    return {"tool": tool, "shard": label(shard), "version": PARTIAL_VERSION}
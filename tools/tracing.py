@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""OpenTelemetry-compatible span tracing to a JSONL file, no collector needed.
+
+Tracing is off unless ``ADRFLOW_TRACE_FILE`` is set or ``.adrflow.yaml`` has
+``tracing.enabled: true`` (see :func:`configure`). Every finished span is
+appended to the file as one OTLP/JSON ``ExportTraceServiceRequest`` line, the
+format the OpenTelemetry collector's file exporter writes, so the file can be
+replayed into Jaeger, Zipkin or any OTLP-aware viewer.
+
+Context crosses process boundaries through the W3C ``TRACEPARENT`` variable:
+:func:`child_env` builds the environment for a subprocess, and a process
+started with ``TRACEPARENT`` parents its spans under it. Threads do not
+inherit the current span; pass it along with :func:`current` / :func:`attach`.
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+ENV_FILE = "ADRFLOW_TRACE_FILE"
+ENV_PARENT = "TRACEPARENT"
+DEFAULT_PATH = "reports/trace.jsonl"
+SERVICE_NAME = "adrflow"
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+class Span:
+    """A span in flight; attributes may be added until it ends."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def _value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attrs: Dict[str, Any]) -> list:
+    return [{"key": key, "value": _value(value)} for key, value in attrs.items() if value is not None]
+
+
+def trace_path() -> Optional[str]:
+    return os.environ.get(ENV_FILE) or None
+
+
+def enabled() -> bool:
+    return trace_path() is not None
+
+
+def configure(cfg: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Turn tracing on from ``cfg['tracing']`` unless the environment already did.
+
+    The file path is exported through ``ADRFLOW_TRACE_FILE`` so every
+    subprocess appends to the same file. Returns the active path.
+    """
+    if enabled():
+        return trace_path()
+    section = (cfg or {}).get("tracing") or {}
+    if not section.get("enabled"):
+        return None
+    reports_dir = (cfg or {}).get("paths", {}).get("reports")
+    default = os.path.join(reports_dir, "trace.jsonl") if reports_dir else DEFAULT_PATH
+    os.environ[ENV_FILE] = str(section.get("path") or default)
+    return trace_path()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+
+def current() -> Optional[Span]:
+    """The innermost open span of this thread."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def attach(parent: Optional[Span]) -> Iterator[None]:
+    """Make ``parent`` the current span in this thread (e.g. a pool worker)."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    if parent is None:
+        yield
+        return
+    stack.append(parent)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def _export(span: Span, end_ns: int) -> None:
+    record = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(end_ns),
+        "attributes": _attributes(span.attributes),
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        record["parentSpanId"] = span.parent_id
+    resource = {"service.name": SERVICE_NAME, "process.pid": os.getpid(), "process.command": os.path.basename(sys.argv[0] or "python")}
+    line = json.dumps(
+        {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _attributes(resource)},
+                    "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": [record]}],
+                }
+            ]
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    path = trace_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = (line + "\n").encode("utf-8")
+    # One O_APPEND write per span keeps lines whole across processes.
+    with _write_lock:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Record the block as a span.
+
+    Spans are always tracked (so a span opened before :func:`configure`
+    still parents the rest) but only written if tracing is on when they end.
+    """
+    parent = current()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        remote = parse_traceparent(os.environ.get(ENV_PARENT))
+        trace_id, parent_id = remote if remote else (os.urandom(16).hex(), None)
+    item = Span(name, trace_id, parent_id, attributes)
+    with attach(item):
+        try:
+            yield item
+        except BaseException as exc:
+            if not (isinstance(exc, SystemExit) and exc.code in (0, None)):
+                item.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            if enabled():
+                _export(item, time.time_ns())
+
+
+def child_env(base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for a subprocess that continues the current trace."""
+    env = dict(os.environ if base is None else base)
+    parent = current()
+    if enabled() and parent is not None:
+        env[ENV_PARENT] = parent.traceparent
+    return env
+
+
+def new_traceparent() -> str:
+    return f"00-{os.urandom(16).hex()}-{os.urandom(8).hex()}-01"
+
+
+if __name__ == "__main__":
+    # ``TRACEPARENT=$(python tools/tracing.py)`` groups several commands
+    # (e.g. a Makefile recipe) under one trace.
+    print(new_traceparent())